@@ -0,0 +1,176 @@
+"""
+Benchmark async dynamodb
+
+Throughput of reading a shorturl the way each api serves it, against the local
+stand-in in its own process with a fixed latency per request:
+
+- sync: DynamoDB.get_item_by_pk on 40 threads, the threadpool fastapi runs sync
+  routes on, so a request past 40 waits for a thread
+- async: AsyncDynamoDB.get_item_by_pk on the event loop, at most
+  ASYNC_DB_MAX_CONNECTIONS requests in flight
+
+Each client sends its next request as soon as the last one returns, for the
+given seconds, at 1, 50 and 500 clients.
+
+Usage:
+    PYTHONPATH=module-app python admin/bench_async_dynamodb.py
+    PYTHONPATH=module-app python admin/bench_async_dynamodb.py --latency 0.01
+    PYTHONPATH=module-app python admin/bench_async_dynamodb.py --layers async
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from local_dynamodb import FAKE_CREDENTIALS, SAMPLE_ITEM
+
+CLIENTS = [1, 50, 500]
+
+# Threads fastapi runs sync routes on, the anyio default
+THREADPOOL_SIZE = 40
+
+TABLE = "kurteyt-bench"
+
+
+def free_port():
+    """A port nothing listens on"""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in(port, latency):
+    """Serve the stand-in from a subprocess, returns once it accepts connections"""
+
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            os.path.join(os.path.dirname(__file__), "local_dynamodb.py"),
+            "--port",
+            str(port),
+            "--latency",
+            str(latency),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+
+    process.kill()
+    raise RuntimeError("Stand-in didnt start")
+
+
+def percentile(values, fraction):
+    """Value at the fraction of the sorted values"""
+
+    ordered = sorted(values)
+
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_clients(call, clients, seconds):
+    """Requests from clients in a closed loop, returns latencies and seconds"""
+
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    async def client():
+        while True:
+            sent = time.perf_counter()
+
+            if sent >= deadline:
+                return
+
+            await call()
+            latencies.append(time.perf_counter() - sent)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+
+    return latencies, time.perf_counter() - start
+
+
+def report(layer, clients, latencies, seconds):
+    """Print a row of the table"""
+
+    print(
+        f"  {layer:<6} {clients:>7} {len(latencies) / seconds:>10.0f}"
+        f" {percentile(latencies, 0.5) * 1000:>8.1f}"
+        f" {percentile(latencies, 0.99) * 1000:>8.1f}"
+    )
+
+
+async def bench(layers, seconds):
+    """Run every layer at every number of clients"""
+
+    # pylint: disable=import-outside-toplevel
+    from app import database
+
+    pk = SAMPLE_ITEM["PK"]["S"]
+    loop = asyncio.get_running_loop()
+
+    print(f"  {'layer':<6} {'clients':>7} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for clients in CLIENTS:
+        if "sync" in layers:
+            sync_db = database.DynamoDB(table=TABLE)
+
+            with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as executor:
+                latencies, elapsed = await run_clients(
+                    lambda db=sync_db, pool=executor: loop.run_in_executor(
+                        pool, db.get_item_by_pk, pk
+                    ),
+                    clients,
+                    seconds,
+                )
+
+            report("sync", clients, latencies, elapsed)
+
+        if "async" in layers:
+            async_db = database.AsyncDynamoDB(table=TABLE)
+
+            latencies, elapsed = await run_clients(
+                lambda db=async_db: db.get_item_by_pk(pk), clients, seconds
+            )
+
+            report("async", clients, latencies, elapsed)
+            pool_stats = database.get_async_pool_stats()[async_db.endpoint_url]
+            print(f"         pool {pool_stats}")
+
+    await database.close_pools()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark async dynamodb")
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--layers", default="sync,async")
+    args = parser.parse_args()
+
+    stand_in_port = free_port()
+    stand_in = start_stand_in(stand_in_port, args.latency)
+
+    # Read by boto3 and the async layer when they are set up
+    os.environ.update(FAKE_CREDENTIALS)
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ["AWS_DEFAULT_REGION"] = os.environ["AWS_REGION"]
+    os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = f"http://127.0.0.1:{stand_in_port}"
+    os.environ["ASYNC_DB"] = "true"
+
+    print(f"get_item_by_pk, {args.latency * 1000:.0f} ms stand-in latency")
+
+    try:
+        asyncio.run(bench(args.layers.split(","), args.seconds))
+    finally:
+        stand_in.kill()
@@ -0,0 +1,205 @@
+"""
+Benchmark dynamodb codec
+
+Loading dynamodb json with the object hook edge.util used before against
+edge.codec, on a get_item response, a stream batch and an export file of
+realistic shorturl items. boto3 TypeDeserializer is timed too when installed.
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_dynamodb_codec.py
+"""
+
+import importlib.util
+import json
+import re
+import timeit
+from datetime import datetime
+
+from edge import codec
+
+# Item as the api stores it, in low level format
+SHORTURL_ITEM = {
+    "PK": {"S": "u/spring-campaign"},
+    "ShortId": {"S": "u/spring-campaign"},
+    "TargetUrl": {"S": "https://currentclient.com/campaigns/spring?utm_source=sms"},
+    "RedirectType": {"S": "OG_HTML"},
+    "RedirectStatus": {"S": "301"},
+    "CachePolicy": {"S": "IMMUTABLE"},
+    "CreatedAt": {"S": "2024-03-01T10:00:00.000000+00:00"},
+    "UpdatedAt": {"S": "2024-03-02T08:30:00.000000+00:00"},
+    "NumDaysUntilExpire": {"N": "90"},
+    "TTL": {"N": "1900000000"},
+    "OgSettings": {
+        "M": {
+            "OgTitle": {"S": "Spring open house"},
+            "OgDescription": {"S": "Book a free 30 minute consult"},
+            "OgUrl": {"S": "https://currentclient.com/campaigns/spring"},
+            "OgImage": {"S": "https://cdn.currentclient.com/og/spring.png"},
+            "OgImageAlt": {"NULL": True},
+        }
+    },
+    "OgPage": {
+        "M": {
+            "Version": {"S": "1"},
+            "Gzip": {"S": "H4sIAAAAAAAC/" + "A" * 2300},
+            "Br": {"NULL": True},
+        }
+    },
+    "Tags": {"SS": ["spring", "sms", "campaign"]},
+}
+
+
+def make_item(index):
+    """Shorturl item with its own slug"""
+
+    item = json.loads(json.dumps(SHORTURL_ITEM))
+    item["PK"] = {"S": f"u/campaign-{index}"}
+    item["ShortId"] = {"S": f"u/campaign-{index}"}
+
+    return item
+
+
+GET_ITEM_RESPONSE = json.dumps({"Item": SHORTURL_ITEM})
+
+STREAM_BATCH = json.dumps(
+    {
+        "Records": [
+            {
+                "eventID": str(index),
+                "eventName": "MODIFY",
+                "dynamodb": {
+                    "Keys": {"PK": {"S": f"u/campaign-{index}"}},
+                    "NewImage": make_item(index),
+                    "OldImage": make_item(index),
+                    "SequenceNumber": str(index),
+                    "SizeBytes": 3200,
+                    "StreamViewType": "NEW_AND_OLD_IMAGES",
+                },
+            }
+            for index in range(100)
+        ]
+    }
+)
+
+EXPORT_LINES = [json.dumps({"Item": make_item(index)}) for index in range(1000)]
+
+PAYLOADS = [
+    ("get_item", [GET_ITEM_RESPONSE], 2000),
+    ("stream x100", [STREAM_BATCH], 50),
+    ("export x1000", EXPORT_LINES, 5),
+]
+
+
+def _legacy_object_hook(dct):  # pylint: disable=too-many-branches
+    """The object hook edge.util used, kept here as the baseline"""
+
+    # pylint: disable=bare-except,too-many-return-statements
+    try:
+        if "BOOL" in dct:
+            return dct["BOOL"]
+        if "S" in dct:
+            val = dct["S"]
+            try:
+                return datetime.strptime(val, "%Y-%m-%dT%H:%M:%S.%f")
+            except:
+                return str(val)
+        if "SS" in dct:
+            return list(dct["SS"])
+        if "N" in dct:
+            if re.match(r"^-?\d+?\.\d+?$", dct["N"]) is not None:
+                return float(dct["N"])
+            return int(dct["N"])
+        if "M" in dct:
+            return dct["M"]
+        if "L" in dct:
+            return dct["L"]
+        if "NULL" in dct and dct["NULL"] is True:
+            return None
+    except:
+        return dct
+
+    for key, val in dct.items():
+        if isinstance(val, str):
+            try:
+                dct[key] = datetime.strptime(val, "%Y-%m-%dT%H:%M:%S.%f")
+            except:
+                pass
+
+    return dct
+
+
+# Images of a stream record
+IMAGES = ("NewImage", "OldImage")
+
+
+def parse_items(content, deserialize):
+    """Parse with plain json and convert the items at their known positions"""
+
+    document = json.loads(content)
+
+    if "Item" in document:
+        return deserialize(document["Item"])
+
+    return [
+        {image: deserialize(record["dynamodb"][image]) for image in IMAGES}
+        for record in document["Records"]
+    ]
+
+
+def load_type_deserializer():
+    """Loader using boto3 TypeDeserializer, None without boto3"""
+
+    if importlib.util.find_spec("boto3") is None:
+        return None
+
+    # pylint: disable=import-outside-toplevel
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+
+    def deserialize(item):
+        return {key: deserializer.deserialize(val) for key, val in item.items()}
+
+    return lambda content: parse_items(content, deserialize)
+
+
+LOADERS = [
+    (
+        "legacy object hook",
+        lambda content: json.loads(content, object_hook=_legacy_object_hook),
+    ),
+    ("codec.loads", codec.loads),
+    (
+        "codec.loads datetimes",
+        lambda content: codec.loads(content, parse_datetimes=True),
+    ),
+    (
+        "json + deserialize_item",
+        lambda content: parse_items(content, codec.deserialize_item),
+    ),
+    ("boto3 TypeDeserializer", load_type_deserializer()),
+]
+
+
+def measure(loader, documents, number):
+    """ms per payload"""
+
+    seconds = timeit.timeit(
+        lambda: [loader(document) for document in documents], number=number
+    )
+
+    return seconds / number * 1000
+
+
+if __name__ == "__main__":
+    for payload_name, payload_documents, payload_number in PAYLOADS:
+        print(payload_name)
+
+        for loader_name, payload_loader in LOADERS:
+            if payload_loader is None:
+                print(f"  {loader_name:<26} skipped, boto3 isnt installed")
+                continue
+
+            elapsed_ms = measure(payload_loader, payload_documents, payload_number)
+
+            print(f"  {loader_name:<26} {elapsed_ms:>9.3f} ms")
@@ -0,0 +1,103 @@
+"""
+Benchmark edge cold start
+
+Import plus first request of each lookup mode, each run in a fresh interpreter
+against the local dynamodb stand-in, so the numbers are the client cost and not
+the network.
+
+- import: importing edge.dynamodb and configuring it for the stage
+- first request: building the handle and the first GetItem
+- rss: peak memory of the interpreter, the function has 128 MB
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_edge_coldstart.py
+"""
+
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from local_dynamodb import FAKE_CREDENTIALS, SAMPLE_ITEM, LocalDynamoDB
+
+COLD_RUNS = 10
+
+MODES = ["sigv4", "client", "resource"]
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+from edge import config, dynamodb
+settings = config.get_stage_config("dev")
+settings.update(LOOKUP_MODE=sys.argv[1], REPLICA_ENDPOINTS={"us-east-1": sys.argv[2]})
+dynamodb.configure(settings)
+imported = time.perf_counter()
+record = dynamodb.get_item(
+    settings["KERTEYT_TABLE_NAME"],
+    "u/spring-campaign",
+    region="us-east-1",
+    mode=sys.argv[1],
+    projection="redirect",
+)
+assert record["TargetUrl"], record
+done = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_request": done - imported,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def measure_mode(mode, endpoint_url):
+    """Median timings of cold runs, None if the mode cant run here"""
+
+    runs = []
+    env = {**os.environ, **FAKE_CREDENTIALS, "AWS_DEFAULT_REGION": "us-east-1"}
+
+    for _ in range(COLD_RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, mode, endpoint_url],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=False,
+        )
+
+        if output.returncode != 0:
+            return None
+
+        runs.append(json.loads(output.stdout))
+
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+if __name__ == "__main__":
+    server = LocalDynamoDB(items=[SAMPLE_ITEM]).start()
+
+    has_boto3 = importlib.util.find_spec("boto3") is not None
+
+    print(f"{'mode':<10} {'import':>10} {'first req':>10} {'total':>10} {'rss':>8}")
+
+    for lookup_mode in MODES:
+        if lookup_mode != "sigv4" and not has_boto3:
+            print(f"{lookup_mode:<10} skipped, boto3 isnt installed")
+            continue
+
+        result = measure_mode(lookup_mode, server.endpoint_url)
+
+        if result is None:
+            print(f"{lookup_mode:<10} failed")
+            continue
+
+        print(
+            f"{lookup_mode:<10} "
+            f"{result['import'] * 1000:>7.1f} ms "
+            f"{result['first_request'] * 1000:>7.1f} ms "
+            f"{(result['import'] + result['first_request']) * 1000:>7.1f} ms "
+            f"{result['rss_kb'] / 1024:>5.1f} MB"
+        )
+
+    server.stop()
@@ -0,0 +1,111 @@
+"""
+Benchmark edge logging
+
+Per invocation cost and bytes written of the INFO logging the edge used before,
+the full event repr plus a line per step, against the sampled request log.
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_edge_logging.py
+"""
+
+import io
+import json
+import logging
+import os
+import timeit
+
+from edge import logger
+
+NUMBER = 20000
+
+EVENT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "dox", "edge", "viewer-request.input.json"
+)
+
+with open(EVENT_PATH, encoding="utf-8") as event_file:
+    EVENT = json.load(event_file)
+
+
+def make_logger(name, log_format):
+    """Logger writing to a buffer instead of stderr"""
+
+    stream = io.StringIO()
+
+    bench_logger = logging.getLogger(name)
+    bench_logger.handlers = []
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(log_format))
+    bench_logger.addHandler(handler)
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.propagate = False
+
+    return bench_logger, stream
+
+
+def invocation_legacy(legacy_logger):
+    """Lines the handler wrote for a cached direct redirect"""
+
+    request = EVENT["Records"][0]["cf"]["request"]
+
+    legacy_logger.info(f"FULL EVENT: {EVENT}")
+    legacy_logger.info(f"Checking is api route: {request['uri']}")
+    legacy_logger.info(f"Checking is get method: {request['method']}")
+    legacy_logger.info(f"Getting dynamod record with pk: {request['uri']}")
+    legacy_logger.info(f"Redirect record from cache: {request['uri']}")
+    legacy_logger.info("Direct redirect to: https://example.com/landing")
+
+
+def invocation_request_log(request_log):
+    """The same invocation with the request log"""
+
+    request = EVENT["Records"][0]["cf"]["request"]
+
+    request_log.start("bench")
+    request_log.set(uri=request["uri"], method=request["method"], route="REDIRECT")
+
+    with request_log.phase("lookup"):
+        request_log.set(cache="fresh")
+
+    with request_log.phase("build"):
+        request_log.debug("Direct redirect to: %s", "https://example.com/landing")
+
+    request_log.set(status="301")
+    request_log.flush()
+
+
+def measure(name, func, stream):
+    """Print us and bytes written per invocation"""
+
+    seconds = timeit.timeit(func, number=NUMBER)
+    written = len(stream.getvalue())
+
+    print(
+        f"{name:<34} {seconds / NUMBER * 1e6:>8.1f} us "
+        f"{written / NUMBER:>8.0f} bytes/invocation"
+    )
+
+
+if __name__ == "__main__":
+    legacy, legacy_stream = make_logger(
+        "bench-legacy", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    measure(
+        "full event + INFO per step",
+        lambda: invocation_legacy(legacy),
+        legacy_stream,
+    )
+
+    for sample_rate, debug_sample_rate in [(1.0, 0.01), (0.1, 0.001)]:
+        sampled_log = logger.RequestLog(
+            f"bench-request-{sample_rate}",
+            sample_rate=sample_rate,
+            debug_sample_rate=debug_sample_rate,
+        )
+        request_stream = io.StringIO()
+        sampled_log.logger.handlers[0].setStream(request_stream)
+
+        measure(
+            f"request log, sample {sample_rate}/{debug_sample_rate}",
+            lambda log=sampled_log: invocation_request_log(log),
+            request_stream,
+        )
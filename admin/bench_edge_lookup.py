@@ -0,0 +1,107 @@
+"""
+Benchmark edge lookup
+
+Compare the boto3 Table resource path with the low level client path of the
+edge lookup.
+
+- Cold init: time to import boto3 and build the handle, each run in a fresh
+  interpreter so nothing is cached
+- Deserialize: per call cost of turning a low level item into the record dict
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_edge_lookup.py
+"""
+
+import statistics
+import subprocess
+import sys
+import timeit
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from edge import codec
+
+COLD_RUNS = 10
+NUMBER = 50000
+
+COLD_INIT = {
+    "resource": (
+        "import boto3;"
+        "boto3.session.Session().resource("
+        "service_name='dynamodb', region_name='us-east-1'"
+        ").Table('cc-east-dev-db-kurteyt')"
+    ),
+    "client": (
+        "import boto3;"
+        "boto3.session.Session().client("
+        "service_name='dynamodb', region_name='us-east-1'"
+        ")"
+    ),
+}
+
+TIMED_SNIPPET = (
+    "import time;start=time.perf_counter();{init};" "print(time.perf_counter() - start)"
+)
+
+# Item as returned by the low level get_item
+LOW_LEVEL_ITEM = {
+    "PK": {"S": "u/spring-campaign"},
+    "ShortId": {"S": "u/spring-campaign"},
+    "TargetUrl": {"S": "https://currentclient.com/campaigns/spring?utm_source=sms"},
+    "RedirectType": {"S": "OG_HTML"},
+    "CreatedAt": {"S": "2024-03-01T10:00:00.000000+00:00"},
+    "NumDaysUntilExpire": {"N": "90"},
+    "TTL": {"N": "1900000000"},
+    "OgSettings": {
+        "M": {
+            "OgTitle": {"S": "Spring open house"},
+            "OgDescription": {"S": "Book a free 30 minute consult"},
+            "OgUrl": {"S": "https://currentclient.com/campaigns/spring"},
+            "OgImage": {"S": "https://cdn.currentclient.com/og/spring.png"},
+            "OgImageAlt": {"NULL": True},
+        }
+    },
+}
+
+
+def measure_cold_init(name, init):
+    """Median seconds to import and build the handle in a fresh interpreter"""
+
+    timings = []
+
+    for _ in range(COLD_RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMED_SNIPPET.format(init=init)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        timings.append(float(output.stdout.strip()))
+
+    print(f"cold init {name:<10} {statistics.median(timings) * 1000:>8.1f} ms median")
+
+
+def measure_deserialize():
+    """Per call cost of each deserializer"""
+
+    type_deserializer = TypeDeserializer()
+
+    def deserialize_resource():
+        return {
+            key: type_deserializer.deserialize(val)
+            for key, val in LOW_LEVEL_ITEM.items()
+        }
+
+    for name, func in [
+        ("resource", deserialize_resource),
+        ("client", lambda: codec.deserialize_item(LOW_LEVEL_ITEM)),
+    ]:
+        seconds = timeit.timeit(func, number=NUMBER)
+        print(f"deserialize {name:<8} {seconds / NUMBER * 1e6:>8.2f} us/call")
+
+
+if __name__ == "__main__":
+    for mode, init_snippet in COLD_INIT.items():
+        measure_cold_init(mode, init_snippet)
+
+    measure_deserialize()
@@ -0,0 +1,86 @@
+"""
+Benchmark edge routes
+
+Per request cost of classifying a request, the startswith checks with INFO
+logging the edge used before against the compiled route table.
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_edge_routes.py
+"""
+
+import logging
+import timeit
+
+from edge import routes
+
+NUMBER = 200000
+
+# Mix of paths seen by the distribution
+REQUESTS = [
+    ("abcd1234", "GET"),
+    ("u/spring-campaign", "GET"),
+    ("api/v1/public/shorten/", "POST"),
+    ("docs", "GET"),
+    ("openapi.json", "GET"),
+    ("favicon.ico", "GET"),
+    ("robots.txt", "GET"),
+    ("health", "GET"),
+    ("abcd1234", "HEAD"),
+    ("wp-login.php", "GET"),
+]
+
+LEGACY_LOGGER = logging.getLogger("bench-legacy")
+LEGACY_LOGGER.addHandler(logging.NullHandler())
+LEGACY_LOGGER.propagate = False
+
+
+def classify_legacy(path, method, logger):
+    """Classify as check_is_apiroute and check_is_getmethod did"""
+
+    logger.info(f"Checking is api route: {path}")
+    is_apiroute = False
+
+    if path.startswith("docs"):
+        is_apiroute = True
+    if path.startswith("api/"):
+        is_apiroute = True
+    if path.startswith("openapi"):
+        is_apiroute = True
+
+    if is_apiroute:
+        return routes.ROUTE_FORWARD
+
+    logger.info(f"Checking is get method: {method}")
+
+    if method != "GET":
+        return routes.ROUTE_FORWARD
+
+    return routes.ROUTE_REDIRECT
+
+
+def measure(name, func):
+    """Print ns per classification"""
+
+    def run_all():
+        for path, method in REQUESTS:
+            func(path, method)
+
+    seconds = timeit.timeit(run_all, number=NUMBER // len(REQUESTS))
+
+    print(f"{name:<28} {seconds / NUMBER * 1e9:>8.0f} ns/request")
+
+
+if __name__ == "__main__":
+    LEGACY_LOGGER.setLevel(logging.INFO)
+    measure(
+        "startswith + INFO log",
+        lambda path, method: classify_legacy(path, method, LEGACY_LOGGER),
+    )
+
+    LEGACY_LOGGER.setLevel(logging.WARNING)
+    measure(
+        "startswith, log gated off",
+        lambda path, method: classify_legacy(path, method, LEGACY_LOGGER),
+    )
+
+    measure("compiled route table", routes.classify_request)
@@ -0,0 +1,83 @@
+"""
+Benchmark og render
+
+Compare the chained str.replace render of the og interstitial with the compiled
+template render, per call time and bytes allocated.
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_og_render.py
+"""
+
+import timeit
+import tracemalloc
+
+from edge import og
+
+OG_RECORD = {
+    "PK": "u/spring-campaign",
+    "CreatedAt": "2024-03-01T10:00:00.000000+00:00",
+    "TTL": 1900000000,
+    "RedirectType": "OG_HTML",
+    "TargetUrl": "https://currentclient.com/campaigns/spring?utm_source=sms",
+    "OgSettings": {
+        "OgTitle": "Spring open house & free consult",
+        "OgDescription": 'Book a "free" 30 minute consult with our team <this week>',
+        "OgUrl": "https://currentclient.com/campaigns/spring",
+        "OgImage": "https://cdn.currentclient.com/og/spring.png",
+        "OgImageAlt": "Spring open house",
+    },
+}
+
+NUMBER = 20000
+
+
+def render_chained_replace(redirect_record):
+    """Render as the edge did before the compiled template"""
+
+    og_settings = redirect_record.get("OgSettings", {})
+    target_url = redirect_record.get("TargetUrl", {})
+
+    return (
+        og.HTML_TEMPLATE.replace("$OG_TITLE", og_settings.get("OgTitle", ""))
+        .replace("$OG_DESCRIPTION", og_settings.get("OgDescription", ""))
+        .replace("$OG_URL", og_settings.get("OgUrl", ""))
+        .replace("$OG_IMAGE", og_settings.get("OgImage", ""))
+        .replace("$OG_IMAGE_ALT", og_settings.get("OgImageAlt", ""))
+        .replace("$REDIRECT_URL", target_url)
+    )
+
+
+def render_compiled(redirect_record):
+    """Render with the compiled template, no page cache"""
+
+    og_settings = redirect_record["OgSettings"]
+
+    return og.OG_TEMPLATE.render(
+        {
+            "OG_TITLE": og_settings.get("OgTitle"),
+            "OG_DESCRIPTION": og_settings.get("OgDescription"),
+            "OG_URL": og_settings.get("OgUrl"),
+            "OG_IMAGE": og_settings.get("OgImage"),
+            "OG_IMAGE_ALT": og_settings.get("OgImageAlt"),
+            "REDIRECT_URL": redirect_record.get("TargetUrl"),
+        }
+    )
+
+
+def measure(name, func):
+    """Print time per call and bytes allocated per call"""
+
+    seconds = timeit.timeit(lambda: func(OG_RECORD), number=NUMBER)
+
+    tracemalloc.start()
+    func(OG_RECORD)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<24} {seconds / NUMBER * 1e6:>8.2f} us/call {peak:>8} bytes peak")
+
+
+if __name__ == "__main__":
+    measure("chained replace", render_chained_replace)
+    measure("compiled template", render_compiled)
+    measure("compiled + page cache", og.render_og_page)
@@ -0,0 +1,110 @@
+"""
+Benchmark short ids
+
+Cost of generating short ids from the leased sequence, against drawing them at
+random, and a check that the generated ids are unique.
+
+- allocate: µs per id through the allocator, leases included, with a lease
+  that sleeps as long as a dynamodb round trip
+- unique: every id is inverted back to its sequence number, no two ids can
+  share one, so this holds for all ids without keeping them in memory
+- random: µs per id of random.choice, the old ids, and of secrets, the
+  fallback, with the collisions random ids would have at the same count
+
+Usage:
+    PYTHONPATH=module-app python admin/bench_short_ids.py
+    PYTHONPATH=module-app python admin/bench_short_ids.py --count 1000000
+"""
+
+import argparse
+import random
+import string
+import time
+
+from app.core import ids
+
+RANDOM_COUNT = 1000000
+
+
+def random_choice_id(size=ids.ID_LENGTH):
+    """Id as models.random_alnum drew it before, with random.choice"""
+
+    chars = string.ascii_letters + string.digits
+
+    return "".join(random.choice(chars) for _ in range(size))
+
+
+def measure(name, func, count):
+    """Call func count times, print µs per call"""
+
+    start = time.perf_counter()
+
+    for _ in range(count):
+        func()
+
+    seconds = time.perf_counter() - start
+    print(f"  {name:<28} {seconds / count * 1e6:>7.2f} µs/id")
+
+    return seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark short ids")
+    parser.add_argument("--count", type=int, default=10000000)
+    parser.add_argument("--block-size", type=int, default=1000)
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="seconds per lease"
+    )
+    args = parser.parse_args()
+
+    counter = {"value": 0}
+
+    def lease(block_size):
+        """Counter ADD, sleeping a round trip"""
+
+        time.sleep(args.latency)
+        counter["value"] += block_size
+
+        return counter["value"]
+
+    allocator = ids.IdAllocator(
+        lease=lease, key=b"benchmark-key-of-32-characters!!", block_size=args.block_size
+    )
+    permutation = allocator.permutation
+
+    print(f"{args.count} ids, blocks of {args.block_size}, {args.latency}s lease")
+
+    verify_started = time.perf_counter()
+    invalid = 0
+
+    for sequence in range(args.count):
+        short_id = allocator.allocate()
+
+        if (
+            len(short_id) != ids.ID_LENGTH
+            or permutation.invert(ids.decode_base62(short_id)) != sequence
+        ):
+            invalid += 1
+
+    verify_us = (time.perf_counter() - verify_started) / args.count * 1e6
+    stats = allocator.stats()
+
+    print(f"  allocate and verify          {verify_us:>7.2f} µs/id")
+    print(f"  leases                       {stats['leases']:>7}")
+    print(f"  unique                       {'yes' if not invalid else 'NO'}")
+    print(f"  invalid                      {invalid:>7}")
+
+    measure("allocate", allocator.allocate, RANDOM_COUNT)
+    measure("permute", lambda: permutation.permute(12345), RANDOM_COUNT)
+
+    print("random ids")
+    measure("random.choice", random_choice_id, RANDOM_COUNT)
+    measure("secrets", ids.random_id, RANDOM_COUNT)
+
+    # Birthday bound, pairs of random ids expected to collide
+    pairs = args.count * (args.count - 1) / 2 / ids.ID_SPACE
+    print(f"  expected collisions          {pairs:>7.3f} at {args.count} ids")
+    print(
+        f"  chance a new id exists       {args.count / ids.ID_SPACE:>7.1e}"
+        f" in a table of {args.count}"
+    )
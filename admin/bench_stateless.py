@@ -0,0 +1,125 @@
+"""
+Benchmark stateless links
+
+Per request cost of verifying a stateless link at the edge, against a slug
+served from the warm container cache, the cheapest lookup a stored link gets.
+
+- decode: base64, hmac and expiry check, with the keyed hmac copied per token
+  and with the key hashed again per token
+- make_response: the whole response, stateless token against cached slug
+
+Usage:
+    PYTHONPATH=module-edge python admin/bench_stateless.py
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+import timeit
+
+from edge import config
+
+config.DEFAULTS.update(
+    LOOKUP_MODE="sigv4",
+    WARM_UP=False,
+    LOG_SAMPLE_RATE=0.0,
+    LOG_SLOW_MS=None,
+    CLICKS=False,
+    STATELESS_KEYS={"k1": "c2VjcmV0LWtleS1mb3ItdGhlLWJlbmNobWFyay0wMQ"},
+)
+
+# pylint: disable=wrong-import-position
+from edge import main, stateless
+
+NUMBER = 100000
+
+TARGET_URLS = [
+    ("short url", "https://currentclient.com/a"),
+    (
+        "campaign url",
+        "https://currentclient.com/campaigns/spring?utm_source=email"
+        "&utm_medium=blast&utm_campaign=spring-2024&rid=8f2c1e9a",
+    ),
+]
+
+EVENT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "dox", "edge", "viewer-request.input.json"
+)
+
+
+def decode_rekeyed(token, secrets_by_kid):
+    """decode hashing the key for every token, the baseline"""
+
+    kid = token.partition(".")[0]
+    secret = stateless._b64decode(secrets_by_kid[kid])  # pylint: disable=W0212
+    keys = {kid: hmac.new(secret, digestmod=hashlib.sha256)}
+
+    return stateless.decode(token, keys)
+
+
+def measure(name, func, number=NUMBER):
+    """Print µs per call"""
+
+    seconds = timeit.timeit(func, number=number)
+
+    print(f"  {name:<34} {seconds / number * 1e6:>7.2f} µs")
+
+
+def make_event(uri):
+    """Viewer-request event for the uri"""
+
+    with open(EVENT_PATH, encoding="utf-8") as event_file:
+        event = json.load(event_file)
+
+    event["Records"][0]["cf"]["request"]["uri"] = uri
+
+    return event["Records"][0]["cf"]
+
+
+if __name__ == "__main__":
+    main.configure("dev")
+
+    secrets = main.CONFIG["STATELESS_KEYS"]
+    expires_at = int(time.time()) + 30 * 24 * 60 * 60
+
+    for url_name, target_url in TARGET_URLS:
+        link_token = stateless.encode(target_url, expires_at, "k1", main.STATELESS_KEYS)
+
+        print(f"{url_name}, {len(target_url)} chars => s/{link_token[:24]}...")
+        print(f"  token length {len(link_token) + len(stateless.TOKEN_PREFIX)} chars")
+
+        measure(
+            "decode, keyed hmac copied",
+            lambda value=link_token: stateless.decode(value, main.STATELESS_KEYS),
+        )
+        measure(
+            "decode, key hashed per token",
+            lambda value=link_token: decode_rekeyed(value, secrets),
+        )
+
+        stateless_event = make_event(f"/s/{link_token}")
+        measure(
+            "make_response, stateless",
+            lambda event=stateless_event: main.make_response(event),
+            number=NUMBER // 4,
+        )
+
+    main.REDIRECT_CACHE.put(
+        "abcd1234",
+        {
+            "PK": "abcd1234",
+            "TargetUrl": TARGET_URLS[1][1],
+            "RedirectType": "DIRECT",
+            "TTL": expires_at,
+        },
+    )
+    cached_event = make_event("/abcd1234")
+
+    print("stored link")
+    measure(
+        "make_response, cached slug",
+        lambda: main.make_response(cached_event),
+        number=NUMBER // 4,
+    )
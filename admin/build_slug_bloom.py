@@ -0,0 +1,165 @@
+"""
+Build slug bloom filter
+
+Scan the kurteyt table for every PK and write the bloom filter the edge
+function uses to skip dynamodb for slugs that dont exist. Past the stage
+SLUG_FILTER_SKIP_MAX_AGE every slug is read again, the filter then only decides
+which empty reads to cache as missing.
+
+Click counter items are left out, they arent links.
+
+Links created after the build are seen as missing by the edge until the filter
+is SLUG_FILTER_SKIP_MAX_AGE old, so build it right before deploying, as part of
+each edge release. The edge ignores a filter older than SLUG_BLOOM_MAX_AGE.
+
+Lambda@edge limits the compressed package to 1 MB for viewer-request triggers
+and 50 MB for origin-request triggers, the report flags a filter that wont fit.
+
+Usage:
+    PYTHONPATH=module-edge python admin/build_slug_bloom.py \
+        --table cc-east-dev-db-kurteyt --fp-rate 0.01
+    PYTHONPATH=module-edge python admin/build_slug_bloom.py --report-only
+"""
+
+import argparse
+import math
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from edge import bloom, clicks
+
+VIEWER_REQUEST_LIMIT = 1024 * 1024
+ORIGIN_REQUEST_LIMIT = 50 * 1024 * 1024
+
+OUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "module-edge", "edge", "slugs.bloom"
+)
+
+
+def scan_segment(table_name, region, segment, total_segments):
+    """Scan one parallel segment of the table for its PKs"""
+
+    client = boto3.client("dynamodb", region_name=region)
+    paginator = client.get_paginator("scan")
+
+    pks = []
+
+    for page in paginator.paginate(
+        TableName=table_name,
+        ProjectionExpression="PK",
+        Segment=segment,
+        TotalSegments=total_segments,
+    ):
+        pks.extend(
+            item["PK"]["S"]
+            for item in page["Items"]
+            if not clicks.is_counter_pk(item["PK"]["S"])
+        )
+
+    return pks
+
+
+def scan_pks(table_name, region, total_segments):
+    """Scan all PKs with parallel segments"""
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        segments = executor.map(
+            lambda segment: scan_segment(table_name, region, segment, total_segments),
+            range(total_segments),
+        )
+
+        for pks in segments:
+            yield from pks
+
+
+def measure_fp_rate(slug_filter, num_probes):
+    """Probe with slugs that cant exist to measure the false positive rate"""
+
+    false_positives = sum(
+        f"__probe__/{secrets.token_hex(8)}" in slug_filter for _ in range(num_probes)
+    )
+
+    return false_positives / num_probes
+
+
+def print_filter_report(slug_filter, num_probes):
+    """Report on a built filter"""
+
+    size = len(slug_filter.to_bytes())
+
+    print(f"Items:              {slug_filter.num_items}")
+    print(f"Bits:               {slug_filter.num_bits}")
+    print(f"Hashes:             {slug_filter.num_hashes}")
+    print(f"Size:               {size / 1024 / 1024:.2f} MB")
+    print(f"Fill ratio:         {slug_filter.fill_ratio():.4f}")
+    print(f"Expected fp rate:   {slug_filter.estimated_fp_rate():.5f}")
+    print(f"Measured fp rate:   {measure_fp_rate(slug_filter, num_probes):.5f}")
+
+    if size > ORIGIN_REQUEST_LIMIT:
+        print("WARNING: too large for an origin-request package")
+    elif size > VIEWER_REQUEST_LIMIT:
+        print("WARNING: too large for a viewer-request package")
+
+
+def print_sizing_report():
+    """Filter size for a range of link counts and fp rates"""
+
+    fp_rates = [0.05, 0.01, 0.001]
+
+    print("Links        " + "".join(f"{rate:>14}" for rate in fp_rates))
+
+    for num_items in [100_000, 1_000_000, 10_000_000, 25_000_000, 50_000_000]:
+        sizes = []
+        for fp_rate in fp_rates:
+            num_bits, num_hashes = bloom.optimal_params(num_items, fp_rate)
+            size_mb = math.ceil(num_bits / 8) / 1024 / 1024
+            sizes.append(f"{size_mb:>8.1f} MB k={num_hashes}")
+        print(f"{num_items:<13}" + "".join(f"{size:>14}" for size in sizes))
+
+
+def build_filter(table_name, region, fp_rate, growth, total_segments):
+    """Build filter sized for the current links plus growth"""
+
+    pks = list(scan_pks(table_name, region, total_segments))
+
+    slug_filter = bloom.BloomFilter.for_capacity(len(pks) * growth, fp_rate)
+
+    for pk in pks:
+        slug_filter.add(pk)
+
+    return slug_filter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the edge slug bloom filter")
+    parser.add_argument("--table", default="cc-east-dev-db-kurteyt")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--fp-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--growth", type=float, default=1.2, help="Headroom for links added later"
+    )
+    parser.add_argument("--segments", type=int, default=8)
+    parser.add_argument("--probes", type=int, default=100_000)
+    parser.add_argument("--out", default=OUT_PATH)
+    parser.add_argument(
+        "--report-only", action="store_true", help="Only print the sizing report"
+    )
+    args = parser.parse_args()
+
+    print_sizing_report()
+
+    if not args.report_only:
+        built_filter = build_filter(
+            args.table, args.region, args.fp_rate, args.growth, args.segments
+        )
+
+        print()
+        print_filter_report(built_filter, args.probes)
+
+        with open(args.out, "wb") as out_file:
+            out_file.write(built_filter.to_bytes())
+
+        print(f"Wrote {args.out}")
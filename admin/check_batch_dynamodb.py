@@ -0,0 +1,178 @@
+"""
+Check batch dynamodb
+
+Runs the batch operations of DynamoDB against the local stand-in with botocore
+underneath, and checks the items the stand-in ends up storing and the records
+read back, with some of every batch left unprocessed to go through the retries:
+
+- batch_write_items puts and deletes
+- transact_put_items with records failing their condition
+- batch_get_by_pk with repeated and missing PKs, and a projection
+
+Exits non zero on the first check that fails.
+
+Usage:
+    PYTHONPATH=module-app python admin/check_batch_dynamodb.py
+"""
+
+import os
+from decimal import Decimal
+
+from local_dynamodb import FAKE_CREDENTIALS, LocalDynamoDB
+
+TABLE = "kurteyt-check"
+
+# Spans several requests, 25 items per batch write
+RECORD_COUNT = 60
+
+
+def make_record(number):
+    """Record with one of each attribute type the api stores"""
+
+    return {
+        "PK": f"u/check-{number}",
+        "ShortId": f"u/check-{number}",
+        "TargetUrl": f"https://currentclient.com/check/{number}",
+        "NumDaysUntilExpire": 90,
+        "Weight": Decimal("0.5"),
+        "Active": True,
+        "Notes": None,
+        "Tags": ["check", "batch"],
+        "OgSettings": {"Title": f"Check {number}"},
+    }
+
+
+def check_batch_write(database, db, stand_in):
+    """Puts and deletes are stored as typed items, unprocessed ones sent again"""
+
+    records = [make_record(number) for number in range(RECORD_COUNT)]
+
+    stand_in.unprocessed = 5
+    statuses = db.batch_write_items(records=records)
+
+    assert statuses == [database.WriteStatus.written] * RECORD_COUNT, statuses
+    assert stand_in.unprocessed == 0
+
+    assert stand_in.items["u/check-7"] == {
+        "PK": {"S": "u/check-7"},
+        "ShortId": {"S": "u/check-7"},
+        "TargetUrl": {"S": "https://currentclient.com/check/7"},
+        "NumDaysUntilExpire": {"N": "90"},
+        "Weight": {"N": "0.5"},
+        "Active": {"BOOL": True},
+        "Notes": {"NULL": True},
+        "Tags": {"L": [{"S": "check"}, {"S": "batch"}]},
+        "OgSettings": {"M": {"Title": {"S": "Check 7"}}},
+    }, stand_in.items["u/check-7"]
+
+    stand_in.unprocessed = 3
+    statuses = db.batch_write_items(
+        records=[{"PK": f"u/check-{number}"} for number in range(0, RECORD_COUNT, 2)],
+        operation="DELETE",
+    )
+
+    assert statuses == [database.WriteStatus.written] * (RECORD_COUNT // 2)
+    assert sorted(stand_in.items) == sorted(
+        f"u/check-{number}" for number in range(1, RECORD_COUNT, 2)
+    )
+
+
+def check_transact_put(database, db, stand_in):
+    """Conditional puts store the new records, existing ones fail the condition"""
+
+    existing = [make_record(number) for number in range(1, 11, 2)]
+    new = [make_record(number) for number in range(1000, 1010)]
+    records = [*existing, *new]
+
+    before = {record["PK"]: stand_in.items[record["PK"]] for record in existing}
+
+    statuses = db.transact_put_items(
+        records=records,
+        condition_expression=database.ConditionExpression(
+            Attribute="PK", Operator=database.ConditionExpressionOperator.NOT_EXISTS
+        ),
+    )
+
+    assert statuses == [database.WriteStatus.condition_failed] * len(existing) + [
+        database.WriteStatus.written
+    ] * len(new), statuses
+
+    for pk, item in before.items():
+        assert stand_in.items[pk] == item
+
+    assert stand_in.items["u/check-1003"]["NumDaysUntilExpire"] == {"N": "90"}
+    assert stand_in.items["u/check-1003"]["OgSettings"] == {
+        "M": {"Title": {"S": "Check 1003"}}
+    }
+
+
+def check_batch_get(database, db, stand_in):
+    """Records come back in the order of the PKs, unprocessed keys read again"""
+
+    pks = [f"u/check-{number}" for number in range(RECORD_COUNT + 50)]
+    pks.append("u/check-1")
+
+    stand_in.unprocessed = 30
+    records = db.batch_get_by_pk(pks)
+
+    assert stand_in.unprocessed == 0
+    assert len(records) == len(pks)
+
+    for pk, record in zip(pks, records):
+        if pk in stand_in.items:
+            assert record["PK"] == pk, (pk, record)
+        else:
+            assert record is False, (pk, record)
+
+    # Numbers come back from the codec as int or float
+    assert records[1] == {**make_record(1), "Weight": 0.5}, records[1]
+    assert records[-1] == records[1]
+
+    stand_in.unprocessed = 2
+    records = db.batch_get_by_pk(
+        ["u/check-3", "u/check-4", "u/check-5"],
+        projection=database.Projection.redirect,
+    )
+
+    assert records == [
+        {
+            "PK": "u/check-3",
+            "TargetUrl": "https://currentclient.com/check/3",
+            "OgSettings": {"Title": "Check 3"},
+        },
+        False,
+        {
+            "PK": "u/check-5",
+            "TargetUrl": "https://currentclient.com/check/5",
+            "OgSettings": {"Title": "Check 5"},
+        },
+    ], records
+
+
+def main():
+    """Run the checks"""
+
+    stand_in = LocalDynamoDB().start()
+
+    os.environ.update(FAKE_CREDENTIALS)
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ["AWS_DEFAULT_REGION"] = os.environ["AWS_REGION"]
+    os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = stand_in.endpoint_url
+
+    # Reads the region and endpoint on import
+    from app import database  # pylint: disable=import-outside-toplevel
+
+    try:
+        db = database.DynamoDB(table=TABLE)
+
+        for check in (check_batch_write, check_transact_put, check_batch_get):
+            check(database, db, stand_in)
+            print(f"{check.__name__}: ok")
+
+        print(f"Requests: {stand_in.requests}")
+    finally:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
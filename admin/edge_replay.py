@@ -0,0 +1,358 @@
+"""
+Edge replay
+
+Replay cloudfront viewer-request events through edge.main.handler_dev against
+the local dynamodb stand-in, and report latency, allocations and memory.
+
+Events are generated, or loaded from a jsonl file of events:
+    - slugs drawn with a zipf distribution, so a few links take most hits
+    - direct and OG_HTML records, some og pages pre-rendered
+    - crawlers and people on og links
+    - misses on slugs that dont exist
+    - api, static and HEAD requests
+
+Each container runs in a fresh interpreter, so the first request pays for the
+import, warm up and empty caches like a cold lambda does.
+
+Report per container:
+    - cold: init (import and warm up) and the first request
+    - warm: p50, p95, p99 of every later request, first 100 and the rest
+    - allocations: bytes allocated per request, with tracemalloc on a second
+      pass so it doesnt skew the latencies
+    - peak rss against the 128 MB the function has
+
+Usage:
+    PYTHONPATH=module-edge python admin/edge_replay.py --requests 20000
+    PYTHONPATH=module-edge python admin/edge_replay.py --mode sigv4 --latency 0.004
+    PYTHONPATH=module-edge python admin/edge_replay.py --dump events.jsonl
+    PYTHONPATH=module-edge python admin/edge_replay.py --events events.jsonl
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from local_dynamodb import FAKE_CREDENTIALS, LocalDynamoDB
+
+MEMORY_BUDGET_MB = 128
+
+# Share of requests for each kind of event
+MIX = {
+    "redirect": 0.78,
+    "miss": 0.08,
+    "crawler": 0.06,
+    "api": 0.04,
+    "static": 0.03,
+    "head": 0.01,
+}
+
+PEOPLE = [
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36",
+]
+
+CRAWLERS = [
+    "Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)",
+    "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)",
+    "Twitterbot/1.0",
+    "WhatsApp/2.23.20.0",
+]
+
+API_PATHS = ["/api/v1/public/shorten/", "/docs", "/openapi.json", "/health"]
+STATIC_PATHS = ["/favicon.ico", "/robots.txt", "/apple-touch-icon.png"]
+
+EVENT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "dox", "edge", "viewer-request.input.json"
+)
+
+
+def make_items(num_links, og_share, rng):
+    """Low level shorturl items, og links get a pre-rendered page half the time"""
+
+    items = []
+    og_page = base64.b64encode(
+        gzip.compress(b"<!DOCTYPE html>" + b"<meta>" * 800, mtime=0)
+    ).decode("ascii")
+
+    for index in range(num_links):
+        slug = f"u/link-{index}" if index % 5 == 0 else f"{index:08x}"
+        is_og = rng.random() < og_share
+
+        item = {
+            "PK": {"S": slug},
+            "ShortId": {"S": slug},
+            "TargetUrl": {"S": f"https://currentclient.com/landing/{index}?src=sms"},
+            "RedirectType": {"S": "OG_HTML" if is_og else "DIRECT"},
+            "RedirectStatus": {"S": "301"},
+            "CachePolicy": {"S": "DEFAULT"},
+            "CreatedAt": {"S": "2024-03-01T10:00:00.000000+00:00"},
+            "TTL": {"N": "1900000000"},
+        }
+
+        if is_og:
+            item["OgSettings"] = {
+                "M": {
+                    "OgTitle": {"S": f"Landing {index}"},
+                    "OgDescription": {"S": "Book a free 30 minute consult"},
+                    "OgUrl": {"S": f"https://currentclient.com/landing/{index}"},
+                    "OgImage": {"S": "https://cdn.currentclient.com/og/landing.png"},
+                    "OgImageAlt": {"NULL": True},
+                }
+            }
+
+            if index % 2:
+                item["OgPage"] = {"M": {"Version": {"S": "1"}, "Gzip": {"S": og_page}}}
+
+        items.append(item)
+
+    return items
+
+
+def make_event(template, uri, method="GET", user_agent=None):
+    """Viewer-request event for the uri"""
+
+    event = json.loads(template)
+    request = event["Records"][0]["cf"]["request"]
+    request["uri"] = uri
+    request["method"] = method
+    request["querystring"] = ""
+    request["headers"]["user-agent"] = [{"key": "User-Agent", "value": user_agent}]
+    request["headers"]["accept-encoding"] = [
+        {"key": "Accept-Encoding", "value": "gzip, deflate, br"}
+    ]
+
+    return event
+
+
+def make_events(items, num_requests, zipf_s, rng):
+    """Events with slugs drawn from a zipf distribution over the links"""
+
+    with open(EVENT_PATH, encoding="utf-8") as event_file:
+        template = event_file.read()
+
+    slugs = [item["PK"]["S"] for item in items]
+    og_slugs = [item["PK"]["S"] for item in items if "OgSettings" in item]
+    weights = [1 / rank ** zipf_s for rank in range(1, len(slugs) + 1)]
+
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=num_requests)
+    drawn = iter(rng.choices(slugs, weights=weights, k=num_requests))
+
+    # The cold request of a container is a lookup, not a static file
+    kinds[0] = "redirect"
+
+    events = []
+
+    for kind in kinds:
+        person = rng.choice(PEOPLE)
+
+        if kind == "redirect":
+            event = make_event(template, f"/{next(drawn)}", user_agent=person)
+        elif kind == "miss":
+            uri = f"/{rng.getrandbits(40):010x}"
+            event = make_event(template, uri, user_agent=person)
+        elif kind == "crawler":
+            uri = f"/{rng.choice(og_slugs)}"
+            event = make_event(template, uri, user_agent=rng.choice(CRAWLERS))
+        elif kind == "api":
+            event = make_event(template, rng.choice(API_PATHS), user_agent=person)
+        elif kind == "static":
+            event = make_event(template, rng.choice(STATIC_PATHS), user_agent=person)
+        else:
+            event = make_event(template, f"/{next(drawn)}", "HEAD", user_agent=person)
+
+        events.append(event)
+
+    return events
+
+
+# Runs in the fresh interpreter of a container
+CONTAINER = """
+import json, resource, sys, time, tracemalloc
+
+events_path, endpoint_url, mode, alloc_sample = sys.argv[1:5]
+
+with open(events_path, encoding="utf-8") as events_file:
+    events = [json.loads(line) for line in events_file]
+
+started = time.perf_counter()
+
+from edge import config
+config.DEFAULTS.update(
+    LOOKUP_MODE=mode,
+    REPLICA_ENDPOINTS={"us-east-1": endpoint_url},
+    LOG_SAMPLE_RATE=0.0,
+    LOG_SLOW_MS=None,
+)
+from edge import main
+
+init = time.perf_counter() - started
+
+latencies = []
+
+for event in events:
+    request_started = time.perf_counter()
+    main.handler_dev(event, None)
+    latencies.append(time.perf_counter() - request_started)
+
+allocations = []
+tracemalloc.start()
+
+for event in events[: int(alloc_sample)]:
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    main.handler_dev(event, None)
+    _, peak = tracemalloc.get_traced_memory()
+    allocations.append(peak - before)
+
+retained, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+
+print(json.dumps({
+    "init": init,
+    "latencies": latencies,
+    "allocations": allocations,
+    "retained": retained,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "cache": main.REDIRECT_CACHE.stats(),
+    "clicks": main.CLICKS.stats(),
+}))
+"""
+
+
+def percentile(values, percent):
+    """Nearest rank percentile"""
+
+    ordered = sorted(values)
+    index = min(int(len(ordered) * percent / 100), len(ordered) - 1)
+
+    return ordered[index]
+
+
+def run_container(events_path, endpoint_url, mode, alloc_sample):
+    """Replay the events in a fresh interpreter"""
+
+    env = {
+        **os.environ,
+        **FAKE_CREDENTIALS,
+        "AWS_REGION": "us-east-1",
+        "AWS_LAMBDA_FUNCTION_NAME": "us-east-1.cc-east-dev-lambda-kurteyt-edge",
+    }
+
+    argv = [events_path, endpoint_url, mode, str(alloc_sample)]
+
+    output = subprocess.run(
+        [sys.executable, "-c", CONTAINER, *argv],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def report(index, result):
+    """Print the numbers of a container"""
+
+    latencies_ms = [seconds * 1000 for seconds in result["latencies"]]
+    first, warming, warm = latencies_ms[0], latencies_ms[1:101], latencies_ms[101:]
+    rss_mb = result["rss_kb"] / 1024
+
+    print(f"container {index}")
+    print(
+        f"  cold    init {result['init'] * 1000:7.1f} ms"
+        f"   first request {first:7.3f} ms"
+    )
+
+    for name, values in [("warming", warming), ("warm", warm)]:
+        if values:
+            print(
+                f"  {name:<7} p50 {percentile(values, 50):7.3f} ms"
+                f"   p95 {percentile(values, 95):7.3f} ms"
+                f"   p99 {percentile(values, 99):7.3f} ms"
+                f"   n={len(values)}"
+            )
+
+    if result["allocations"]:
+        allocations_kb = [size / 1024 for size in result["allocations"]]
+        print(
+            f"  allocs  p50 {percentile(allocations_kb, 50):7.1f} KB"
+            f"   p99 {percentile(allocations_kb, 99):7.1f} KB per request"
+            f"   retained {result['retained'] / 1024:8.1f} KB"
+        )
+
+    print(
+        f"  memory  peak rss {rss_mb:6.1f} MB of {MEMORY_BUDGET_MB} MB"
+        f" ({rss_mb / MEMORY_BUDGET_MB:.0%})"
+    )
+    print(f"  cache   {result['cache']}")
+    print(f"  clicks  {result['clicks']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay edge events")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--links", type=int, default=5000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="zipf exponent")
+    parser.add_argument("--og-share", type=float, default=0.2)
+    parser.add_argument("--containers", type=int, default=3)
+    parser.add_argument("--mode", default="sigv4", help="edge LOOKUP_MODE")
+    parser.add_argument("--latency", type=float, default=0.003, help="dynamodb s")
+    parser.add_argument("--alloc-sample", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--events", help="jsonl of events to replay")
+    parser.add_argument("--dump", help="write the generated events as jsonl")
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    links = make_items(args.links, args.og_share, generator)
+
+    if args.events:
+        with open(args.events, encoding="utf-8") as replay_file:
+            replay_events = [json.loads(line) for line in replay_file]
+    else:
+        replay_events = make_events(links, args.requests, args.zipf, generator)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as out:
+        out.writelines(json.dumps(event) + "\n" for event in replay_events)
+
+    if args.dump:
+        os.replace(out.name, args.dump)
+        print(f"Wrote {len(replay_events)} events to {args.dump}")
+        sys.exit(0)
+
+    server = LocalDynamoDB(items=links, latency=args.latency).start()
+
+    print(
+        f"{len(replay_events)} events, {args.links} links, zipf {args.zipf}, "
+        f"mode {args.mode}, dynamodb latency {args.latency * 1000:.1f} ms"
+    )
+
+    try:
+        results = [
+            run_container(out.name, server.endpoint_url, args.mode, args.alloc_sample)
+            for _ in range(args.containers)
+        ]
+    finally:
+        server.stop()
+        os.unlink(out.name)
+
+    for container_index, container_result in enumerate(results):
+        report(container_index, container_result)
+
+    print(
+        "cold init median "
+        f"{statistics.median(result['init'] for result in results) * 1000:.1f} ms, "
+        f"dynamodb requests {server.requests}"
+    )
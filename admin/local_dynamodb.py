@@ -0,0 +1,342 @@
+"""
+Local DynamoDB
+
+In-process http stand-in for dynamodb, enough of the json protocol for the edge
+lookups and the api in the benchmarks: GetItem, PutItem with attribute_not_exists,
+DeleteItem, Scan, UpdateItem with ADD and SET actions, BatchGetItem,
+BatchWriteItem, and TransactWriteItems of puts with attribute_not_exists, on
+items keyed by PK. The table name is ignored and requests arent checked beyond
+having a signature. Batch requests leave the first keys or items unprocessed
+while the unprocessed counter lasts, to exercise the retries of clients.
+
+Usage:
+    server = LocalDynamoDB(items=[{"PK": {"S": "abc"}, ...}], latency=0.005)
+    server.start()
+    settings["REPLICA_ENDPOINTS"] = {"us-east-1": server.endpoint_url}
+    server.unprocessed = 3
+    server.stop()
+
+    python admin/local_dynamodb.py --port 8000
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Credentials for clients of the stand-in, any value is accepted
+FAKE_CREDENTIALS = {
+    "AWS_ACCESS_KEY_ID": "AKIDLOCALDYNAMODB",
+    "AWS_SECRET_ACCESS_KEY": "local-dynamodb-secret",
+    "AWS_SESSION_TOKEN": "local-dynamodb-token",
+}
+
+# Redirect record as the api stores it, in low level format
+SAMPLE_ITEM = {
+    "PK": {"S": "u/spring-campaign"},
+    "ShortId": {"S": "u/spring-campaign"},
+    "TargetUrl": {"S": "https://currentclient.com/campaigns/spring?utm_source=sms"},
+    "RedirectType": {"S": "DIRECT"},
+    "RedirectStatus": {"S": "301"},
+    "CachePolicy": {"S": "DEFAULT"},
+    "CreatedAt": {"S": "2024-03-01T10:00:00.000000+00:00"},
+    "NumDaysUntilExpire": {"N": "90"},
+    "TTL": {"N": "1900000000"},
+}
+
+
+def project(item, params):
+    """Apply a ProjectionExpression of aliased top level names"""
+
+    expression = params.get("ProjectionExpression")
+
+    if not expression:
+        return item
+
+    names = params.get("ExpressionAttributeNames", {})
+    attributes = [
+        names.get(name.strip(), name.strip()) for name in expression.split(",")
+    ]
+
+    return {name: item[name] for name in attributes if name in item}
+
+
+def update(item, params):
+    """Apply an UpdateExpression of ADD and SET actions on top level names"""
+
+    names = params.get("ExpressionAttributeNames", {})
+    values = params.get("ExpressionAttributeValues", {})
+
+    # "ADD #n :n SET #ttl = :ttl" => [("ADD", "#n :n"), ("SET", "#ttl = :ttl")]
+    tokens = re.split(r"\b(ADD|SET)\b", params["UpdateExpression"])
+
+    for action, clauses in zip(tokens[1::2], tokens[2::2]):
+        for clause in clauses.split(","):
+            name, value = re.split(r"\s*=\s*|\s+", clause.strip(), maxsplit=1)
+            name = names.get(name, name)
+
+            if action == "SET":
+                item[name] = values[value]
+                continue
+
+            number = item.get(name, {"N": "0"})["N"]
+            item[name] = {"N": str(int(number) + int(values[value]["N"]))}
+
+    return item
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Thread per connection, with room for a pool opening many at once"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class LocalDynamoDB:
+    """
+    LocalDynamoDB
+
+    Serves the items from a thread until stopped
+    """
+
+    def __init__(self, items=None, latency=0.0, port=0):
+        """
+        Stand-in server
+
+        Args:
+            items: Low level items, keyed by their PK
+            latency: Seconds added to every response
+            port: Port to listen on, 0 for any free port
+
+        """
+        self.items = {item["PK"]["S"]: item for item in items or []}
+        self.latency = latency
+        self.requests = 0
+        # Keys or items left unprocessed by the next batch requests
+        self.unprocessed = 0
+        self._lock = threading.Lock()
+        self._server = StandInServer(("127.0.0.1", port), self._make_handler())
+        self._thread = None
+
+    @property
+    def endpoint_url(self):
+        """Url to pass as the endpoint of a client"""
+
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread"""
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def join(self):
+        """Wait on the serving thread"""
+        self._thread.join()
+
+    def stop(self):
+        """Stop serving"""
+
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _take_unprocessed(self, requests):
+        """Split off the requests to leave unprocessed, call with the lock held"""
+
+        count = min(self.unprocessed, len(requests))
+        self.unprocessed -= count
+
+        return requests[count:], requests[:count]
+
+    def handle(self, target, params):
+        """Answer an operation, returns the status and response body"""
+
+        with self._lock:
+            self.requests += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if target == "GetItem":
+            item = self.items.get(params["Key"]["PK"]["S"])
+            return 200, {"Item": project(item, params)} if item else {}
+
+        if target == "PutItem":
+            item = params["Item"]
+            with self._lock:
+                if (
+                    "attribute_not_exists" in params.get("ConditionExpression", "")
+                    and item["PK"]["S"] in self.items
+                ):
+                    return 400, {
+                        "__type": "com.amazonaws.dynamodb.v20120810"
+                        "#ConditionalCheckFailedException",
+                        "message": "The conditional request failed",
+                    }
+                self.items[item["PK"]["S"]] = item
+            return 200, {}
+
+        if target == "DeleteItem":
+            with self._lock:
+                self.items.pop(params["Key"]["PK"]["S"], None)
+            return 200, {}
+
+        if target == "UpdateItem":
+            pk = params["Key"]["PK"]["S"]
+            with self._lock:
+                item = self.items.setdefault(pk, {"PK": {"S": pk}})
+                update(item, params)
+                attributes = dict(item)
+            if params.get("ReturnValues", "NONE") == "NONE":
+                return 200, {}
+            return 200, {"Attributes": attributes}
+
+        if target == "BatchGetItem":
+            return self._batch_get_item(params)
+
+        if target == "BatchWriteItem":
+            return self._batch_write_item(params)
+
+        if target == "TransactWriteItems":
+            return self._transact_write_items(params)
+
+        if target == "Scan":
+            items = [project(item, params) for item in list(self.items.values())]
+            return 200, {
+                "Items": items,
+                "Count": len(items),
+                "ScannedCount": len(items),
+            }
+
+        return 400, {
+            "__type": "com.amazon.coral.validate#UnknownOperationException",
+            "message": f"Unknown operation: {target}",
+        }
+
+    def _batch_get_item(self, params):
+        """Read the keys of every table, leaving some unprocessed"""
+
+        responses, unprocessed = {}, {}
+
+        with self._lock:
+            for table, request in params["RequestItems"].items():
+                keys, skipped = self._take_unprocessed(request["Keys"])
+                items = [self.items.get(key["PK"]["S"]) for key in keys]
+                responses[table] = [project(item, request) for item in items if item]
+                if skipped:
+                    unprocessed[table] = {**request, "Keys": skipped}
+
+        return 200, {"Responses": responses, "UnprocessedKeys": unprocessed}
+
+    def _batch_write_item(self, params):
+        """Put and delete items of every table, leaving some unprocessed"""
+
+        unprocessed = {}
+
+        with self._lock:
+            for table, requests in params["RequestItems"].items():
+                requests, skipped = self._take_unprocessed(requests)
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        self.items[item["PK"]["S"]] = item
+                    else:
+                        key = request["DeleteRequest"]["Key"]
+                        self.items.pop(key["PK"]["S"], None)
+                if skipped:
+                    unprocessed[table] = skipped
+
+        return 200, {"UnprocessedItems": unprocessed}
+
+    def _transact_write_items(self, params):
+        """Put all items or none, cancelled when one already exists"""
+
+        puts = [request["Put"] for request in params["TransactItems"]]
+
+        with self._lock:
+            reasons = [
+                {
+                    "Code": "ConditionalCheckFailed",
+                    "Message": "The conditional request failed",
+                }
+                if "attribute_not_exists" in put.get("ConditionExpression", "")
+                and put["Item"]["PK"]["S"] in self.items
+                else {"Code": "None"}
+                for put in puts
+            ]
+
+            if any(reason["Code"] != "None" for reason in reasons):
+                return 400, {
+                    "__type": "com.amazonaws.dynamodb.v20120810"
+                    "#TransactionCanceledException",
+                    "Message": "Transaction cancelled, please refer "
+                    "cancellation reasons for specific reasons",
+                    "CancellationReasons": reasons,
+                }
+
+            for put in puts:
+                self.items[put["Item"]["PK"]["S"]] = put["Item"]
+
+        return 200, {}
+
+    def _make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Dynamodb json protocol over http/1.1 keep-alive"""
+
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, dont wait on delayed acks
+            disable_nagle_algorithm = True
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """Operation from X-Amz-Target"""
+
+                length = int(self.headers.get("Content-Length", 0))
+                params = json.loads(self.rfile.read(length) or b"{}")
+
+                authorization = self.headers.get("Authorization", "")
+
+                if not authorization.startswith("AWS4-HMAC"):
+                    status, body = 400, {
+                        "__type": "com.amazon.coral#MissingAuthenticationToken",
+                        "message": "Request is missing a signature",
+                    }
+                else:
+                    target = self.headers.get("X-Amz-Target", "").rpartition(".")[2]
+                    status, body = stand_in.handle(target, params)
+
+                payload = json.dumps(body).encode("utf-8")
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/x-amz-json-1.0")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *_):  # pylint: disable=arguments-differ
+                """Quiet"""
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local dynamodb stand-in")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    local = LocalDynamoDB(items=[SAMPLE_ITEM], latency=args.latency, port=args.port)
+
+    print(f"Serving on {local.endpoint_url}, ctrl-c to stop")
+
+    try:
+        local.start().join()
+    except KeyboardInterrupt:
+        local.stop()
@@ -0,0 +1,87 @@
+"""
+Rotate stateless key
+
+Add or retire keys of stateless links in module-edge/edge/stateless_keys.json,
+and print the settings the api signs with.
+
+Every key in the file is accepted by the edge, the api signs with
+STATELESS_KEY_ID. To rotate without breaking issued links:
+    1. --add a key and deploy the edge, it now accepts the old and new key
+    2. set STATELESS_KEYS and STATELESS_KEY_ID of the api to the printed values
+    3. once the links signed with the old key have expired, --retire it and
+       deploy both again
+
+Usage:
+    python admin/rotate_stateless_key.py --stage dev --add
+    python admin/rotate_stateless_key.py --stage dev --retire k1700000000
+    python admin/rotate_stateless_key.py --stage dev
+"""
+
+import argparse
+import base64
+import json
+import os
+import secrets
+import time
+
+KEYS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "module-edge", "edge", "stateless_keys.json"
+)
+
+SECRET_BYTES = 32
+
+
+def read_keys():
+    """Keys by stage, empty if there is no file yet"""
+
+    if not os.path.exists(KEYS_PATH):
+        return {}
+
+    with open(KEYS_PATH, encoding="utf-8") as keys_file:
+        return json.load(keys_file)
+
+
+def write_keys(keys):
+    """Write the keys file, readable by the owner only"""
+
+    with open(
+        os.open(KEYS_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+        "w",
+        encoding="utf-8",
+    ) as keys_file:
+        json.dump(keys, keys_file, indent=2, sort_keys=True)
+
+
+def new_key():
+    """kid from the time it was made, so the newest sorts last"""
+
+    kid = f"k{int(time.time())}"
+    secret = base64.urlsafe_b64encode(secrets.token_bytes(SECRET_BYTES))
+
+    return kid, secret.rstrip(b"=").decode("ascii")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rotate stateless link keys")
+    parser.add_argument("--stage", required=True, choices=["dev", "prd"])
+    parser.add_argument("--add", action="store_true", help="add a new key")
+    parser.add_argument("--retire", help="kid of a key to remove")
+    args = parser.parse_args()
+
+    all_keys = read_keys()
+    stage_keys = all_keys.setdefault(args.stage, {})
+
+    if args.add:
+        key_id, key_secret = new_key()
+        stage_keys[key_id] = key_secret
+        print(f"Added {key_id}")
+
+    if args.retire:
+        stage_keys.pop(args.retire)
+        print(f"Retired {args.retire}")
+
+    if args.add or args.retire:
+        write_keys(all_keys)
+
+    print(f"STATELESS_KEYS='{json.dumps(stage_keys)}'")
+    print(f"STATELESS_KEY_ID={max(stage_keys, default='')}")
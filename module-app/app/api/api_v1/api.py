@@ -5,13 +5,25 @@ Setup api router, including routers from domains
 """
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import shorturl
+from app.api.api_v1.endpoints import internal, shorturl
+from app.core.settings import settings
+
+# Single shorturl routes, on the async dynamodb layer for the container
+if settings.ASYNC_DB:
+    from app.api.api_v1.endpoints import shorturl_async as single
+else:
+    single = shorturl
 
 api_router = APIRouter()
 
-api_router.include_router(shorturl.router, prefix="/shorten", tags=["shorturl"])
+api_router.include_router(single.router, prefix="/shorten", tags=["shorturl"])
+api_router.include_router(shorturl.shared, prefix="/shorten", tags=["shorturl"])
+api_router.include_router(internal.router, prefix="/internal", tags=["internal"])
 
 api_public_router = APIRouter()
 api_public_router.include_router(
-    shorturl.public, prefix="/public/shorten", tags=["public"]
+    single.public, prefix="/public/shorten", tags=["public"]
+)
+api_public_router.include_router(
+    shorturl.shared_public, prefix="/public/shorten", tags=["public"]
 )
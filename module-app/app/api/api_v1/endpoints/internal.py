@@ -0,0 +1,31 @@
+"""
+Internal API
+
+Routes for operating the service, behind the same auth as the api
+"""
+
+from typing import Any
+
+from fastapi import APIRouter
+
+from app import database
+from app.core.logger import get_logger
+from app.core.settings import settings
+
+router = APIRouter()
+
+LOGGER = get_logger(__name__)
+
+
+@router.get("/pools")
+def read_pools() -> Any:
+    """Usage of the dynamodb connection pools"""
+    LOGGER.debug("Function: read_pools")
+
+    # saturated_calls count calls that found the pool full
+    return {
+        "dynamodb": database.get_pool_stats(),
+        "dynamodb_async": (
+            database.get_async_pool_stats() if settings.ASYNC_DB else {}
+        ),
+    }
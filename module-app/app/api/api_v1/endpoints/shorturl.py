@@ -1,18 +1,36 @@
 """ShortUrl API"""
 
-from typing import Any
+from typing import Any, Dict, List
 
 from fastapi import APIRouter, HTTPException, Path, status
 
 from app import crud, exceptions, models
+from app.core import stateless
 from app.core.logger import get_logger
 from app.core.responses import common_400_and_500
+from app.core.settings import settings
 
 router = APIRouter()
 public = APIRouter()
 
+# Routes served the same with ASYNC_DB, they dont read or write single records
+shared = APIRouter()
+shared_public = APIRouter()
+
 LOGGER = get_logger(__name__)
 
+# Keys stateless links are signed with
+STATELESS_KEYS = stateless.load_keys(settings.STATELESS_KEYS)
+
+# Links signed per request
+STATELESS_MAX_LINKS = 1000
+
+# Shorturls created per batch request, lambda has 29 seconds behind api gateway
+BATCH_CREATE_MAX_ITEMS = 1000
+
+# Shorturls read per batch request
+BATCH_GET_MAX_IDS = 1000
+
 
 @public.post(
     "/",
@@ -38,6 +56,10 @@ def create_shorturl(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Short url already exists",
         )
+    except exceptions.ShortIdReserved as err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=err.message
+        )
     except (exceptions.ConvertToJsonFailed, exceptions.CreateRecordFailed) as err:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
@@ -47,6 +69,128 @@ def create_shorturl(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@shared.post(
+    "/stateless",
+    response_model=List[models.StatelessLink],
+    responses=common_400_and_500,
+)
+def create_stateless_links(
+    *,
+    links_in: List[models.StatelessLinkCreate],
+) -> Any:
+    """
+    Sign stateless links, the edge redirects them without a record
+
+    Nothing is stored, a link cant be changed or deleted before it expires
+    """
+    LOGGER.debug(f"Function: create_stateless_links | count: {len(links_in)}")
+
+    if len(links_in) > STATELESS_MAX_LINKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {STATELESS_MAX_LINKS} links per request",
+        )
+
+    try:
+
+        return [
+            models.convert_statelesslinkcreate_to_statelesslink(
+                create_model=link_in,
+                key_id=settings.STATELESS_KEY_ID,
+                keys=STATELESS_KEYS,
+            )
+            for link_in in links_in
+        ]
+
+    except exceptions.StatelessKeyMissing as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
+        )
+    except Exception as err:
+        LOGGER.exception(err)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@shared_public.post(
+    "/batch",
+    response_model=List[models.ShortUrlBatchCreateResult],
+    responses=common_400_and_500,
+)
+def create_shorturls(
+    *,
+    shorturls_in: List[Dict[str, Any]],
+) -> Any:
+    """
+    Create shorturl records in a batch
+
+    Each item is a ShortUrlCreate. Returns a result for each item in the same
+    order, an invalid or failed item doesnt fail the request.
+    """
+    LOGGER.debug(f"Function: create_shorturls | count: {len(shorturls_in)}")
+
+    if len(shorturls_in) > BATCH_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_CREATE_MAX_ITEMS} shorturls per request",
+        )
+
+    try:
+
+        return crud.shorturl.create_shorturls(items_in=shorturls_in)
+
+    except exceptions.ConvertToJsonFailed as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
+        )
+    except Exception as err:
+        LOGGER.exception(err)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@shared.post(
+    "/batch-get",
+    response_model=List[models.ShortUrlBatchGetResult],
+    responses=common_400_and_500,
+)
+def read_shorturls(
+    *,
+    batch_get_in: models.ShortUrlBatchGet,
+) -> Any:
+    """Get shorturl records for many ids, in the same order as the ids"""
+    LOGGER.debug(f"Function: read_shorturls | count: {len(batch_get_in.ShortIds)}")
+
+    if len(batch_get_in.ShortIds) > BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_GET_MAX_IDS} ids per request",
+        )
+
+    try:
+
+        shorturls_in_db = crud.shorturl.get_shorturls(short_ids=batch_get_in.ShortIds)
+
+    except (exceptions.GetRecordFailed,) as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
+        )
+    except Exception as err:
+        LOGGER.exception(err)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return [
+        models.ShortUrlBatchGetResult(
+            ShortId=short_id,
+            Found=shorturl_in_db is not None,
+            ShortUrl=(
+                models.ShortUrl(**shorturl_in_db.model_dump())
+                if shorturl_in_db
+                else None
+            ),
+        )
+        for short_id, shorturl_in_db in zip(batch_get_in.ShortIds, shorturls_in_db)
+    ]
+
+
 @router.get(
     "/{id}",
     response_model=models.ShortUrl,
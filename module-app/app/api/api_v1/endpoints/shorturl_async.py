@@ -0,0 +1,136 @@
+"""
+ShortUrl API Async
+
+The single shorturl routes of the ShortUrl API as coroutines on the async
+dynamodb layer, served instead of them with ASYNC_DB. A request waiting on
+dynamodb holds no thread.
+"""
+
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Path, status
+
+from app import crud, exceptions, models
+from app.core.logger import get_logger
+from app.core.responses import common_400_and_500
+
+router = APIRouter()
+public = APIRouter()
+
+LOGGER = get_logger(__name__)
+
+
+@public.post(
+    "/",
+    response_model=models.ShortUrl,
+    responses=common_400_and_500,
+)
+async def create_shorturl(
+    *,
+    shorturl_in: models.ShortUrlCreate,
+) -> Any:
+    """Create shorturl record"""
+    LOGGER.debug("Function: create_shorturl")
+
+    try:
+
+        shorturl = await crud.shorturl_async.create_shorturl(obj_in_create=shorturl_in)
+
+        return shorturl
+
+    except exceptions.CreateRecordConditionFailed as err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Short url already exists",
+        )
+    except exceptions.ShortIdReserved as err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=err.message
+        )
+    except (exceptions.ConvertToJsonFailed, exceptions.CreateRecordFailed) as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
+        )
+    except Exception as err:
+        LOGGER.exception(err)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.get(
+    "/{id}",
+    response_model=models.ShortUrl,
+    responses=common_400_and_500,
+)
+async def read_shorturl(
+    *,
+    short_id: str = Path(..., alias="id"),
+) -> Any:
+    """Get shorturl record"""
+    LOGGER.debug(f"Function: read_shorturl | short_id: {short_id}")
+
+    # Get shorturl
+    return await _get_shorturl(short_id=short_id)
+
+
+@router.get(
+    "/u/{id}",
+    response_model=models.ShortUrl,
+    responses=common_400_and_500,
+)
+async def read_user_shorturl(
+    *,
+    short_id: str = Path(..., alias="id"),
+) -> Any:
+    """Get shorturl record for user defined urls"""
+    LOGGER.debug(f"Function: read_user_shorturl | short_id: {short_id}")
+
+    # Add back the u since it got pulled out with the params
+    return await _get_shorturl(short_id=f"u/{short_id}")
+
+
+@router.delete(
+    "/{id}",
+    response_model=models.ShortUrl,
+    responses=common_400_and_500,
+)
+async def delete_shorturl(
+    *,
+    short_id: str = Path(..., alias="id"),
+) -> Any:
+    """Delete shorturl record"""
+    LOGGER.debug(f"Function: delete_shorturl | short_id: {short_id}")
+
+    # Get shorturl
+    shorturl_in_db = await _get_shorturl(short_id=short_id)
+
+    # Delete the shorturl
+    try:
+        shorturl = await crud.shorturl_async.delete(db_obj=shorturl_in_db)
+
+    except exceptions.DeleteRecordFailed as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
+        )
+    except Exception as err:
+        LOGGER.exception(err)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return shorturl
+
+
+async def _get_shorturl(short_id: str) -> models.ShortUrlInDB:
+    """Get shorturl"""
+
+    try:
+
+        return await crud.shorturl_async.get_shorturl(short_id=short_id)
+
+    except (exceptions.RecordNotFound,) as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=err.message)
+    except (exceptions.GetRecordFailed,) as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=err.message
+        )
+    except Exception as err:
+        LOGGER.exception(err)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,265 @@
+"""
+Ids
+
+Short ids from a sequence, so generated ids dont collide with each other as the
+table grows. Sequence numbers are leased in blocks with one ADD on a counter
+item, ids then come from memory until the block runs out.
+
+Sequence numbers are mapped to ids with a keyed permutation, so ids dont give
+away the order or the number of links:
+    - a 4 round feistel network over 48 bits, with blake2b keyed per round as
+      the round function
+    - cycle walking, the network is applied again until the result is below
+      62^8, which makes it a permutation of the 8 character base62 ids
+    - base62, padded to 8 characters, the same length as the random ids
+
+Ids are drawn at random with secrets when there is no key, or when a lease
+fails, they then rely on the conditional put to catch collisions. Random and
+user chosen ids share the id space with sequence ids, so the conditional put is
+kept for every generated id.
+"""
+
+import hashlib
+import secrets
+import string
+import threading
+from typing import Callable, Optional
+
+from app.core.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+ID_LENGTH = 8
+ID_SPACE = len(ALPHABET) ** ID_LENGTH
+
+# 2^48 is the smallest even power of two above 62^8, 1.29 walks per id on average
+HALF_BITS = 24
+HALF_BYTES = HALF_BITS // 8
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+def random_id(size: int = ID_LENGTH) -> str:
+    """Random base62 id, from secrets"""
+
+    return "".join(secrets.choice(ALPHABET) for _ in range(size))
+
+
+def encode_base62(number: int, size: int = ID_LENGTH) -> str:
+    """Base62 of the number, padded to size"""
+
+    chars = []
+
+    for _ in range(size):
+        number, index = divmod(number, 62)
+        chars.append(ALPHABET[index])
+
+    return "".join(reversed(chars))
+
+
+def decode_base62(text: str) -> int:
+    """Number of a base62 id"""
+
+    number = 0
+
+    for char in text:
+        number = number * 62 + ALPHABET.index(char)
+
+    return number
+
+
+class Permutation:
+    """
+    Permutation
+
+    Keyed bijection of [0, 62^8), sequence number => id number.
+
+    Usage:
+        permutation = Permutation(b"secret")
+        short_id = encode_base62(permutation.permute(42))
+    """
+
+    def __init__(self, key: bytes, rounds: int = ROUNDS):
+        """
+        Permutation keyed with key
+
+        Args:
+            key: Secret, hashed into a key for every round
+            rounds: Feistel rounds, 4 is the least with no known shortcut
+
+        """
+
+        # Keyed once, copied for every call so the key isnt hashed per id
+        self._rounds = [
+            hashlib.blake2b(
+                key=hashlib.blake2b(
+                    key, person=b"kurteyt.ids", salt=bytes([index])
+                ).digest(),
+                digest_size=HALF_BYTES,
+            )
+            for index in range(rounds)
+        ]
+
+    def _encrypt(self, number: int) -> int:
+        left, right = number >> HALF_BITS, number & HALF_MASK
+
+        for keyed in self._rounds:
+            mac = keyed.copy()
+            mac.update(right.to_bytes(HALF_BYTES, "big"))
+            left, right = right, left ^ int.from_bytes(mac.digest(), "big")
+
+        return (left << HALF_BITS) | right
+
+    def _decrypt(self, number: int) -> int:
+        left, right = number >> HALF_BITS, number & HALF_MASK
+
+        for keyed in reversed(self._rounds):
+            mac = keyed.copy()
+            mac.update(left.to_bytes(HALF_BYTES, "big"))
+            left, right = right ^ int.from_bytes(mac.digest(), "big"), left
+
+        return (left << HALF_BITS) | right
+
+    def permute(self, number: int) -> int:
+        """Id number of a sequence number below 62^8"""
+
+        if not 0 <= number < ID_SPACE:
+            raise ValueError(f"Sequence number out of range: {number}")
+
+        number = self._encrypt(number)
+
+        while number >= ID_SPACE:
+            number = self._encrypt(number)
+
+        return number
+
+    def invert(self, number: int) -> int:
+        """Sequence number of an id number, the inverse of permute"""
+
+        if not 0 <= number < ID_SPACE:
+            raise ValueError(f"Id number out of range: {number}")
+
+        number = self._decrypt(number)
+
+        while number >= ID_SPACE:
+            number = self._decrypt(number)
+
+        return number
+
+
+class IdAllocator:
+    """
+    IdAllocator
+
+    Hands out ids from leased blocks of the sequence, safe to call from any
+    thread. The lease is the only round trip, once per block_size ids. Numbers
+    left in a block when the process ends are skipped, not reused.
+
+    Usage:
+        allocator = IdAllocator(lease=lease_block, key=b"secret")
+        short_id = allocator.allocate()
+    """
+
+    def __init__(
+        self,
+        lease: Callable[[int], int],
+        key: Optional[bytes] = None,
+        block_size: int = 1000,
+    ):
+        """
+        Allocator of ids
+
+        Args:
+            lease: Called with the block size, adds it to the counter and returns
+                the new value, the block is the block size numbers below it
+            key: Secret of the permutation, ids are random without it
+            block_size: Sequence numbers leased at once
+
+        """
+        self.lease = lease
+        self.permutation = Permutation(key) if key else None
+        self.block_size = block_size
+
+        # Next number of the block and the end of it, exclusive
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.leases = 0
+        self.allocated = 0
+        self.fallbacks = 0
+
+    def _next_number(self) -> Optional[int]:
+        """Next sequence number, leasing a block if needed, None if it fails"""
+
+        with self._lock:
+            if self._next >= self._end:
+                try:
+                    end = self.lease(self.block_size)
+                except Exception as err:
+                    LOGGER.exception(err)
+                    self.fallbacks += 1
+                    return None
+
+                self._next, self._end = end - self.block_size, end
+                self.leases += 1
+
+            number = self._next
+            self._next += 1
+            self.allocated += 1
+
+        return number
+
+    def _encode(self, number: Optional[int]) -> str:
+        """Id of a sequence number, random without one or past the id space"""
+
+        if number is None or number >= ID_SPACE:
+            return random_id()
+
+        return encode_base62(self.permutation.permute(number))
+
+    def allocate(self) -> str:
+        """A new id, random when there is no key or the lease failed"""
+
+        if self.permutation is None:
+            return random_id()
+
+        return self._encode(self._next_number())
+
+    def try_allocate(self) -> Optional[str]:
+        """
+        A new id without blocking, for the event loop
+
+        None when it would lease a block or wait on another thread, which may be
+        leasing one, allocate off the loop then
+        """
+
+        if self.permutation is None:
+            return random_id()
+
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        try:
+            if self._next >= self._end:
+                return None
+
+            number = self._next
+            self._next += 1
+            self.allocated += 1
+        finally:
+            self._lock.release()
+
+        return self._encode(number)
+
+    def stats(self):
+        """Counters of the allocator"""
+
+        return {
+            "leases": self.leases,
+            "allocated": self.allocated,
+            "fallbacks": self.fallbacks,
+            "remaining": self._end - self._next,
+        }
@@ -0,0 +1,398 @@
+"""
+Render
+
+Renders the og interstitial page when a shorturl is written, so the edge can
+return the stored, compressed page instead of rendering it on every hit. The
+template and renderer are the same as in module-edge/edge.
+"""
+
+import base64
+import gzip
+import html
+import re
+
+import brotli
+
+# Bump with OG_TEMPLATE_VERSION in module-edge/edge/og.py whenever the
+# template changes, the edge renders pages stored for other versions itself
+OG_TEMPLATE_VERSION = "1"
+
+PLACEHOLDER_PATTERN = re.compile(r"\$([A-Z][A-Z_]*)")
+SCRIPT_PATTERN = re.compile(r"<script\b.*?</script>", re.IGNORECASE | re.DOTALL)
+
+# Value inside a double quoted js string in a script block
+JS_STRING_ESCAPES = str.maketrans(
+    {
+        "\\": "\\\\",
+        '"': '\\"',
+        "'": "\\'",
+        "\n": "\\n",
+        "\r": "\\r",
+        "<": "\\u003C",
+        ">": "\\u003E",
+        "&": "\\u0026",
+        "\u2028": "\\u2028",
+        "\u2029": "\\u2029",
+    }
+)
+
+
+def escape_html(value):
+    """Escape for html text and quoted attribute values"""
+    return html.escape(str(value), quote=True)
+
+
+def escape_js_string(value):
+    """Escape for a quoted js string"""
+    return str(value).translate(JS_STRING_ESCAPES)
+
+
+class CompiledTemplate:
+    """
+    CompiledTemplate
+
+    Template with $NAME placeholders, compiled once. Placeholders in a script
+    block are js escaped, everywhere else html escaped.
+
+    Usage:
+        OG_TEMPLATE = render.CompiledTemplate(HTML_TEMPLATE)
+        html_page = OG_TEMPLATE.render({"OG_TITLE": "Title"})
+    """
+
+    def __init__(self, template):
+        """
+        Compile the template
+
+        Args:
+            template: Template string with $NAME placeholders
+
+        """
+        script_spans = [match.span() for match in SCRIPT_PATTERN.finditer(template)]
+
+        # Static segments with an empty string where each slot goes
+        self._parts = []
+        # (index in parts, placeholder name, escape function)
+        self._slots = []
+
+        position = 0
+
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            self._parts.append(template[position : match.start()])
+
+            in_script = any(start <= match.start() < end for start, end in script_spans)
+            escape = escape_js_string if in_script else escape_html
+
+            self._slots.append((len(self._parts), match.group(1), escape))
+            self._parts.append("")
+
+            position = match.end()
+
+        self._parts.append(template[position:])
+
+        self.names = frozenset(name for _, name, _ in self._slots)
+
+    def render(self, values):
+        """Render with values keyed by placeholder name, missing values are empty"""
+
+        parts = self._parts[:]
+
+        for index, name, escape in self._slots:
+            value = values.get(name)
+            if value:
+                parts[index] = escape(value)
+
+        return "".join(parts)
+
+
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8" />
+    <meta name="viewport" content="width=device-width" />
+    <!-- OG settings -->
+    <meta property="og:title" content="$OG_TITLE" />
+    <meta property="og:description" content="$OG_DESCRIPTION" />
+    <meta property="og:url" content="$OG_URL" />
+    <meta property="og:image" content="$OG_IMAGE" />
+    <meta property="og:image:alt" content="$OG_IMAGE_ALT" />
+    <meta property="og:type" content="website" />
+    <title>CurrentClient</title>
+    <link
+      rel="stylesheet"
+      href="node_modules/modern-normalize/modern-normalize.css"
+    />
+
+    <link rel="preconnect" href="https://fonts.googleapis.com" />
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin />
+    <link
+      href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap"
+      rel="stylesheet"
+    />
+
+    <link
+      href="https://fonts.googleapis.com/css2?family=Caveat&display=swap"
+      rel="stylesheet"
+    />
+
+    <script>
+      window.onload = function () {
+        // similar behavior as clicking on a link
+        setTimeout(() => {
+          // window.location.href = "$REDIRECT_URL";
+          window.location = "$REDIRECT_URL";
+        }, 3000);
+      };
+    </script>
+    <style>
+      html {
+        font-size: 16px;
+      }
+
+      body {
+        margin: 0px;
+        font-family: "Inter", sans-serif;
+      }
+
+      .gotobutton {
+        text-align: center;
+        display: block;
+        text-decoration: none;
+        background-color: white;
+        color: #6b7280;
+        padding: 0.5rem 1rem;
+        border-radius: 4px;
+        font-size: 0.75rem;
+      }
+      .gotobutton:hover {
+        background-color: #f4f4f5;
+      }
+
+      .gotobutton:active {
+        background-color: #d1d5db;
+      }
+
+      .gotobutton:visited {
+        background-color: #ccc;
+      }
+
+      .signature {
+        text-align: right;
+        font-size: 24px;
+        font-family: "Caveat", cursive;
+      }
+
+      .spinner-2 {
+        width: 50px;
+        height: 50px;
+        border-radius: 50%;
+        background: radial-gradient(farthest-side, #3b82f6 94%, #0000) top/8px
+            8px no-repeat,
+          conic-gradient(#0000 30%, #3b82f6);
+        -webkit-mask: radial-gradient(
+          farthest-side,
+          #0000 calc(100% - 8px),
+          #000 0
+        );
+        animation: s3 1s infinite linear;
+      }
+
+      @keyframes s3 {
+        100% {
+          transform: rotate(1turn);
+        }
+      }
+
+      .aspect-ratio-box {
+        width: 100%;
+        position: relative;
+      }
+
+      .aspect-ratio-box::after {
+        display: block;
+        content: "";
+        padding-bottom: 52.6%;
+      }
+
+      .aspect-ratio-box img {
+        position: absolute;
+        left: 0;
+        object-fit: cover;
+        top: 0;
+        width: 100%;
+        height: 100%;
+      }
+
+      .container {
+        padding-left: 1.5rem;
+        padding-right: 1.5rem;
+      }
+
+      .card {
+        position: relative;
+        overflow: hidden;
+        background: white;
+        border-width: 1px;
+        border-radius: 8px;
+        border-style: solid;
+        border-color: #e5e7eb;
+      }
+
+      .card + .card {
+        margin-top: 2rem;
+      }
+    </style>
+  </head>
+  <body>
+    <div style="min-height: 100vh">
+      <!-- colored header -->
+      <div
+        style="
+          background-color: #eff6ff;
+          height: 36vh;
+          border-bottom-width: 1px;
+          border-style: solid;
+          border-color: #e5e7eb;
+        "
+      ></div>
+
+      <!-- upmargined form -->
+      <div
+        style="
+          display: flex;
+          flex-direction: column;
+          align-items: center;
+          padding-left: 2rem;
+          padding-right: 2rem;
+        "
+      >
+        <div style="width: 100%; max-width: 32rem; margin-top: -32vh">
+          <!-- Text header -->
+          <div
+            style="
+              font-size: 1rem;
+              padding-top: 0.5rem;
+              text-align: left;
+              margin-bottom: 2rem;
+            "
+          >
+            <p style="font-size: 1rem; font-weight: 700; margin: 0">
+              $OG_TITLE
+            </p>
+            <p
+              style="
+                font-size: 0.8rem;
+                font-weight: 400;
+                margin: 0;
+                color: #6b7280;
+                padding-top: 0.5rem;
+              "
+            >
+              $OG_DESCRIPTION
+            </p>
+          </div>
+
+          <!-- Image header -->
+          <div class="card">
+            <div class="aspect-ratio-box">
+              <img src="$OG_IMAGE" alt="$OG_IMAGE_ALT" />
+            </div>
+          </div>
+
+          <!-- Loading -->
+
+          <div class="card">
+            <div
+              class="container"
+              style="padding-top: 1rem; padding-bottom: 2rem"
+            >
+              <p style="font-size: 1rem; text-align: center">
+                Preparing your information...
+              </p>
+              <div style="margin-top: 2rem">
+                <div style="margin: auto" class="spinner-2"></div>
+              </div>
+            </div>
+          </div>
+
+          <!-- Redirect -->
+
+          <div class="card">
+            <div
+              class="container"
+              style="padding-top: 1rem; padding-bottom: 1rem"
+            >
+              <a href="$REDIRECT_URL" class="gotobutton"
+                >Click here if you are not redirected
+                <span>&#10230;</span>
+              </a>
+            </div>
+          </div>
+        </div>
+
+        <div>
+          <p
+            style="
+              font-size: smaller;
+              margin-top: 2rem;
+              margin-bottom: 1rem;
+              color: #6b7280;
+            "
+          >
+            Running on
+            <strong
+              ><a
+                style="text-decoration: none; color: #6b7280 !important"
+                href="https://currentclient.com"
+                >CurrentClient</a
+              ></strong
+            >
+          </p>
+        </div>
+      </div>
+    </div>
+  </body>
+</html>
+
+
+"""
+
+
+OG_TEMPLATE = CompiledTemplate(HTML_TEMPLATE)
+
+
+def render_og_page(target_url, og_settings):
+    """Render the og interstitial page"""
+
+    og_settings = og_settings or {}
+
+    return OG_TEMPLATE.render(
+        {
+            "OG_TITLE": og_settings.get("OgTitle"),
+            "OG_DESCRIPTION": og_settings.get("OgDescription"),
+            "OG_URL": og_settings.get("OgUrl"),
+            "OG_IMAGE": og_settings.get("OgImage"),
+            "OG_IMAGE_ALT": og_settings.get("OgImageAlt"),
+            "REDIRECT_URL": target_url,
+        }
+    )
+
+
+def compress_og_page(html_page):
+    """
+    Compressed bodies of the page, base64 encoded as the edge returns them
+
+    Returns a dict with the template version and a body for each encoding
+    """
+
+    page_bytes = html_page.encode("utf-8")
+
+    # mtime=0 so the same page always compresses to the same body
+    gzipped = gzip.compress(page_bytes, compresslevel=9, mtime=0)
+    brotlied = brotli.compress(page_bytes, quality=11)
+
+    return {
+        "Version": OG_TEMPLATE_VERSION,
+        "Gzip": base64.b64encode(gzipped).decode("ascii"),
+        "Br": base64.b64encode(brotlied).decode("ascii"),
+    }
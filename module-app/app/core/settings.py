@@ -1,6 +1,6 @@
 """Settings"""
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -22,5 +22,30 @@ class Settings(BaseSettings):
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = None
 
+    # Stateless links, kid => base64url secret as json, the same keys as the
+    # edge stateless_keys.json for the stage. Signed with STATELESS_KEY_ID.
+    STATELESS_KEYS: Dict[str, str] = {}
+    STATELESS_KEY_ID: Optional[str] = None
+
+    # Generated short ids, a secret of at least 32 random characters to permute
+    # the sequence with. Ids are random without it, see app/core/ids.py.
+    SHORT_ID_KEY: Optional[str] = None
+    SHORT_ID_BLOCK_SIZE: int = 1000
+
+    # Boto3 dynamodb clients, one per region shared by every table. The pool
+    # covers the 40 threads sync routes run on, timeouts are per attempt.
+    DYNAMODB_MAX_POOL_CONNECTIONS: int = 50
+    DYNAMODB_CONNECT_TIMEOUT: float = 2.0
+    DYNAMODB_READ_TIMEOUT: float = 5.0
+    DYNAMODB_RETRY_MODE: str = "adaptive"
+    DYNAMODB_MAX_ATTEMPTS: int = 5
+    DYNAMODB_TCP_KEEPALIVE: bool = True
+
+    # Serve the single shorturl routes on the asyncio dynamodb layer, for the
+    # container deployment. Lambda keeps the sync layer.
+    ASYNC_DB: bool = False
+    ASYNC_DB_MAX_CONNECTIONS: int = 200
+    ASYNC_DB_TIMEOUT: float = 10.0
+
 
 settings = Settings()
@@ -1,3 +1,8 @@
 """Crud"""
 
+from app.core.settings import settings
+
 from .crud_shorturl import shorturl
+
+if settings.ASYNC_DB:
+    from .crud_shorturl_async import shorturl_async
@@ -4,7 +4,7 @@ CRUD Base
 Provides common crud operations.
 """
 
-from typing import Any, Dict, Generic, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
@@ -91,6 +91,50 @@ class CRUDBase(Generic[ModelType, ModelInDBType, CreateSchemaType, UpdateSchemaT
 
         return obj_in_db
 
+    def create_many(
+        self,
+        *,
+        objs_in_db: List[ModelInDBType],
+        condition_expression: database.ConditionExpression = None,
+    ) -> List[database.WriteStatus]:
+        """
+        Create records for the supplied objects in batches
+
+        With a condition expression the records are written in transactions, so
+        the condition is checked for each record. Without one they are batch
+        written, overwriting existing records.
+
+        Args:
+            objs_in_db: Model types, PKs must be unique
+            condition_expression: Conditional expression on each write
+
+        Returns the write status of each object, in the same order
+
+        Raises:
+            ConvertToJsonFailed
+
+        """
+        LOGGER.debug(
+            (
+                f"Function: create_many | Table: {self.table_name} |",
+                f"count: {len(objs_in_db)}",
+            )
+        )
+
+        try:
+            # Get to json dicts to be used by dynamodb client
+            records = [jsonable_encoder(obj_in_db) for obj_in_db in objs_in_db]
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.ConvertToJsonFailed()
+
+        if condition_expression:
+            return self.db.transact_put_items(
+                records=records, condition_expression=condition_expression
+            )
+
+        return self.db.batch_write_items(records=records)
+
     def read_item_by_pk(
         self, *, partition: str, is_full_key: bool = False
     ) -> ModelInDBType:
@@ -136,6 +180,43 @@ class CRUDBase(Generic[ModelType, ModelInDBType, CreateSchemaType, UpdateSchemaT
             LOGGER.exception(err)
             raise err
 
+    def read_many(
+        self, *, partitions: List[str], is_full_key: bool = False
+    ) -> List[Optional[ModelInDBType]]:
+        """
+        Get records for many ids in batches
+
+        Args:
+            partitions: Ids to be used by model.make_pk
+            is_full_key: Flag to idenity the provided keys as complete or fallback to
+                making keys with model.make_pk
+
+        Returns the record of each id in the same order, None if not found
+
+        Raises:
+            GetRecordFailed
+
+        """
+        LOGGER.debug(f"Function: read_many | count: {len(partitions)}")
+
+        pks_full = partitions
+
+        if not is_full_key:
+            pks_full = [self.model.make_pk(partition) for partition in partitions]
+
+        records = self.db.batch_get_by_pk(pks=pks_full)
+
+        # Convert records to models, once per record for repeated ids
+        models_in_db = {}
+
+        for record in records:
+            if record and record["PK"] not in models_in_db:
+                models_in_db[record["PK"]] = self.model_in_db(**record)
+
+        return [
+            models_in_db.get(record["PK"]) if record else None for record in records
+        ]
+
     def update(
         self,
         *,
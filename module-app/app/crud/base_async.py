@@ -0,0 +1,195 @@
+"""
+CRUD Base Async
+
+Provides common crud operations on the async dynamodb layer.
+"""
+
+from typing import Any, Dict, Generic, Optional, Type, Union
+
+from fastapi.encoders import jsonable_encoder
+
+from app import database, exceptions
+from app.core import logger, util
+from app.crud.base import CreateSchemaType, ModelInDBType, ModelType, UpdateSchemaType
+
+LOGGER = logger.get_logger(__name__)
+
+
+class AsyncCRUDBase(
+    Generic[ModelType, ModelInDBType, CreateSchemaType, UpdateSchemaType]
+):
+    """
+    Async CRUD base
+
+    The single record methods of CRUDBase as coroutines, raising the same
+    exceptions.
+
+    Usage:
+        AsyncCRUDBase[
+            models.Kurteyt,
+            models.KurteytInDB,
+            models.KurteytCreate,
+            models.KurteytUpdate,
+        ]
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        model_in_db: Type[ModelInDBType],
+        table: str,
+    ):
+        """
+        CRUD object with default methods to Create, Read, Update, Delete (CRUD).
+
+        Args:
+            model: A model class
+            model_in_db: A model class
+            table: A Dynamodb Table Name
+
+        """
+        self.model = model
+        self.model_in_db = model_in_db
+        self.table_name = table
+        self.db = database.AsyncDynamoDB(table=table)
+
+    async def create(
+        self,
+        *,
+        obj_in_db: ModelInDBType,
+        condition_expression: database.ConditionExpression = None,
+    ) -> ModelInDBType:
+        """
+        Create record for the supplied object
+
+        Args:
+            obj_in_db: A model type
+            condition_expression: Conditional expression on the write
+
+        Raises:
+            ConvertToJsonFailed
+            CreateRecordConditionFailed
+            CreateRecordFailed
+
+        """
+        LOGGER.debug(
+            f"Function: create | Table: {self.table_name} | obj_in_db: {obj_in_db}"
+        )
+
+        try:
+            # Get to json dict to be used by dynamodb client
+            obj_in_db_json = jsonable_encoder(obj_in_db)
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.ConvertToJsonFailed()
+
+        await self.db.put_item(
+            record=obj_in_db_json, condition_expression=condition_expression
+        )
+
+        return obj_in_db
+
+    async def read_item_by_pk(
+        self, *, partition: str, is_full_key: bool = False
+    ) -> ModelInDBType:
+        """
+        Get record for id
+
+        Args:
+            partition: Id to be used by model.make_pk
+            is_full_key: Flag to idenity the provided keys as complete or fallback to
+                making keys with model.make_pk
+
+        Raises:
+            GetRecordFailed
+            RecordNotFound
+
+        """
+        LOGGER.debug(f"Function: read_item_by_pk | partition: {partition}")
+
+        pk_full = partition
+
+        if not is_full_key:
+            pk_full = self.model.make_pk(partition)
+
+        # Get record
+        record = await self.db.get_item_by_pk(pk=pk_full)
+
+        if not record:
+            raise exceptions.RecordNotFound()
+
+        # Convert record to model
+        return self.model_in_db(**record)
+
+    async def update(
+        self,
+        *,
+        db_obj: ModelInDBType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        return_values: Optional[
+            database.UpdateReturnValues
+        ] = database.UpdateReturnValues.updated_new,
+    ) -> Dict:
+        """
+        Update record
+
+        Args:
+            db_obj: A model type
+            obj_in: A model type or a dictionary
+
+        Raises:
+            ConvertToJsonFailed
+            UpdateRecordFailed
+
+        """
+        LOGGER.debug(f"Function: update | Table: {self.table_name}")
+
+        # Get update object in right format
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+
+        # Convert to json
+        try:
+            db_obj_data = jsonable_encoder(db_obj)
+            update_data = jsonable_encoder(update_data)
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.ConvertToJsonFailed()
+
+        update_data["UpdatedAt"] = util.get_current_datetime()
+
+        return await self.db.update_item(
+            pk=db_obj_data["PK"],
+            update_data=update_data,
+            return_values=return_values,
+        )
+
+    async def delete(
+        self,
+        *,
+        db_obj: ModelInDBType,
+    ) -> Any:
+        """
+        Delete record
+
+        Args:
+            db_obj: A model type
+
+        Raises:
+            ConvertToJsonFailed
+            DeleteRecordFailed
+
+        """
+        LOGGER.debug(f"Function: delete | Table: {self.table_name}")
+
+        try:
+            db_obj_data = jsonable_encoder(db_obj)
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.ConvertToJsonFailed()
+
+        await self.db.delete_item(pk=db_obj_data["PK"])
+
+        return db_obj
@@ -5,15 +5,26 @@ Provides shorturls crud operations.
 """
 
 from os import environ
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
 
 from app import database, exceptions, models
+from app.core import ids, render
 from app.core.logger import get_logger
+from app.core.settings import settings
 from app.crud.base import CRUDBase
 
 LOGGER = get_logger(__name__)
 
 KURTEYT_TABLE: str = environ.get("KURTEYT_TABLE", "")
 
+# Counter item the short id sequence is leased from, # cant be in a short id
+SEQUENCE_PK = "SEQ#shorturl"
+
+# Writes of a generated short id, drawing a new id when it already exists
+GENERATED_ID_ATTEMPTS = 3
+
 
 class CRUDShortUrl(
     CRUDBase[
@@ -29,6 +40,30 @@ class CRUDShortUrl(
     Methods to manage shorturls. Inherits from base crud to reuse common patterns.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        key = settings.SHORT_ID_KEY
+
+        self.id_allocator = ids.IdAllocator(
+            lease=self.lease_short_ids,
+            key=key.encode("utf-8") if key else None,
+            block_size=settings.SHORT_ID_BLOCK_SIZE,
+        )
+
+    def lease_short_ids(self, block_size: int) -> int:
+        """
+        Lease a block of the short id sequence, one ADD on the counter item
+
+        Returns the end of the block, exclusive
+
+        Raises:
+            UpdateRecordFailed
+
+        """
+
+        return self.db.increment_counter(pk=SEQUENCE_PK, amount=block_size)
+
     def get_shorturl(self, short_id: str) -> models.ShortUrlInDB:
         """
         Get shorturl
@@ -45,6 +80,50 @@ class CRUDShortUrl(
 
         return shorturl_in_db
 
+    def get_shorturls(
+        self, *, short_ids: List[str]
+    ) -> List[Optional[models.ShortUrlInDB]]:
+        """
+        Get shorturls in batches
+
+        Returns the shorturl of each id in the same order, None if not found
+
+        Raises:
+            GetRecordFailed
+
+        """
+
+        cleaned_short_ids = [
+            models.run_format_short_id(short_id) for short_id in short_ids
+        ]
+
+        return self.read_many(partitions=cleaned_short_ids)
+
+    def build_og_page(self, *, obj_in_db: models.ShortUrlInDB):
+        """
+        Pre-render the og page of an OG_HTML shorturl
+
+        Returns None for other redirect types or if rendering fails, the edge
+        then renders the page itself
+        """
+
+        if obj_in_db.RedirectType != models.RedirectTypeEnum.OG_HTML:
+            return None
+
+        try:
+            html_page = render.render_og_page(
+                target_url=str(obj_in_db.TargetUrl),
+                og_settings=(
+                    obj_in_db.OgSettings.model_dump() if obj_in_db.OgSettings else None
+                ),
+            )
+
+            return models.OgPage(**render.compress_og_page(html_page))
+
+        except Exception as err:
+            LOGGER.exception(err)
+            return None
+
     def create_shorturl(
         self, *, obj_in_create: models.ShortUrlCreate
     ) -> models.ShortUrl:
@@ -61,36 +140,212 @@ class CRUDShortUrl(
         """
         LOGGER.debug(f"Function: create_shorturl | obj_in_create: {obj_in_create}")
 
-        try:
+        # Only a generated id is drawn again when it already exists
+        is_chosen = bool(obj_in_create.ShortId)
+        attempts = 1 if is_chosen else GENERATED_ID_ATTEMPTS
 
-            # Prepare the shorturl create object by adding ids and keys
-            obj_in_db = models.convert_shorturlcreate_to_shorturlindb(
-                create_model=obj_in_create
-            )
+        # Add conditional, as to not overwrite this broadcast if already existing
+        condition_expression = database.ConditionExpression(
+            Attribute="PK",
+            Operator=database.ConditionExpressionOperator.NOT_EXISTS,
+        )
 
-            # Add conditional, as to not overwrite this broadcast if already existing
-            condition_expression = database.ConditionExpression(
-                Attribute="PK",
-                Operator=database.ConditionExpressionOperator.NOT_EXISTS,
-            )
+        for attempt in range(attempts):
+            try:
+                if not is_chosen:
+                    obj_in_create.ShortId = self.id_allocator.allocate()
+
+                # Prepare the shorturl create object by adding ids and keys
+                obj_in_db = models.convert_shorturlcreate_to_shorturlindb(
+                    create_model=obj_in_create
+                )
+
+                # Render the og page now instead of on every hit at the edge
+                obj_in_db.OgPage = self.build_og_page(obj_in_db=obj_in_db)
+
+                obj_in_db_res = self.create(
+                    obj_in_db=obj_in_db, condition_expression=condition_expression
+                )
 
-            obj_in_db_res = self.create(
-                obj_in_db=obj_in_db, condition_expression=condition_expression
+                # Return object
+                return obj_in_db_res
+
+            except (exceptions.CreateRecordConditionFailed,) as err:
+                if attempt + 1 < attempts:
+                    LOGGER.warning(f"Generated short id exists: {obj_in_db.ShortId}")
+                    continue
+
+                LOGGER.exception(err)
+                raise err
+            except (
+                exceptions.ConvertToJsonFailed,
+                exceptions.CreateRecordFailed,
+                Exception,
+            ) as err:
+                LOGGER.exception(err)
+                raise err
+
+    def create_shorturls(
+        self, *, items_in: List[Dict[str, Any]]
+    ) -> List[models.ShortUrlBatchCreateResult]:
+        """
+        Create shorturl records in a batch
+
+        Items are validated in one pass, an invalid item doesnt stop the others.
+        Items are written in transactions, so an existing shorturl isnt
+        overwritten, items with a generated ShortId that already exists get a
+        new one and are written again.
+
+        Args:
+            items_in: ShortUrlCreate dicts
+
+        Returns a result for each item, in the same order
+
+        Raises:
+            ConvertToJsonFailed
+
+        """
+        LOGGER.debug(f"Function: create_shorturls | count: {len(items_in)}")
+
+        results = {}
+
+        # (index, obj_in_db, is_chosen) to write
+        pending = []
+        pks = set()
+
+        for index, item_in in enumerate(items_in):
+            try:
+                obj_in_create = models.ShortUrlCreate.model_validate(item_in)
+                is_chosen = bool(obj_in_create.ShortId)
+
+                if not is_chosen:
+                    obj_in_create.ShortId = self.id_allocator.allocate()
+
+                obj_in_db = models.convert_shorturlcreate_to_shorturlindb(
+                    create_model=obj_in_create
+                )
+
+                # Generated ids colliding within the batch are drawn again
+                while not is_chosen and obj_in_db.PK in pks:
+                    obj_in_create.ShortId = self.id_allocator.allocate()
+                    obj_in_db = models.convert_shorturlcreate_to_shorturlindb(
+                        create_model=obj_in_create
+                    )
+
+            except ValidationError as err:
+                results[index] = self._batch_result(
+                    index,
+                    models.BatchCreateStatusEnum.INVALID,
+                    detail="; ".join(
+                        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                        for error in err.errors()
+                    ),
+                )
+                continue
+            except exceptions.ShortIdReserved as err:
+                results[index] = self._batch_result(
+                    index, models.BatchCreateStatusEnum.INVALID, detail=err.message
+                )
+                continue
+
+            if obj_in_db.PK in pks:
+                results[index] = self._batch_result(
+                    index,
+                    models.BatchCreateStatusEnum.INVALID,
+                    obj_in_db=obj_in_db,
+                    detail="Short url is in the batch more than once",
+                )
+                continue
+
+            pks.add(obj_in_db.PK)
+
+            # Render the og page now instead of on every hit at the edge
+            obj_in_db.OgPage = self.build_og_page(obj_in_db=obj_in_db)
+
+            pending.append((index, obj_in_db, is_chosen))
+
+        # Add conditional, as to not overwrite shorturls already existing
+        condition_expression = database.ConditionExpression(
+            Attribute="PK",
+            Operator=database.ConditionExpressionOperator.NOT_EXISTS,
+        )
+
+        for attempt in range(GENERATED_ID_ATTEMPTS):
+            if not pending:
+                break
+
+            statuses = self.create_many(
+                objs_in_db=[obj_in_db for _, obj_in_db, _ in pending],
+                condition_expression=condition_expression,
             )
 
-            # Return object
-            return obj_in_db_res
+            retry = []
 
-        except (exceptions.CreateRecordConditionFailed,) as err:
-            LOGGER.exception(err)
-            raise err
-        except (
-            exceptions.ConvertToJsonFailed,
-            exceptions.CreateRecordFailed,
-            Exception,
-        ) as err:
-            LOGGER.exception(err)
-            raise err
+            for (index, obj_in_db, is_chosen), write_status in zip(pending, statuses):
+                if (
+                    write_status == database.WriteStatus.condition_failed
+                    and not is_chosen
+                    and attempt + 1 < GENERATED_ID_ATTEMPTS
+                ):
+                    LOGGER.warning(f"Generated short id exists: {obj_in_db.ShortId}")
+                    retry.append((index, self._with_new_short_id(obj_in_db), False))
+                    continue
+
+                results[index] = self._batch_result(
+                    index,
+                    BATCH_CREATE_STATUSES[write_status],
+                    obj_in_db=obj_in_db,
+                )
+
+            pending = retry
+
+        return [results[index] for index in range(len(items_in))]
+
+    def _with_new_short_id(self, obj_in_db: models.ShortUrlInDB) -> models.ShortUrlInDB:
+        """Copy of the record under a newly generated short id"""
+
+        short_id = self.id_allocator.allocate()
+
+        return obj_in_db.model_copy(
+            update={
+                "ShortId": short_id,
+                "PK": models.ShortUrlBase.make_pk(short_id=short_id),
+            }
+        )
+
+    @staticmethod
+    def _batch_result(
+        index: int,
+        status: models.BatchCreateStatusEnum,
+        obj_in_db: Optional[models.ShortUrlInDB] = None,
+        detail: Optional[str] = None,
+    ) -> models.ShortUrlBatchCreateResult:
+        """Result of one item of a batch create"""
+
+        is_created = status == models.BatchCreateStatusEnum.CREATED
+
+        return models.ShortUrlBatchCreateResult(
+            Index=index,
+            Status=status,
+            ShortId=obj_in_db.ShortId if obj_in_db else None,
+            Detail=detail or BATCH_CREATE_DETAILS.get(status),
+            ShortUrl=(
+                models.ShortUrl(**obj_in_db.model_dump()) if is_created else None
+            ),
+        )
+
+
+# Batch write status => result status
+BATCH_CREATE_STATUSES = {
+    database.WriteStatus.written: models.BatchCreateStatusEnum.CREATED,
+    database.WriteStatus.condition_failed: models.BatchCreateStatusEnum.EXISTS,
+    database.WriteStatus.failed: models.BatchCreateStatusEnum.FAILED,
+}
+
+BATCH_CREATE_DETAILS = {
+    models.BatchCreateStatusEnum.EXISTS: "Short url already exists",
+    models.BatchCreateStatusEnum.FAILED: "Failed to create record",
+}
 
 
 shorturl = CRUDShortUrl(models.ShortUrl, models.ShortUrlInDB, KURTEYT_TABLE)
@@ -0,0 +1,113 @@
+"""
+CRUD ShortUrls Async
+
+Provides shorturls crud operations on the async dynamodb layer.
+"""
+
+import asyncio
+
+from app import database, exceptions, models
+from app.core.logger import get_logger
+from app.crud.base_async import AsyncCRUDBase
+from app.crud.crud_shorturl import GENERATED_ID_ATTEMPTS, KURTEYT_TABLE, shorturl
+
+LOGGER = get_logger(__name__)
+
+
+class AsyncCRUDShortUrl(
+    AsyncCRUDBase[
+        models.ShortUrl,
+        models.ShortUrlInDB,
+        models.ShortUrlCreate,
+        models.ShortUrlUpdate,
+    ]
+):
+    """
+    Async CRUD shorturls
+
+    The single shorturl methods of CRUDShortUrl as coroutines. Ids come from the
+    same allocator as the sync crud, so both share one leased block.
+    """
+
+    async def get_shorturl(self, short_id: str) -> models.ShortUrlInDB:
+        """
+        Get shorturl
+
+        Raises:
+            RecordNotFound
+            GetRecordFailed
+
+        """
+
+        cleaned_short_id = models.run_format_short_id(short_id)
+
+        return await self.read_item_by_pk(partition=cleaned_short_id)
+
+    async def allocate_short_id(self) -> str:
+        """A generated short id, leasing off the event loop when a block is due"""
+
+        short_id = shorturl.id_allocator.try_allocate()
+
+        if short_id is None:
+            # The lease is a blocking round trip, once per block
+            short_id = await asyncio.to_thread(shorturl.id_allocator.allocate)
+
+        return short_id
+
+    async def create_shorturl(
+        self, *, obj_in_create: models.ShortUrlCreate
+    ) -> models.ShortUrl:
+        """
+        Create shorturl record
+
+        Args:
+            obj_in_create: A ShortUrl Create model
+
+        Raises:
+            ConvertToJsonFailed
+            CreateRecordConditionFailed
+            CreateRecordFailed
+
+        """
+        LOGGER.debug(f"Function: create_shorturl | obj_in_create: {obj_in_create}")
+
+        # Only a generated id is drawn again when it already exists
+        is_chosen = bool(obj_in_create.ShortId)
+        attempts = 1 if is_chosen else GENERATED_ID_ATTEMPTS
+
+        # Add conditional, as to not overwrite the shorturl if already existing
+        condition_expression = database.ConditionExpression(
+            Attribute="PK",
+            Operator=database.ConditionExpressionOperator.NOT_EXISTS,
+        )
+
+        for attempt in range(attempts):
+            if not is_chosen:
+                obj_in_create.ShortId = await self.allocate_short_id()
+
+            # Prepare the shorturl create object by adding ids and keys
+            obj_in_db = models.convert_shorturlcreate_to_shorturlindb(
+                create_model=obj_in_create
+            )
+
+            # Render the og page now instead of on every hit at the edge, off the
+            # loop since brotli at quality 11 takes milliseconds
+            obj_in_db.OgPage = await asyncio.to_thread(
+                shorturl.build_og_page, obj_in_db=obj_in_db
+            )
+
+            try:
+                return await self.create(
+                    obj_in_db=obj_in_db, condition_expression=condition_expression
+                )
+            except exceptions.CreateRecordConditionFailed:
+                if attempt + 1 < attempts:
+                    LOGGER.warning(f"Generated short id exists: {obj_in_db.ShortId}")
+                    continue
+
+                raise
+
+        raise exceptions.CreateRecordFailed()
+
+
+shorturl_async = AsyncCRUDShortUrl(models.ShortUrl, models.ShortUrlInDB, KURTEYT_TABLE)
@@ -1,9 +1,30 @@
 """Database"""
 
+from app.core.settings import settings
+from app.database.codec import (
+    deserialize_item,
+    dumps as dynamodb_dumps,
+    loads as dynamodb_loads,
+    serialize_item,
+)
 from app.database.dynamodb import (
     ConditionExpression,
     ConditionExpressionOperator,
     DynamoDB,
+    Projection,
     UpdateReturnValues,
+    WriteStatus,
+    get_pool_stats,
+)
+from app.database.util import (
+    get_dynamodb_projection_syntax,
+    get_dynamodb_update_syntax,
 )
-from app.database.util import get_dynamodb_update_syntax
+
+# Aiohttp is only imported for the async layer, lambda keeps the sync one
+if settings.ASYNC_DB:
+    from app.database.dynamodb_async import (
+        AsyncDynamoDB,
+        close_pools,
+        get_pool_stats as get_async_pool_stats,
+    )
@@ -0,0 +1,214 @@
+"""
+Codec
+
+Convert dynamodb typed json to python values and back, the same codec as
+module-edge/edge/codec.py. Values are converted by dispatching on their type
+tag. Datetimes are only parsed when asked for, and only strings shaped like one
+are handed to the parser.
+
+Loaded types:
+    S => str, or datetime with parse_datetimes
+    N => int, or float with a fraction or exponent
+    B => bytes
+    BOOL => bool
+    NULL => None
+    M => dict
+    L => list
+    SS, NS, BS => set
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+# Only strings shaped like an iso datetime are handed to fromisoformat
+DATETIME_LENGTHS = frozenset([19, 20, 23, 24, 25, 26, 27, 29, 32])
+
+
+def _load_number(value):
+    """Numbers are ints unless they have a fraction or exponent"""
+
+    if "." in value or "e" in value or "E" in value:
+        return float(value)
+
+    return int(value)
+
+
+def _load_binary(value):
+    """Binary values are base64 in dynamodb json"""
+
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+
+    return base64.b64decode(value)
+
+
+def parse_datetime(value):
+    """Datetime from an iso formatted string, the string if it isnt one"""
+
+    if (
+        len(value) not in DATETIME_LENGTHS
+        or value[4:5] != "-"
+        or value[10:11] != "T"
+        or not value[:4].isdigit()
+    ):
+        return value
+
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+LOADERS = {
+    "S": lambda value: value,
+    "N": _load_number,
+    "B": _load_binary,
+    "BOOL": lambda value: value,
+    "NULL": lambda value: None,
+    "SS": set,
+    "NS": lambda values: {_load_number(value) for value in values},
+    "BS": lambda values: {_load_binary(value) for value in values},
+}
+
+
+def deserialize(attribute, parse_datetimes=False):
+    """
+    Convert a typed attribute value, {"S": "abc"} => "abc"
+
+    Raises:
+        ValueError for an attribute without a known type tag
+    """
+
+    for type_tag, value in attribute.items():
+        if type_tag == "M":
+            return deserialize_item(value, parse_datetimes)
+
+        if type_tag == "L":
+            return [deserialize(val, parse_datetimes) for val in value]
+
+        if type_tag == "S" and parse_datetimes:
+            return parse_datetime(value)
+
+        loader = LOADERS.get(type_tag)
+
+        if loader is None:
+            break
+
+        return loader(value)
+
+    raise ValueError(f"Unsupported attribute value: {attribute}")
+
+
+def deserialize_item(item, parse_datetimes=False):
+    """Convert a low level item to a python dict"""
+
+    return {
+        key: deserialize(attribute, parse_datetimes) for key, attribute in item.items()
+    }
+
+
+def _make_object_hook(parse_datetimes):
+    """
+    json object hook converting typed values as they are parsed
+
+    Objects are handed over innermost first, so M and L values are already
+    converted. A plain map whose only key is a type tag cant be told apart from a
+    typed value, use deserialize_item when the item positions are known.
+    """
+
+    string_loader = parse_datetime if parse_datetimes else LOADERS["S"]
+
+    def object_hook(dct):
+        if len(dct) != 1:
+            return dct
+
+        for type_tag, value in dct.items():
+            if type_tag in ("M", "L"):
+                return value
+            if type_tag == "S":
+                return string_loader(value) if isinstance(value, str) else dct
+
+            loader = LOADERS.get(type_tag)
+
+            return loader(value) if loader else dct
+
+        return dct
+
+    return object_hook
+
+
+OBJECT_HOOKS = {True: _make_object_hook(True), False: _make_object_hook(False)}
+
+
+def loads(content, parse_datetimes=False):
+    """
+    Load dynamodb json to python values
+
+    Typed values anywhere in the document are converted, so it takes get_item
+    responses, stream records and export lines alike
+    """
+
+    return json.loads(content, object_hook=OBJECT_HOOKS[parse_datetimes])
+
+
+def serialize(value):
+    """
+    Convert a python value to a typed attribute value, "abc" => {"S": "abc"}
+
+    Raises:
+        TypeError for values dynamodb cant store
+    """
+
+    # bool before int, bool is an int
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, (int, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, float):
+        return {"N": repr(value)}
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, dict):
+        return {"M": serialize_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {"L": [serialize(val) for val in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {"B": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, datetime):
+        return {"S": value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return _serialize_set(value)
+
+    raise TypeError(f"Unsupported type for dynamodb: {type(value).__name__}")
+
+
+def _serialize_set(values):
+    """Sets are string, number or binary sets, never empty"""
+
+    if values and all(isinstance(val, str) for val in values):
+        return {"SS": sorted(values)}
+    if values and all(
+        isinstance(val, (int, float, Decimal)) and not isinstance(val, bool)
+        for val in values
+    ):
+        return {"NS": sorted(str(val) for val in values)}
+    if values and all(isinstance(val, (bytes, bytearray)) for val in values):
+        return {"BS": sorted(base64.b64encode(val).decode("ascii") for val in values)}
+
+    raise TypeError("Sets must be non empty and all str, numbers or bytes")
+
+
+def serialize_item(item):
+    """Convert a python dict to a low level item"""
+
+    return {key: serialize(value) for key, value in item.items()}
+
+
+def dumps(item):
+    """Dump a python dict as a dynamodb json item"""
+
+    return json.dumps(serialize_item(item), separators=(",", ":"))
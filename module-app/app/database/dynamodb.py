@@ -5,16 +5,22 @@ All interactions with dynamodb, this handles all interactions with database
 
 """
 
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from os import environ
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple, Union
 
 import boto3
+from botocore.config import Config
 from pydantic.main import BaseModel
 
 from app import exceptions
 from app.core.logger import get_logger
-from app.database import util
+from app.core.settings import settings
+from app.database import codec, util
 
 # Setup boto3
 AWS_REGION = environ.get("AWS_REGION")
@@ -37,6 +43,72 @@ class BatchWriteOperations(str, Enum):
     delete = "DELETE"
 
 
+class WriteStatus(str, Enum):
+    """Outcome of writing one record of a batch"""
+
+    written = "WRITTEN"
+    condition_failed = "CONDITION_FAILED"
+    failed = "FAILED"
+
+
+# Items per request, dynamodb limits
+BATCH_WRITE_MAX_ITEMS = 25
+TRANSACT_WRITE_MAX_ITEMS = 100
+BATCH_GET_MAX_KEYS = 100
+
+# Chunks of a batch written or read at the same time
+BATCH_MAX_WORKERS = 8
+
+# Attempts for unprocessed or cancelled items, with jittered exponential backoff
+BATCH_MAX_ATTEMPTS = 6
+BATCH_BACKOFF_SECONDS = 0.05
+BATCH_BACKOFF_MAX_SECONDS = 2.0
+
+# Transaction cancellation reasons not worth another attempt
+TRANSACT_FINAL_REASONS = {"ConditionalCheckFailed", "ValidationError"}
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    """Split into lists of at most size items"""
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def get_backoff_seconds(attempt: int) -> float:
+    """Seconds to wait before another attempt, full jitter"""
+    cap = min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_SECONDS * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+def _backoff(attempt: int):
+    """Sleep before another attempt"""
+    time.sleep(get_backoff_seconds(attempt))
+
+
+class Projection(str, Enum):
+    """Named sets of attributes to read"""
+
+    full = "FULL"
+    redirect = "REDIRECT"
+
+
+# Attributes read by each projection, None reads the whole item
+PROJECTIONS = {
+    Projection.full: None,
+    Projection.redirect: [
+        "PK",
+        "TargetUrl",
+        "RedirectType",
+        "TTL",
+        "CreatedAt",
+        "UpdatedAt",
+        "OgSettings",
+        "OgPage",
+        "RedirectStatus",
+        "CachePolicy",
+    ],
+}
+
+
 class ConditionExpressionOperator(str, Enum):
     """Condition expression operators"""
 
@@ -57,36 +129,188 @@ class ConditionExpression(BaseModel):
 LOGGER = get_logger(__name__)
 
 
-# Lazy initialize boto3 resources
-RES_DYNAMODB = None
+def get_client_config() -> Config:
+    """Botocore config of the dynamodb clients, from the settings"""
+
+    return Config(
+        max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=settings.DYNAMODB_READ_TIMEOUT,
+        retries={
+            "mode": settings.DYNAMODB_RETRY_MODE,
+            "max_attempts": settings.DYNAMODB_MAX_ATTEMPTS,
+        },
+        tcp_keepalive=settings.DYNAMODB_TCP_KEEPALIVE,
+    )
 
 
-def _get_table(table: str) -> "boto3.resources.factory.dynamodb.Table":
+class PoolMetrics:
     """
-    Get dynamodb kurteyt table resource handle
+    PoolMetrics
+
+    Calls in flight on a client against the size of its connection pool. A call
+    holds one connection at a time, so calls past max_pool_connections find the
+    pool empty. Urllib3 doesnt block then, it opens a connection for the call
+    and closes it after, one handshake per call while saturated.
+
+    Usage:
+        metrics = PoolMetrics(max_connections=50)
+        metrics.register(client.meta.events)
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+
+        self._lock = threading.Lock()
+
+        # Counters
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.saturated_calls = 0
+        self.failed_calls = 0
+
+    def register(self, events):
+        """Count the calls of a client, from its event hooks"""
+
+        events.register("before-call.dynamodb", self.started)
+        events.register("after-call.dynamodb", self.finished)
+        events.register("after-call-error.dynamodb", self.failed)
+
+    def started(self, **_):
+        """Count a call sent"""
+
+        with self._lock:
+            self.calls += 1
+
+            if self.in_flight >= self.max_connections:
+                self.saturated_calls += 1
+
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self, **_):
+        """Count a call answered"""
+
+        with self._lock:
+            self.in_flight -= 1
+
+    def failed(self, **_):
+        """Count a call that raised"""
+
+        with self._lock:
+            self.in_flight -= 1
+            self.failed_calls += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and usage of the pool"""
+
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "calls": self.calls,
+            "saturated_calls": self.saturated_calls,
+            "failed_calls": self.failed_calls,
+        }
+
+
+# Lazy initialize boto3 handles, shared by every DynamoDB of a region and table.
+# The client under a resource is thread safe and holds the connection pool.
+RESOURCES: Dict[str, "boto3.resources.base.ServiceResource"] = {}
+TABLES: Dict[Tuple[str, str], "boto3.resources.factory.dynamodb.Table"] = {}
+# Low level clients for the batch operations, which send typed items from the
+# codec. The client of a resource converts python values on the way in and out,
+# so it would encode typed items a second time.
+CLIENTS: Dict[str, "botocore.client.BaseClient"] = {}
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+HANDLES_LOCK = threading.Lock()
+
+
+def _get_resource(region: str) -> "boto3.resources.base.ServiceResource":
+    """Dynamodb resource of the region, call with HANDLES_LOCK held"""
+
+    if region not in RESOURCES:
+        # A session per resource, the default session isnt thread safe
+        resource = boto3.session.Session().resource(
+            "dynamodb", region_name=region, config=get_client_config()
+        )
+
+        metrics = PoolMetrics(max_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS)
+        metrics.register(resource.meta.client.meta.events)
+
+        RESOURCES[region] = resource
+        POOL_METRICS[region] = metrics
+
+    return RESOURCES[region]
+
+
+def _get_client(region: str = AWS_REGION) -> "botocore.client.BaseClient":
+    """
+    Low level dynamodb client of the region, for typed items
 
     Raises:
         DatabaseConnectionError
 
     """
 
-    global RES_DYNAMODB  # pylint: disable=global-statement
+    if region in CLIENTS:
+        return CLIENTS[region]
 
-    if RES_DYNAMODB is None:
-        RES_DYNAMODB = (  # pylint: disable=redefined-outer-name,invalid-name
-            boto3.resource("dynamodb", region_name=AWS_REGION)
-        )
+    with HANDLES_LOCK:
+        if region in CLIENTS:
+            return CLIENTS[region]
 
-    try:
-        res_table: "boto3.resources.factory.dynamodb.Table" = RES_DYNAMODB.Table(table)
+        try:
+            client = boto3.session.Session().client(
+                "dynamodb", region_name=region, config=get_client_config()
+            )
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.DatabaseConnectionError()
+
+        metrics = PoolMetrics(max_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS)
+        metrics.register(client.meta.events)
+
+        POOL_METRICS[f"{region} batch"] = metrics
+        CLIENTS[region] = client
+
+    return CLIENTS[region]
+
+
+def _get_table(
+    table: str, region: str = AWS_REGION
+) -> "boto3.resources.factory.dynamodb.Table":
+    """
+    Get dynamodb table resource handle, one per table and region
+
+    Raises:
+        DatabaseConnectionError
 
-        return res_table
-    except (
-        RES_DYNAMODB.meta.client.exceptions.ResourceNotFoundException,
-        Exception,
-    ) as err:
-        LOGGER.exception(err)
-        raise exceptions.DatabaseConnectionError()
+    """
+
+    key = (table, region)
+
+    if key in TABLES:
+        return TABLES[key]
+
+    with HANDLES_LOCK:
+        if key in TABLES:
+            return TABLES[key]
+
+        try:
+            TABLES[key] = _get_resource(region).Table(table)
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.DatabaseConnectionError()
+
+    return TABLES[key]
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int]]:
+    """Pool metrics of the dynamodb clients, keyed by region or region batch"""
+
+    return {region: metrics.stats() for region, metrics in POOL_METRICS.items()}
 
 
 class DynamoDB:
@@ -101,17 +325,21 @@ class DynamoDB:
     def __init__(
         self,
         table: str,
+        region: str = AWS_REGION,
     ):
         """
         Interactions with
 
         Args:
             table: A Dynamodb Table Name
+            region: Region of the table
 
         """
         self.table_name = table
-        # Dynamodb Boto3 Table Resource
-        self.Table = _get_table(self.table_name)
+        # Dynamodb Boto3 Table Resource, shared with the other objects of the table
+        self.Table = _get_table(self.table_name, region)
+        # Low level client of the region, for the batch operations on typed items
+        self.client = _get_client(region)
 
     def put_item(
         self, *, record: Dict, condition_expression: ConditionExpression = None
@@ -155,12 +383,15 @@ class DynamoDB:
 
         return record
 
-    def get_item_by_pk(self, pk: str) -> Dict[Any, Any]:
+    def get_item_by_pk(
+        self, pk: str, projection: Projection = Projection.full
+    ) -> Dict[Any, Any]:
         """
         Dynamodb Table get_item
 
         Args:
             pk: PK for the record
+            projection: Named set of attributes to read
 
         Raises:
             GetRecordFailed
@@ -169,25 +400,27 @@ class DynamoDB:
         LOGGER.debug(
             (
                 f"Function: get_item_by_pk | Table: {self.table_name} |",
-                f"PK: {pk}",
+                f"PK: {pk} | projection: {projection}",
             )
         )
 
+        get_request = {"Key": {"PK": pk}}
+
+        attribute_names = PROJECTIONS[Projection(projection)]
+
+        if attribute_names:
+            (
+                projection_expression,
+                expression_names,
+            ) = util.get_dynamodb_projection_syntax(attribute_names)
+
+            get_request["ProjectionExpression"] = projection_expression
+            get_request["ExpressionAttributeNames"] = expression_names
+
         try:
 
             # Get Item
-            response = self.Table.get_item(
-                Key={"PK": pk}
-                # AttributesToGet=[
-                #     'string',
-                # ],
-                # ConsistentRead=True | False,
-                # ReturnConsumedCapacity='INDEXES' | 'TOTAL' | 'NONE',
-                # ProjectionExpression='string',
-                # ExpressionAttributeNames={
-                #     'string': 'string'
-                # }
-            )
+            response = self.Table.get_item(**get_request)
 
             record = response.get("Item", False)
 
@@ -197,6 +430,109 @@ class DynamoDB:
             LOGGER.exception(err)
             raise exceptions.GetRecordFailed()
 
+    def batch_get_by_pk(
+        self, pks: List[str], projection: Projection = Projection.full
+    ) -> List[Union[Dict[Any, Any], bool]]:
+        """
+        Dynamodb batch_get_item, 100 keys per request with requests in parallel
+
+        Keys a request leaves unprocessed are sent again with backoff
+
+        Args:
+            pks: PKs of the records, repeats are read once
+            projection: Named set of attributes to read
+
+        Returns the record of each PK in the same order, False if there is none
+
+        Raises:
+            GetRecordFailed
+
+        """
+        LOGGER.debug(
+            (
+                f"Function: batch_get_by_pk | Table: {self.table_name} |",
+                f"count: {len(pks)} | projection: {projection}",
+            )
+        )
+
+        unique_pks = list(dict.fromkeys(pks))
+        chunks = _chunks(unique_pks, BATCH_GET_MAX_KEYS)
+
+        if not chunks:
+            return []
+
+        keys_and_attributes = {}
+
+        attribute_names = PROJECTIONS[Projection(projection)]
+
+        if attribute_names:
+            (
+                projection_expression,
+                expression_names,
+            ) = util.get_dynamodb_projection_syntax(attribute_names)
+
+            keys_and_attributes["ProjectionExpression"] = projection_expression
+            keys_and_attributes["ExpressionAttributeNames"] = expression_names
+
+        records = {}
+
+        with ThreadPoolExecutor(
+            max_workers=min(BATCH_MAX_WORKERS, len(chunks))
+        ) as executor:
+            for chunk_records in executor.map(
+                lambda chunk: self._batch_get_chunk(chunk, keys_and_attributes),
+                chunks,
+            ):
+                records.update(chunk_records)
+
+        return [records.get(pk, False) for pk in pks]
+
+    def _batch_get_chunk(
+        self, chunk: List[str], keys_and_attributes: Dict
+    ) -> Dict[str, Dict[Any, Any]]:
+        """
+        Read up to 100 PKs, sending unprocessed keys again
+
+        Raises:
+            GetRecordFailed
+
+        """
+
+        client = self.client
+
+        pending = [{"PK": {"S": pk}} for pk in chunk]
+        records = {}
+
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt)
+
+            try:
+                response = client.batch_get_item(
+                    RequestItems={
+                        self.table_name: {"Keys": pending, **keys_and_attributes}
+                    }
+                )
+            except Exception as err:
+                LOGGER.exception(err)
+                raise exceptions.GetRecordFailed()
+
+            for item in response.get("Responses", {}).get(self.table_name, []):
+                record = codec.deserialize_item(item)
+                records[record["PK"]] = record
+
+            pending = (
+                response.get("UnprocessedKeys", {})
+                .get(self.table_name, {})
+                .get("Keys", [])
+            )
+
+            if not pending:
+                return records
+
+        LOGGER.error(f"Keys still unprocessed after retries: {len(pending)}")
+        raise exceptions.GetRecordFailed()
+
     def update_item(
         self,
         *,
@@ -250,6 +586,49 @@ class DynamoDB:
 
         return response.get("Attributes")
 
+    def increment_counter(
+        self, *, pk: str, amount: int, attribute: str = "Value"
+    ) -> int:
+        """
+        Dynamodb Table update_item adding to a counter item
+
+        The counter is created at 0 if missing. Concurrent calls each get their
+        own value back, so the value can be used to lease ranges.
+
+        Args:
+            pk: Partition key of the counter item
+            amount: Added to the counter
+            attribute: Number attribute of the counter
+
+        Returns the counter after adding
+
+        Raises:
+            UpdateRecordFailed
+
+        """
+
+        LOGGER.debug(
+            (
+                f"Function: increment_counter | Table: {self.table_name} |",
+                f"pk: {pk} | amount: {amount}",
+            )
+        )
+
+        try:
+            # Run db action
+            response = self.Table.update_item(
+                Key={"PK": pk},
+                UpdateExpression="ADD #counter :amount",
+                ExpressionAttributeNames={"#counter": attribute},
+                ExpressionAttributeValues={":amount": amount},
+                ReturnValues=UpdateReturnValues.updated_new,
+            )
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.UpdateRecordFailed()
+
+        return int(response["Attributes"][attribute])
+
     def delete_item(self, *, pk: str) -> Any:
         """
         Dynamodb Table delete_item
@@ -281,6 +660,223 @@ class DynamoDB:
 
         return pk
 
+    def batch_write_items(
+        self,
+        *,
+        records: List[Dict],
+        operation: BatchWriteOperations = BatchWriteOperations.put,
+    ) -> List[WriteStatus]:
+        """
+        Dynamodb batch_write_item, 25 records per request with requests in parallel
+
+        Records a request leaves unprocessed are sent again with backoff. Puts
+        overwrite existing records, there are no conditions on batch writes.
+
+        Args:
+            records: Json dictionaries, only PK is used for deletes
+            operation: Put or delete the records
+
+        Returns the status of each record, in the same order
+
+        """
+        LOGGER.debug(
+            (
+                f"Function: batch_write_items | Table: {self.table_name} |",
+                f"count: {len(records)} | operation: {operation}",
+            )
+        )
+
+        return self._write_chunks(
+            lambda chunk: self._batch_write_chunk(chunk, operation),
+            records,
+            BATCH_WRITE_MAX_ITEMS,
+        )
+
+    def transact_put_items(
+        self,
+        *,
+        records: List[Dict],
+        condition_expression: ConditionExpression,
+    ) -> List[WriteStatus]:
+        """
+        Dynamodb transact_write_items, 100 conditional puts per request with
+        requests in parallel
+
+        A record failing its condition cancels the transaction, the other records
+        are sent again without it. Transactions cost twice the write capacity of
+        batch writes.
+
+        Args:
+            records: Json dictionaries
+            condition_expression: Condition checked for each record
+
+        Returns the status of each record, in the same order
+
+        """
+        LOGGER.debug(
+            (
+                f"Function: transact_put_items | Table: {self.table_name} |",
+                f"count: {len(records)}",
+            )
+        )
+
+        dynamodb_condition_expression = self._convert_condition_expression(
+            condition_expression
+        )
+
+        return self._write_chunks(
+            lambda chunk: self._transact_put_chunk(
+                chunk, dynamodb_condition_expression
+            ),
+            records,
+            TRANSACT_WRITE_MAX_ITEMS,
+        )
+
+    @staticmethod
+    def _write_chunks(write_chunk, records: List[Dict], size: int) -> List[WriteStatus]:
+        """Write chunks in parallel, collecting the status of each record"""
+
+        statuses = [WriteStatus.failed] * len(records)
+
+        chunks = _chunks(list(enumerate(records)), size)
+
+        if not chunks:
+            return statuses
+
+        with ThreadPoolExecutor(
+            max_workers=min(BATCH_MAX_WORKERS, len(chunks))
+        ) as executor:
+            for chunk_statuses in executor.map(write_chunk, chunks):
+                for index, status in chunk_statuses.items():
+                    statuses[index] = status
+
+        return statuses
+
+    def _batch_write_chunk(
+        self, chunk: List, operation: BatchWriteOperations
+    ) -> Dict[int, WriteStatus]:
+        """Write up to 25 (index, record) pairs, sending unprocessed ones again"""
+
+        client = self.client
+
+        # PK => (index, request), unprocessed requests come back without an index
+        pending = {}
+
+        for index, record in chunk:
+            if BatchWriteOperations(operation) is BatchWriteOperations.delete:
+                request = {"DeleteRequest": {"Key": {"PK": {"S": record["PK"]}}}}
+            else:
+                request = {"PutRequest": {"Item": codec.serialize_item(record)}}
+
+            pending[record["PK"]] = (index, request)
+
+        statuses = {}
+
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt)
+
+            try:
+                response = client.batch_write_item(
+                    RequestItems={
+                        self.table_name: [request for _, request in pending.values()]
+                    }
+                )
+            except Exception as err:
+                LOGGER.exception(err)
+                break
+
+            unprocessed_pks = set()
+
+            for request in response.get("UnprocessedItems", {}).get(
+                self.table_name, []
+            ):
+                item = request.get("PutRequest", {}).get("Item") or request.get(
+                    "DeleteRequest", {}
+                ).get("Key")
+                unprocessed_pks.add(item["PK"]["S"])
+
+            for pk in list(pending):
+                if pk not in unprocessed_pks:
+                    statuses[pending.pop(pk)[0]] = WriteStatus.written
+
+            if not pending:
+                break
+
+        for index, _ in pending.values():
+            statuses[index] = WriteStatus.failed
+
+        return statuses
+
+    def _transact_put_chunk(
+        self, chunk: List, dynamodb_condition_expression: str
+    ) -> Dict[int, WriteStatus]:
+        """Put up to 100 (index, record) pairs in a transaction"""
+
+        client = self.client
+
+        pending = [(index, codec.serialize_item(record)) for index, record in chunk]
+        statuses = {}
+
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if not pending:
+                break
+
+            try:
+                client.transact_write_items(
+                    TransactItems=[
+                        {
+                            "Put": {
+                                "TableName": self.table_name,
+                                "Item": item,
+                                "ConditionExpression": dynamodb_condition_expression,
+                            }
+                        }
+                        for _, item in pending
+                    ]
+                )
+            except client.exceptions.TransactionCanceledException as err:
+                reasons = err.response.get("CancellationReasons") or []
+                retry = []
+
+                for position, (index, item) in enumerate(pending):
+                    code = (
+                        reasons[position].get("Code")
+                        if position < len(reasons)
+                        else None
+                    )
+
+                    if code == "ConditionalCheckFailed":
+                        statuses[index] = WriteStatus.condition_failed
+                    elif code in TRANSACT_FINAL_REASONS:
+                        statuses[index] = WriteStatus.failed
+                    else:
+                        retry.append((index, item))
+
+                # Records only cancelled because of others in the chunk are sent
+                # again right away, throttling and conflicts back off first
+                if not reasons or any(
+                    reason.get("Code") not in ("None", *TRANSACT_FINAL_REASONS)
+                    for reason in reasons
+                ):
+                    _backoff(attempt + 1)
+
+                pending = retry
+                continue
+            except Exception as err:
+                LOGGER.exception(err)
+                break
+
+            for index, _ in pending:
+                statuses[index] = WriteStatus.written
+
+            pending = []
+
+        for index, _ in pending:
+            statuses[index] = WriteStatus.failed
+
+        return statuses
+
     def _query(
         self,
         req_query: Dict,
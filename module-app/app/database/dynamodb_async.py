@@ -0,0 +1,487 @@
+"""
+DynamoDB Async
+
+The DynamoDB interface on asyncio, for the api served from a container, where a
+request waiting on dynamodb shouldnt hold a thread. Requests are signed with
+botocore and sent with an aiohttp session per endpoint, its pool of keep-alive
+connections is shared by the tables on the endpoint. Items are converted with
+the codec.
+
+Lambda keeps the sync DynamoDB, a function serves one request at a time.
+"""
+
+import asyncio
+import json
+from os import environ
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+import botocore.session
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+
+from app import exceptions
+from app.core.logger import get_logger
+from app.core.settings import settings
+from app.database import codec, util
+from app.database.dynamodb import (
+    PROJECTIONS,
+    ConditionExpression,
+    DynamoDB,
+    PoolMetrics,
+    Projection,
+    UpdateReturnValues,
+    get_backoff_seconds,
+)
+
+AWS_REGION = environ.get("AWS_REGION")
+
+# The same variables boto3 reads to point dynamodb elsewhere, like a local one
+ENDPOINT_URL = environ.get("AWS_ENDPOINT_URL_DYNAMODB") or environ.get(
+    "AWS_ENDPOINT_URL"
+)
+
+SERVICE = "dynamodb"
+TARGET_PREFIX = "DynamoDB_20120810."
+CONTENT_TYPE = "application/x-amz-json-1.0"
+
+# Attempts of a request throttled or failed by dynamodb
+MAX_ATTEMPTS = 3
+
+# Errors worth another attempt, dynamodb asked to slow down or failed itself
+RETRYABLE_ERRORS = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "InternalServerError",
+    "ServiceUnavailable",
+}
+
+LOGGER = get_logger(__name__)
+
+
+class DynamoDBError(Exception):
+    """Exception for an error response from dynamodb"""
+
+    def __init__(self, status, code, detail):
+        super().__init__()
+        self.status = status
+        self.code = code
+        self.message = f"DynamoDB request failed: {status} {code} {detail}"
+        self.__cause__ = None
+
+    def __str__(self):
+        return self.message
+
+
+# Lazy initialize, endpoint url => session, shared by the tables on it. A
+# session belongs to the event loop it was made on, close_pools when it ends.
+SESSIONS: Dict[str, aiohttp.ClientSession] = {}
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+
+CREDENTIALS = None
+
+
+def _get_session(endpoint_url: str) -> aiohttp.ClientSession:
+    """Http session of the endpoint, requests past its connection limit wait"""
+
+    if endpoint_url not in SESSIONS:
+        max_connections = settings.ASYNC_DB_MAX_CONNECTIONS
+
+        SESSIONS[endpoint_url] = aiohttp.ClientSession(
+            base_url=endpoint_url,
+            connector=aiohttp.TCPConnector(limit=max_connections),
+            timeout=aiohttp.ClientTimeout(total=settings.ASYNC_DB_TIMEOUT),
+        )
+        POOL_METRICS[endpoint_url] = PoolMetrics(max_connections=max_connections)
+
+    return SESSIONS[endpoint_url]
+
+
+def _get_credentials():
+    """
+    Credentials from the botocore chain, refreshed by botocore when they expire
+
+    Blocks while botocore looks them up or refreshes them, called off the loop
+
+    Raises:
+        NoCredentialsError
+
+    """
+
+    global CREDENTIALS  # pylint: disable=global-statement
+
+    if CREDENTIALS is None:
+        CREDENTIALS = botocore.session.get_session().get_credentials()
+
+    if CREDENTIALS is None:
+        raise exceptions.NoCredentialsError()
+
+    return CREDENTIALS.get_frozen_credentials()
+
+
+async def _get_frozen_credentials():
+    """
+    Credentials to sign with, looked up and refreshed off the loop
+
+    Refreshable credentials that dont need a refresh yet are read on the loop,
+    the thread hop costs more than the read
+    """
+
+    refreshable = hasattr(CREDENTIALS, "refresh_needed")
+
+    if CREDENTIALS is None or (refreshable and CREDENTIALS.refresh_needed()):
+        return await asyncio.to_thread(_get_credentials)
+
+    return CREDENTIALS.get_frozen_credentials()
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int]]:
+    """Pool metrics of the http sessions, by endpoint url"""
+
+    return {
+        endpoint_url: metrics.stats() for endpoint_url, metrics in POOL_METRICS.items()
+    }
+
+
+async def close_pools():
+    """Close the sessions and their connections"""
+
+    for session in SESSIONS.values():
+        await session.close()
+
+    SESSIONS.clear()
+    POOL_METRICS.clear()
+
+
+class AsyncDynamoDB:
+    """
+    Async DynamoDB API Interactions
+
+    The methods of DynamoDB as coroutines, raising the same exceptions. Items
+    are plain python values, numbers are int or float instead of Decimal.
+
+    """
+
+    def __init__(
+        self,
+        table: str,
+        region: Optional[str] = AWS_REGION,
+        endpoint_url: Optional[str] = ENDPOINT_URL,
+    ):
+        """
+        Interactions with
+
+        Args:
+            table: A Dynamodb Table Name
+            region: Region of the table
+            endpoint_url: Overrides the regional endpoint
+
+        """
+        self.table_name = table
+        self.region = region
+        self.endpoint_url = endpoint_url or f"https://dynamodb.{region}.amazonaws.com"
+
+    async def _sign(self, target: str, body: bytes) -> Dict[str, str]:
+        """Headers of the signed request"""
+
+        credentials = await _get_frozen_credentials()
+
+        request = AWSRequest(
+            method="POST",
+            url=f"{self.endpoint_url}/",
+            data=body,
+            headers={
+                "Content-Type": CONTENT_TYPE,
+                "X-Amz-Target": TARGET_PREFIX + target,
+            },
+        )
+        SigV4Auth(credentials, SERVICE, self.region).add_auth(request)
+
+        return dict(request.headers.items())
+
+    async def _send(self, target: str, body: bytes) -> Tuple[int, bytes]:
+        """
+        Send a request on the session of the endpoint, counted in its metrics
+
+        Returns the status and body of the response
+        """
+
+        session = _get_session(self.endpoint_url)
+        metrics = POOL_METRICS[self.endpoint_url]
+
+        headers = await self._sign(target, body)
+
+        metrics.started()
+
+        try:
+            async with session.post("/", data=body, headers=headers) as response:
+                data = await response.read()
+        except BaseException:
+            metrics.failed()
+            raise
+
+        metrics.finished()
+
+        return response.status, data
+
+    async def request(self, target: str, params: Dict) -> Dict:
+        """
+        Send an operation, throttled and failed requests are sent again
+
+        Returns the parsed response
+
+        Raises:
+            DynamoDBError
+            aiohttp.ClientError and asyncio.TimeoutError
+        """
+
+        body = json.dumps(params, separators=(",", ":")).encode("utf-8")
+
+        for attempt in range(MAX_ATTEMPTS):
+            status, data = await self._send(target, body)
+
+            if status == 200:
+                return json.loads(data)
+
+            error = json.loads(data or b"{}")
+            code = error.get("__type", "").rpartition("#")[2]
+
+            if code not in RETRYABLE_ERRORS and status < 500:
+                raise DynamoDBError(status, code, error.get("message", ""))
+
+            if attempt + 1 < MAX_ATTEMPTS:
+                await asyncio.sleep(get_backoff_seconds(attempt))
+
+        raise DynamoDBError(status, code, error.get("message", ""))
+
+    async def put_item(
+        self, *, record: Dict, condition_expression: ConditionExpression = None
+    ) -> Dict:
+        """
+        Dynamodb PutItem
+
+        Args:
+            record: A json dictionary
+            condition_expression: conditional expression to include
+
+        Raises:
+            CreateRecordConditionFailed
+            CreateRecordFailed
+
+        """
+        LOGGER.debug(
+            f"Function: put_item | Table: {self.table_name} | record: {record}"
+        )
+
+        try:
+            put_request = {
+                "TableName": self.table_name,
+                "Item": codec.serialize_item(record),
+            }
+
+            if condition_expression:
+                # Convert to dynamodb syntax
+                dynamodb_condition_expression = (
+                    DynamoDB._convert_condition_expression(  # pylint: disable=W0212
+                        condition_expression
+                    )
+                )
+                put_request["ConditionExpression"] = dynamodb_condition_expression
+
+            # Run db action
+            await self.request("PutItem", put_request)
+        except DynamoDBError as err:
+            if err.code == "ConditionalCheckFailedException":
+                LOGGER.info("Write with conditional failed condition")
+                raise exceptions.CreateRecordConditionFailed()
+
+            LOGGER.exception(err)
+            raise exceptions.CreateRecordFailed()
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.CreateRecordFailed()
+
+        return record
+
+    async def get_item_by_pk(
+        self, pk: str, projection: Projection = Projection.full
+    ) -> Dict[Any, Any]:
+        """
+        Dynamodb GetItem
+
+        Args:
+            pk: PK for the record
+            projection: Named set of attributes to read
+
+        Returns the record, False if not found
+
+        Raises:
+            GetRecordFailed
+
+        """
+        LOGGER.debug(
+            (
+                f"Function: get_item_by_pk | Table: {self.table_name} |",
+                f"PK: {pk} | projection: {projection}",
+            )
+        )
+
+        get_request = {"TableName": self.table_name, "Key": {"PK": {"S": pk}}}
+
+        attribute_names = PROJECTIONS[Projection(projection)]
+
+        if attribute_names:
+            (
+                projection_expression,
+                expression_names,
+            ) = util.get_dynamodb_projection_syntax(attribute_names)
+
+            get_request["ProjectionExpression"] = projection_expression
+            get_request["ExpressionAttributeNames"] = expression_names
+
+        try:
+            # Get Item
+            response = await self.request("GetItem", get_request)
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.GetRecordFailed()
+
+        if "Item" not in response:
+            return False
+
+        return codec.deserialize_item(response["Item"])
+
+    async def update_item(
+        self,
+        *,
+        pk: str,
+        update_data: Dict,
+        return_values: UpdateReturnValues = UpdateReturnValues.updated_new,
+    ) -> Dict:
+        """
+        Dynamodb UpdateItem
+
+        Args:
+            pk: Partition key
+            update_data: Data to be update
+
+        Raises:
+            UpdateRecordFailed
+
+        """
+        LOGGER.debug(
+            (
+                f"Function: update_item | Table: {self.table_name} |",
+                f"pk: {pk}",
+            )
+        )
+        LOGGER.log_json(update_data)
+
+        try:
+            # Generate dynamodb update syntax from input fields
+            (
+                expression_statement,
+                expression_names,
+                expression_values,
+            ) = util.get_dynamodb_update_syntax(update_data)
+
+            # Run db action
+            response = await self.request(
+                "UpdateItem",
+                {
+                    "TableName": self.table_name,
+                    "Key": {"PK": {"S": pk}},
+                    "UpdateExpression": expression_statement,
+                    "ExpressionAttributeNames": expression_names,
+                    "ExpressionAttributeValues": codec.serialize_item(
+                        expression_values
+                    ),
+                    "ReturnValues": UpdateReturnValues(return_values).value,
+                },
+            )
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.UpdateRecordFailed()
+
+        attributes = response.get("Attributes")
+
+        return codec.deserialize_item(attributes) if attributes else attributes
+
+    async def delete_item(self, *, pk: str) -> Any:
+        """
+        Dynamodb DeleteItem
+
+        Args:
+            pk: Partition key
+
+        Raises:
+            DeleteRecordFailed
+
+        """
+        LOGGER.debug(f"Function: delete_item | Table: {self.table_name} | pk: {pk}")
+
+        try:
+            # Run db action
+            await self.request(
+                "DeleteItem", {"TableName": self.table_name, "Key": {"PK": {"S": pk}}}
+            )
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.DeleteRecordFailed()
+
+        return pk
+
+    async def _query(
+        self,
+        req_query: Dict,
+        limit: str = None,
+        start_key: Dict = None,
+    ) -> Any:
+        """
+        Run query
+
+        Args:
+            res_query: Request query object, expressions as strings and
+                ExpressionAttributeValues as python values
+            limit: Override limit in req_query
+            start_key: Override exclusive start key
+
+        Raises:
+            QueryFailed
+
+        """
+        try:
+            use_req_query = {**req_query, "TableName": self.table_name}
+
+            # Override limit if its provided
+            use_limit = limit or req_query.get("Limit", False)
+
+            if use_limit:
+                use_req_query["Limit"] = int(use_limit)
+
+            # Add start key
+            if start_key:
+                use_req_query["ExclusiveStartKey"] = start_key
+
+            for name in ("ExpressionAttributeValues", "ExclusiveStartKey"):
+                if name in use_req_query:
+                    use_req_query[name] = codec.serialize_item(use_req_query[name])
+
+            # Query table
+            res_query = await self.request("Query", use_req_query)
+
+            res_query["Items"] = [
+                codec.deserialize_item(item) for item in res_query.get("Items", [])
+            ]
+
+            if "LastEvaluatedKey" in res_query:
+                res_query["LastEvaluatedKey"] = codec.deserialize_item(
+                    res_query["LastEvaluatedKey"]
+                )
+
+        except Exception as err:
+            LOGGER.exception(err)
+            raise exceptions.QueryFailed()
+
+        return res_query
@@ -39,3 +39,22 @@ def get_dynamodb_update_syntax(update_fields):
     expression_statement = expression_statement[:-1]
 
     return expression_statement, expression_names, expression_attributes
+
+
+def get_dynamodb_projection_syntax(attribute_names):
+    """Generate projection syntax for dynamodb get_item and query"""
+
+    # #p0, #p1
+    # Aliased since names like TTL are dynamodb reserved words
+    expression_names = {
+        f"#p{index}": attribute_name
+        for index, attribute_name in enumerate(attribute_names)
+    }
+    # {
+    #   '#p0': "TargetUrl",
+    #   '#p1': "TTL"
+    # }
+
+    expression_statement = ", ".join(expression_names)
+
+    return expression_statement, expression_names
@@ -14,9 +14,10 @@ from app.exceptions.base import (
     ReadRecordFailed,
     RecordNotFound,
     ScanFailed,
+    ShortIdReserved,
     UnauthorizedRequest,
     UpdateRecordFailed,
 )
 from app.exceptions.database import DatabaseConnectionError
-from app.exceptions.security import NoCredentialsError
+from app.exceptions.security import NoCredentialsError, StatelessKeyMissing
 from app.exceptions.users import GetProfileFailed, NoRegisteredUserNumber
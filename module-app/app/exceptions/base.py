@@ -32,6 +32,15 @@ class CreateRecordConditionFailed(Exception):
         self.__cause__ = None
 
 
+class ShortIdReserved(Exception):
+    """Exception when a short id uses a prefix or character that is reserved"""
+
+    def __init__(self):
+        super().__init__()
+        self.message = "Short id uses a reserved prefix or character"
+        self.__cause__ = None
+
+
 class ReadRecordFailed(Exception):
     """Exception when reading a record fails"""
 
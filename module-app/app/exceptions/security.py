@@ -12,3 +12,12 @@ class NoCredentialsError(Exception):
         super().__init__()
         self.message = "Not authorized"
         self.__cause__ = None
+
+
+class StatelessKeyMissing(Exception):
+    """Exception when there is no key to sign stateless links with"""
+
+    def __init__(self):
+        super().__init__()
+        self.message = "Stateless links arent configured"
+        self.__cause__ = None
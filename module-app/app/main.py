@@ -4,6 +4,7 @@ API
 Main entrypoint to API
 """
 
+from contextlib import asynccontextmanager
 from os import environ
 from typing import Any, Dict, List, Optional
 
@@ -13,6 +14,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
 from starlette.requests import Request
 
+from app import database
 from app.api.api_v1.api import api_public_router, api_router
 from app.core.logger import get_logger
 from app.core.security import JWTBearer
@@ -36,13 +38,25 @@ tags_metadata: Optional[List[Dict[str, Any]]] = [
     },
 ]
 
-# Set up app
+
+@asynccontextmanager
+async def close_database_pools(_: FastAPI):
+    """Close the aiohttp sessions of the async dynamodb layer on shutdown"""
+
+    yield
+
+    await database.close_pools()
+
+
+# Set up app, mangum runs the lifespan around every lambda invocation so it is
+# only set for the async layer
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="CurrentClient Kurteyts Microservice",
     version="1.0.0",
     openapi_tags=tags_metadata,
     openapi_url="/openapi.json",
+    lifespan=close_database_pools if settings.ASYNC_DB else None,
 )
 
 # Set up auth
@@ -75,7 +89,6 @@ def read_items(request: Request):
     #     if request and request.get("aws") and request["aws.event"]
     #     else {}
     # )
-    print(request)
     return {"health": "OK", "version": 1.0}
 
 
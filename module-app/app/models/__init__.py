@@ -1,11 +1,20 @@
 """Models"""
 
 from app.models.shorturl import (
+    BatchCreateStatusEnum,
+    OgPage,
+    RedirectTypeEnum,
     ShortUrl,
+    ShortUrlBatchCreateResult,
+    ShortUrlBatchGet,
+    ShortUrlBatchGetResult,
     ShortUrlCreate,
     ShortUrlInDB,
     ShortUrlUpdate,
+    StatelessLink,
+    StatelessLinkCreate,
     convert_shorturlcreate_to_shorturlindb,
+    convert_statelesslinkcreate_to_statelesslink,
     run_format_short_id,
 )
 from app.models.user import User
@@ -1,15 +1,16 @@
 """ShortUrl Models"""
 
 import datetime
-import random
+import secrets
 import string
 from enum import Enum
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, HttpUrl
 
-from app.core import util
+from app import exceptions
+from app.core import stateless, util
 from app.core.logger import get_logger
 
 LOGGER = get_logger(__name__)
@@ -22,6 +23,22 @@ class RedirectTypeEnum(str, Enum):
     OG_HTML = "OG_HTML"  # open graph html page
 
 
+class RedirectStatusEnum(str, Enum):
+    """Status code of a direct redirect"""
+
+    MOVED_PERMANENTLY = "301"
+    FOUND = "302"
+    TEMPORARY_REDIRECT = "307"
+
+
+class CachePolicyEnum(str, Enum):
+    """How long cloudfront and browsers can cache the redirect"""
+
+    DEFAULT = "DEFAULT"  # short cache, the link can still change
+    IMMUTABLE = "IMMUTABLE"  # link wont change, cache until it expires
+    NO_STORE = "NO_STORE"  # never cache
+
+
 class OgSettings(BaseModel):
     """
     OgSettings
@@ -37,6 +54,19 @@ class OgSettings(BaseModel):
     OgImageAlt: str
 
 
+class OgPage(BaseModel):
+    """
+    OgPage
+
+    Og interstitial page rendered on write, compressed and base64 encoded for
+    the edge to return as is
+    """
+
+    Version: str
+    Gzip: str
+    Br: Optional[str] = None
+
+
 class ShortUrlBase(BaseModel):
     """
     ShortUrlBase
@@ -51,6 +81,10 @@ class ShortUrlBase(BaseModel):
     NumDaysUntilExpire: Optional[int] = None
     TTL: Optional[Union[int, str]] = None
     OgSettings: Optional[OgSettings] = None
+    RedirectStatus: Optional[
+        RedirectStatusEnum
+    ] = RedirectStatusEnum.MOVED_PERMANENTLY.value
+    CachePolicy: Optional[CachePolicyEnum] = CachePolicyEnum.DEFAULT.value
 
     @classmethod
     def make_pk(cls, short_id: str):
@@ -70,6 +104,10 @@ class ShortUrlCreate(BaseModel):
     NumDaysUntilExpire: int = 90
     RedirectType: Optional[RedirectTypeEnum] = RedirectTypeEnum.DIRECT.value
     OgSettings: Optional[OgSettings] = None
+    RedirectStatus: Optional[
+        RedirectStatusEnum
+    ] = RedirectStatusEnum.MOVED_PERMANENTLY.value
+    CachePolicy: Optional[CachePolicyEnum] = CachePolicyEnum.DEFAULT.value
 
 
 class ShortUrlUpdate(ShortUrlCreate):
@@ -103,6 +141,8 @@ class ShortUrlInDB(ShortUrlInDBBase):
     ShortId: str
     # Duplicating ids but adding dynamodb hash for access pattern readability
     PK: str  # SHORTURL#ShortId
+    # Pre-rendered og page for OG_HTML redirects, not returned to clients
+    OgPage: Optional[OgPage] = None
 
 
 # Properties to return to client (wired in on endpoint as response_model)
@@ -114,6 +154,74 @@ class ShortUrl(ShortUrlInDBBase):
     """
 
 
+class BatchCreateStatusEnum(str, Enum):
+    """Outcome of one item of a batch create"""
+
+    CREATED = "CREATED"
+    EXISTS = "EXISTS"  # short id already taken
+    INVALID = "INVALID"  # item didnt validate, nothing was written
+    FAILED = "FAILED"  # write failed after retries, safe to send again
+
+
+class ShortUrlBatchCreateResult(BaseModel):
+    """
+    ShortUrlBatchCreateResult
+
+    Result of one item of a batch create, Index is its position in the request
+    """
+
+    Index: int
+    Status: BatchCreateStatusEnum
+    ShortId: Optional[str] = None
+    Detail: Optional[str] = None
+    ShortUrl: Optional[ShortUrl] = None
+
+
+class ShortUrlBatchGet(BaseModel):
+    """
+    ShortUrlBatchGet
+
+    Properties to receive on a batch read
+    """
+
+    ShortIds: List[str]
+
+
+class ShortUrlBatchGetResult(BaseModel):
+    """
+    ShortUrlBatchGetResult
+
+    Result for one id of a batch read, ShortId is the id as requested
+    """
+
+    ShortId: str
+    Found: bool
+    ShortUrl: Optional[ShortUrl] = None
+
+
+class StatelessLinkCreate(BaseModel):
+    """
+    StatelessLinkCreate
+
+    Properties to receive on stateless link creation, nothing is stored
+    """
+
+    TargetUrl: HttpUrl
+    NumDaysUntilExpire: int = 30
+
+
+class StatelessLink(BaseModel):
+    """
+    StatelessLink
+
+    Signed link the edge redirects without a record, cant be changed or deleted
+    """
+
+    ShortId: str  # s/<token>
+    TargetUrl: HttpUrl
+    TTL: int
+
+
 # Model converters
 
 
@@ -121,7 +229,7 @@ def random_alnum(size=6):
     """Generate random 6 character alphanumeric string"""
     # List of characters [a-zA-Z0-9]
     chars = string.ascii_letters + string.digits
-    code = "".join(random.choice(chars) for _ in range(size))
+    code = "".join(secrets.choice(chars) for _ in range(size))
     return code
 
 
@@ -144,6 +252,11 @@ def convert_shorturlcreate_to_shorturlindb(
 
     cleaned_short_id = run_format_short_id(create_model.ShortId)
 
+    # The edge redirects s/ paths from the token, a record there is never read.
+    # Ids with # are kept for other items, like SEQ#shorturl and CLICKS# shards
+    if cleaned_short_id.startswith(stateless.TOKEN_PREFIX) or "#" in cleaned_short_id:
+        raise exceptions.ShortIdReserved()
+
     create_model.ShortId = cleaned_short_id
 
     indb_model = ShortUrlInDB(
@@ -170,3 +283,31 @@ def run_format_short_id(short_id_in: str):
         cleaned_short_id = "u/" + short_id_in[2:].lower()
 
     return cleaned_short_id
+
+
+def convert_statelesslinkcreate_to_statelesslink(
+    create_model: StatelessLinkCreate, key_id: Optional[str], keys: dict
+) -> StatelessLink:
+    """
+    Convert StatelessLinkCreate => StatelessLink model, signing the token
+
+    Raises:
+        StatelessKeyMissing
+
+    """
+
+    if key_id not in keys:
+        raise exceptions.StatelessKeyMissing()
+
+    expire_datetime = datetime.datetime.today() + datetime.timedelta(
+        days=create_model.NumDaysUntilExpire
+    )
+    expire_ttl = int(expire_datetime.timestamp())
+
+    token = stateless.encode(str(create_model.TargetUrl), expire_ttl, key_id, keys)
+
+    return StatelessLink(
+        ShortId=f"{stateless.TOKEN_PREFIX}{token}",
+        TargetUrl=create_model.TargetUrl,
+        TTL=expire_ttl,
+    )
@@ -0,0 +1,145 @@
+"""
+Bloom
+
+Bloom filter of existing slugs, built offline from the table by
+admin/build_slug_bloom.py and shipped in the edge package. A slug the filter
+says is not present had no record when the filter was built, the edge only
+trusts that without a dynamodb read for a while after the build.
+"""
+
+import hashlib
+import math
+import os
+import struct
+import time
+
+# magic, num_bits, num_hashes, num_items, built_at
+HEADER = struct.Struct(">4sQIQQ")
+MAGIC = b"KBF1"
+
+
+def optimal_params(num_items, fp_rate):
+    """Number of bits and hashes for num_items at the target false positive rate"""
+
+    num_items = max(int(num_items), 1)
+
+    num_bits = math.ceil(-num_items * math.log(fp_rate) / (math.log(2) ** 2))
+    num_hashes = max(round(num_bits / num_items * math.log(2)), 1)
+
+    return num_bits, num_hashes
+
+
+class BloomFilter:
+    """
+    BloomFilter
+
+    Fixed size bloom filter using double hashing over a single blake2b digest.
+
+    Usage:
+        slug_filter = bloom.BloomFilter.for_capacity(10_000_000, 0.01)
+        slug_filter.add("abcd1234")
+        "abcd1234" in slug_filter
+    """
+
+    def __init__(self, num_bits, num_hashes, bits=None, num_items=0, built_at=0):
+        """
+        Bloom filter
+
+        Args:
+            num_bits: Size of the filter in bits
+            num_hashes: Number of bit positions per key
+            bits: Existing filter bits, new empty filter if not provided
+            num_items: Number of keys added
+            built_at: Epoch seconds the filter was built
+
+        """
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.num_items = num_items
+        self.built_at = built_at or int(time.time())
+
+    @classmethod
+    def for_capacity(cls, num_items, fp_rate):
+        """New empty filter sized for num_items at the fp_rate"""
+
+        num_bits, num_hashes = optimal_params(num_items, fp_rate)
+
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key):
+        """Bit positions for the key"""
+
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+        hash_1 = int.from_bytes(digest[:8], "little")
+        hash_2 = int.from_bytes(digest[8:], "little") | 1
+
+        for i in range(self.num_hashes):
+            yield (hash_1 + i * hash_2) % self.num_bits
+
+    def add(self, key):
+        """Add a key"""
+
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+        self.num_items += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+
+        return True
+
+    def estimated_fp_rate(self):
+        """False positive rate expected for the number of keys added"""
+
+        return (
+            1 - math.exp(-self.num_hashes * self.num_items / self.num_bits)
+        ) ** self.num_hashes
+
+    def fill_ratio(self):
+        """Share of bits set"""
+
+        set_bits = sum(bin(byte).count("1") for byte in self.bits)
+
+        return set_bits / self.num_bits
+
+    def to_bytes(self):
+        """Serialize with header"""
+
+        header = HEADER.pack(
+            MAGIC, self.num_bits, self.num_hashes, self.num_items, self.built_at
+        )
+
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, content):
+        """Load serialized filter"""
+
+        magic, num_bits, num_hashes, num_items, built_at = HEADER.unpack_from(content)
+
+        if magic != MAGIC:
+            raise ValueError("Not a slug bloom filter")
+
+        bits = bytearray(content[HEADER.size :])
+
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError("Slug bloom filter is truncated")
+
+        return cls(num_bits, num_hashes, bits, num_items, built_at)
+
+
+def load_filter(path):
+    """Load filter shipped with the package, None if there isnt one"""
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as bloom_file:
+        return BloomFilter.from_bytes(bloom_file.read())
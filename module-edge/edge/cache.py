@@ -0,0 +1,206 @@
+"""
+Cache
+
+In-process cache of redirect records. Lives at module scope so it stays warm
+across invocations served by the same container.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# State of a cached record
+FRESH = "fresh"
+STALE = "stale"
+
+
+def get_record_ttl(record):
+    """Get the TTL attribute of a record as epoch seconds, None if not set"""
+
+    record_ttl = record.get("TTL") if isinstance(record, dict) else None
+
+    if record_ttl is None:
+        return None
+
+    try:
+        # boto3 resource returns Decimal, api model allows int or str
+        return int(record_ttl)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_size(value):
+    """Estimate the bytes held by a record, walking dicts and lists"""
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        for key, val in value.items():
+            size += estimate_size(key) + estimate_size(val)
+    elif isinstance(value, (list, tuple, set)):
+        for val in value:
+            size += estimate_size(val)
+
+    return size
+
+
+class RedirectCache:
+    """
+    RedirectCache
+
+    LRU cache of redirect records bounded by number of entries, bytes held and
+    age. An entry never outlives the TTL attribute of the record it holds.
+
+    A record is fresh for max_age seconds, then stale for up to max_stale
+    seconds, where it can still be served while it is read again or when
+    reading it fails.
+
+    Usage:
+        REDIRECT_CACHE = cache.RedirectCache(max_bytes=16 * 1024 * 1024)
+        record = REDIRECT_CACHE.get(cleaned_slug)
+        record, state = REDIRECT_CACHE.lookup(cleaned_slug)
+    """
+
+    def __init__(
+        self, max_bytes=16 * 1024 * 1024, max_entries=50000, max_age=60, max_stale=0
+    ):
+        """
+        Cache of redirect records
+
+        Args:
+            max_bytes: Upper bound on estimated bytes held by cached records
+            max_entries: Upper bound on number of cached records
+            max_age: Seconds a record is served from cache before reading again
+            max_stale: Seconds past max_age a record is kept to be served stale
+
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_stale = max_stale
+
+        # key => (record, fresh_until, expires_at, size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now=None):
+        """Get a fresh cached record, None if not cached, expired or stale"""
+
+        record, state = self.lookup(key, now)
+
+        return record if state == FRESH else None
+
+    def lookup(self, key, now=None):
+        """Get a cached record and its state, (None, None) if not cached or expired"""
+
+        now = time.time() if now is None else now
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None, None
+
+            record, fresh_until, expires_at, _ = entry
+
+            if now >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None, None
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+
+            if now < fresh_until:
+                self.hits += 1
+                return record, FRESH
+
+            self.stale_hits += 1
+            return record, STALE
+
+    def put(self, key, record, now=None):
+        """Cache a record, returns False if the record cant be cached"""
+
+        now = time.time() if now is None else now
+
+        fresh_until = now + self.max_age
+        expires_at = fresh_until + self.max_stale
+
+        # Never serve a record past its own expiration
+        record_ttl = get_record_ttl(record)
+        if record_ttl is not None:
+            fresh_until = min(fresh_until, record_ttl)
+            expires_at = min(expires_at, record_ttl)
+
+        if expires_at <= now:
+            return False
+
+        size = estimate_size(key) + estimate_size(record)
+
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (record, fresh_until, expires_at, size)
+            self.size_bytes += size
+
+            # Evict least recently used until within bounds
+            while (
+                self.size_bytes > self.max_bytes
+                or len(self._entries) > self.max_entries
+            ):
+                _, (_, _, _, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+        return True
+
+    def invalidate(self, key):
+        """Drop a cached record"""
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Drop all cached records, counters are kept"""
+
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        """Counters and usage of the cache"""
+
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key):
+        """Remove entry and release its bytes"""
+
+        _, _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
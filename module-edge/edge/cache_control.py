@@ -0,0 +1,85 @@
+"""
+Cache Control
+
+Redirect status and Cache-Control of a response, from the RedirectStatus and
+CachePolicy of its record
+"""
+
+import time
+
+from edge import cache, logger
+
+LOGGER = logger.get_logger(__name__)
+
+# Status codes a record can ask a direct redirect to use
+REDIRECT_STATUS_CODES = {"301", "302", "307"}
+
+# Cache policies of a record
+CACHE_POLICY_DEFAULT = "DEFAULT"
+CACHE_POLICY_IMMUTABLE = "IMMUTABLE"
+CACHE_POLICY_NO_STORE = "NO_STORE"
+# Not stored on records, for the expired redirect of a slug without one
+CACHE_POLICY_MISSING = "MISSING"
+
+
+def get_cache_control(redirect_record, settings, now=None):
+    """
+    Cache-Control for a redirect from the record CachePolicy
+
+    Max ages come from the stage settings and never run past the record TTL, so
+    an expired link isnt served from a browser or cloudfront cache
+    """
+
+    cache_policy = redirect_record.get("CachePolicy") or CACHE_POLICY_DEFAULT
+
+    if cache_policy == CACHE_POLICY_NO_STORE:
+        return "no-store"
+
+    # Og links answer crawlers and people differently, only the browser caches
+    private = (
+        settings["CRAWLER_AWARE_OG"]
+        and redirect_record.get("RedirectType") == "OG_HTML"
+    )
+
+    # Slug can be created any moment, keep cloudfront from holding the miss
+    if cache_policy == CACHE_POLICY_MISSING:
+        return (
+            f"max-age={settings['DEFAULT_MAX_AGE']}, "
+            f"s-maxage={settings['MISSING_S_MAXAGE']}"
+        )
+
+    remaining = None
+    ttl = cache.get_record_ttl(redirect_record)
+
+    if ttl:
+        remaining = max(int(ttl - (now or time.time())), 0)
+
+    def cap(max_age):
+        return max_age if remaining is None else min(max_age, remaining)
+
+    if cache_policy == CACHE_POLICY_IMMUTABLE:
+        max_age = cap(settings["IMMUTABLE_MAX_AGE"])
+
+        if private:
+            return f"private, max-age={max_age}, immutable"
+
+        s_maxage = cap(settings["IMMUTABLE_S_MAXAGE"])
+
+        return f"public, max-age={max_age}, s-maxage={s_maxage}, immutable"
+
+    if private:
+        return f"private, max-age={cap(settings['DEFAULT_MAX_AGE'])}"
+
+    return f"max-age={cap(settings['DEFAULT_MAX_AGE'])}"
+
+
+def get_redirect_status(redirect_record):
+    """Status code for a direct redirect, 301 unless the record asks otherwise"""
+
+    status_code = str(redirect_record.get("RedirectStatus") or "301")
+
+    if status_code not in REDIRECT_STATUS_CODES:
+        LOGGER.warning(f"Unsupported redirect status: {status_code}")
+        return "301"
+
+    return status_code
@@ -0,0 +1,218 @@
+"""
+Clicks
+
+Count redirects per link without a write on the redirect path. Hits are added
+to an in-container buffer and written behind as one ADD per link, once the
+buffer holds enough hits or is old enough, from a background thread started
+after the response is built.
+
+Counts go to counter items next to the records:
+    PK: CLICKS#<slug>#<region>#<shard>
+    Clicks: number, added to
+    TTL: pushed out on every write
+
+Each container writes to one shard picked at random, so a hot link is spread
+over CLICK_SHARDS items instead of throttling one partition. The region is in
+the key since global tables resolve concurrent writes to an item by last writer
+wins, an ADD from another region would be lost. The count of a link is the sum
+of its items over the replica regions and shards, see get_counter_keys.
+
+Lost counts, per container:
+    - hits still in the buffer when the container is reaped, at most
+      flush_hits - 1 hits or flush_seconds worth of traffic. The container is
+      frozen between invocations, so a buffer is only flushed by a later hit.
+    - a flush in flight when the container is frozen and then reaped
+    - a failed flush puts its counts back into the buffer, but the buffer holds
+      at most max_links links, hits on further links are dropped and counted
+    A flush that fails after dynamodb applied it is retried and counted twice.
+    With the origin-request trigger the function only runs on cloudfront cache
+    misses, the counts are then a floor.
+"""
+
+import random
+import threading
+import time
+
+# Prefix of counter items, # cant be in a slug since browsers never send it
+CLICKS_PREFIX = "CLICKS#"
+
+
+def get_counter_pk(slug, region, shard):
+    """PK of a counter item"""
+
+    return f"{CLICKS_PREFIX}{slug}#{region}#{shard}"
+
+
+def get_counter_keys(slug, regions, num_shards):
+    """PKs of every counter item of a link, to read and sum"""
+
+    return [
+        get_counter_pk(slug, region, shard)
+        for region in regions
+        for shard in range(num_shards)
+    ]
+
+
+def is_counter_pk(pk):
+    """Whether the PK is a counter item and not a link"""
+
+    return pk.startswith(CLICKS_PREFIX)
+
+
+class ClickBuffer:
+    """
+    ClickBuffer
+
+    Hits per link since the last flush, safe to add to from any thread. Only one
+    flush runs at a time.
+
+    Usage:
+        CLICKS = clicks.ClickBuffer(write_clicks, flush_hits=100)
+        CLICKS.add(cleaned_slug)
+        CLICKS.maybe_flush(executor)
+    """
+
+    def __init__(
+        self, writer, flush_hits=100, flush_seconds=10, max_links=10000, shards=8
+    ):
+        """
+        Buffer of hits
+
+        Args:
+            writer: Called with (slug, shard, clicks) for each link when flushing
+            flush_hits: Hits in the buffer that start a flush
+            flush_seconds: Age of the oldest hit that starts a flush
+            max_links: Upper bound on links held, hits on more are dropped
+            shards: Counter items per link and region
+
+        """
+        self.writer = writer
+        self.flush_hits = flush_hits
+        self.flush_seconds = flush_seconds
+        self.max_links = max_links
+        self.shard = random.randrange(shards)
+
+        # slug => hits since the last flush
+        self._hits = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._oldest = None
+        self._flushing = False
+
+        # Counters
+        self.added = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def add(self, slug, now=None):
+        """Count a hit on the link"""
+
+        with self._lock:
+            self.added += 1
+
+            if slug not in self._hits and len(self._hits) >= self.max_links:
+                self.dropped += 1
+                return
+
+            self._hits[slug] = self._hits.get(slug, 0) + 1
+            self._pending += 1
+
+            if self._oldest is None:
+                self._oldest = time.time() if now is None else now
+
+    def is_due(self, now=None):
+        """Whether the buffer should be flushed"""
+
+        if not self._pending or self._flushing:
+            return False
+
+        if self._pending >= self.flush_hits:
+            return True
+
+        now = time.time() if now is None else now
+
+        return now - self._oldest >= self.flush_seconds
+
+    def maybe_flush(self, executor, now=None):
+        """Flush in the background when due, returns the future of the flush"""
+
+        with self._lock:
+            if not self.is_due(now):
+                return None
+
+            self._flushing = True
+
+        return executor.submit(self.flush)
+
+    def _take(self):
+        """Swap out the buffered hits"""
+
+        with self._lock:
+            hits = self._hits
+            self._hits = {}
+            self._pending = 0
+            self._oldest = None
+
+        return hits
+
+    def _put_back(self, hits):
+        """Return the counts of a failed write to the buffer"""
+
+        with self._lock:
+            for slug, count in hits.items():
+                if slug not in self._hits and len(self._hits) >= self.max_links:
+                    self.dropped += count
+                    continue
+
+                self._hits[slug] = self._hits.get(slug, 0) + count
+                self._pending += count
+
+            if self._hits and self._oldest is None:
+                self._oldest = time.time()
+
+    def flush(self):
+        """
+        Write the buffered hits, one ADD per link
+
+        A failed write stops the flush, dynamodb is likely throttling or out of
+        reach, and the links not written go back into the buffer for the next one
+
+        Raises:
+            The error of the failed write
+        """
+
+        hits = self._take()
+        remaining = dict(hits)
+
+        try:
+            for slug, count in hits.items():
+                self.writer(slug, self.shard, count)
+                self.written += count
+                del remaining[slug]
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            if remaining:
+                self._put_back(remaining)
+
+            self.flushes += 1
+            self._flushing = False
+
+        return len(hits)
+
+    def stats(self):
+        """Counters and usage of the buffer"""
+
+        return {
+            "links": len(self._hits),
+            "pending": self._pending,
+            "added": self.added,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "shard": self.shard,
+        }
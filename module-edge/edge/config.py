@@ -0,0 +1,152 @@
+"""
+Config
+
+Settings for each stage. Lambda@edge cant be passed env variables, so each
+stage handler selects its settings from here.
+
+Secrets cant be in the repo either, they are read from gitignored files bundled
+with the function when they exist.
+"""
+
+import json
+import os
+
+# Keys of stateless links by stage, {"dev": {"<kid>": "<base64url secret>"}},
+# written by admin/rotate_stateless_key.py
+STATELESS_KEYS_PATH = os.path.join(os.path.dirname(__file__), "stateless_keys.json")
+
+# Shared by all stages, a stage can override any of these
+DEFAULTS = {
+    # How redirect records are read
+    #   resource: boto3 Table resource
+    #   client: low level client with the edge deserializer
+    #   sigv4: stdlib client signing requests itself, boto3 is never imported
+    "LOOKUP_MODE": "client",
+    # Attributes to read, a name from dynamodb.PROJECTIONS
+    "PROJECTION": "redirect",
+    # Read direct fields first and the og fields only for OG_HTML records
+    "TWO_STAGE_OG": False,
+    # Regions the table is replicated to (global tables), the nearest one to the
+    # region the function runs in is read. Replicas are added outside the
+    # template, see infra/table.yaml
+    "REPLICA_REGIONS": ["us-east-1"],
+    # Endpoint override by region, for local stand-ins of dynamodb
+    "REPLICA_ENDPOINTS": {},
+    # Seconds a lookup may take before falling back, the function has 3
+    "LOOKUP_BUDGET": 1.5,
+    # Share of the remaining budget the first read gets before it is hedged
+    "ATTEMPT_FRACTION": 0.5,
+    # Hedge a read slower than this percentile of recent reads
+    "HEDGE": True,
+    "HEDGE_PERCENTILE": 95,
+    "HEDGE_MIN_DELAY": 0.02,
+    # Hedge delay until enough reads have been seen
+    "HEDGE_DEFAULT_DELAY": 0.1,
+    # Region the hedged read goes to, None for the home region
+    "HEDGE_REGION": None,
+    # Serve a cached record past its freshness while it is read again
+    "SERVE_STALE": True,
+    # Seconds past freshness a cached record can be served, while it is read
+    # again or when reading it fails. Never past the record TTL.
+    "MAX_STALE": 6 * 60 * 60,
+    # Cache-Control of redirects by the record CachePolicy, never past the TTL
+    #   DEFAULT: the link can change, cached briefly by browsers
+    #   IMMUTABLE: the link wont change, browsers cant be purged so they get
+    #       less than cloudfront
+    "DEFAULT_MAX_AGE": 100,
+    "IMMUTABLE_MAX_AGE": 24 * 60 * 60,
+    "IMMUTABLE_S_MAXAGE": 7 * 24 * 60 * 60,
+    # Seconds after the slug filter build that a slug outside it is taken as
+    # missing without reading dynamodb. Links created after the build go to the
+    # expired page until the filter is this old, older filters only decide which
+    # empty reads are cached as missing. 0 reads every slug.
+    "SLUG_FILTER_SKIP_MAX_AGE": 15 * 60,
+    # Seconds cloudfront holds the expired redirect of a slug without a record,
+    # only applies to the origin-request trigger
+    "MISSING_S_MAXAGE": 10,
+    # Og page only for link preview crawlers, other visitors of OG_HTML links get
+    # the direct redirect
+    "CRAWLER_AWARE_OG": True,
+    # Share of invocations the request log line is written for, errors and
+    # invocations slower than LOG_SLOW_MS are always written
+    "LOG_SAMPLE_RATE": 1.0,
+    "LOG_SLOW_MS": 500,
+    # Share of invocations whose debug messages are kept in the line
+    "LOG_DEBUG_SAMPLE_RATE": 0.01,
+    # Count redirects into CLICKS# counter items, written behind in batches,
+    # see edge/clicks.py for when counts can be lost
+    "CLICKS": True,
+    # Flush once the buffer holds this many hits or its oldest hit is this old
+    "CLICK_FLUSH_HITS": 100,
+    "CLICK_FLUSH_SECONDS": 10,
+    # Links held in the buffer, hits on more are dropped until the next flush
+    "CLICK_MAX_LINKS": 10000,
+    # Counter items per link and region, spreads the writes of hot links
+    "CLICK_SHARDS": 8,
+    # Seconds a counter item is kept after its last write
+    "CLICK_TTL": 400 * 24 * 60 * 60,
+    # Stateless links, s/<token>, are redirected with this status. Their
+    # Cache-Control follows DEFAULT, never past the token expiry.
+    "STATELESS_REDIRECT_STATUS": "302",
+    # kid => secret of stateless links, the keys file adds to these
+    "STATELESS_KEYS": {},
+    # Open the dynamodb connection during the init phase
+    "WARM_UP": True,
+    # botocore or sigv4 client, the function has a 3 second timeout
+    "CONNECT_TIMEOUT": 0.5,
+    "READ_TIMEOUT": 1.0,
+    "RETRY_MODE": "standard",
+    "MAX_ATTEMPTS": 2,
+    "TCP_KEEPALIVE": True,
+    # Room for a hedged read next to a slow one and a background refresh
+    "MAX_POOL_CONNECTIONS": 4,
+}
+
+STAGES = {
+    "dev": {
+        "KERTEYT_TABLE_NAME": "cc-east-dev-db-kurteyt",
+        "EXPIRED_REDIRECT": "https://client.currentclient.io/expired",
+    },
+    "prd": {
+        "KERTEYT_TABLE_NAME": "cc-east-prd-db-kurteyt",
+        "EXPIRED_REDIRECT": "https://client.currentclient.com/expired",
+        "LOG_SAMPLE_RATE": 0.1,
+        "LOG_DEBUG_SAMPLE_RATE": 0.001,
+    },
+}
+
+
+def load_stateless_keys(path=STATELESS_KEYS_PATH):
+    """Keys of stateless links by stage, empty when the file isnt bundled"""
+
+    try:
+        with open(path, encoding="utf-8") as keys_file:
+            return json.load(keys_file)
+    except FileNotFoundError:
+        return {}
+
+
+def get_stage_config(stage):
+    """Settings for the stage"""
+
+    settings = {"STAGE": stage, **DEFAULTS, **STAGES[stage]}
+    settings["STATELESS_KEYS"] = {
+        **settings["STATELESS_KEYS"],
+        **load_stateless_keys().get(stage, {}),
+    }
+
+    return settings
+
+
+def get_stage_from_function_name(function_name):
+    """
+    Stage from the lambda name
+
+    Replicas of the function are named like us-east-1.cc-east-dev-lambda-kurteyt-edge
+    """
+
+    for stage in STAGES:
+        if f"-{stage}-" in function_name:
+            return stage
+
+    return None
@@ -0,0 +1,327 @@
+"""
+DynamoDB
+
+Read redirect records and add to click counters, through the boto3 Table
+resource, the boto3 low level client, or the sigv4 client, the last two
+converting items with edge.codec. boto3 is only imported when a boto3 mode is
+used.
+"""
+
+import time
+
+from edge import codec, sigv4
+
+# boto3 session, created with the first boto3 handle
+SESSION = None
+
+# Set from the stage config before the first handle is created
+CLIENT_CONFIG = None
+SETTINGS = {}
+ENDPOINTS = {}
+
+# PK that is never a record, read to open the connection
+WARM_UP_PK = "__warmup__"
+
+# Lazy init, one handle per region
+TABLES = {}
+CLIENTS = {}
+SIGV4_CLIENTS = {}
+
+# Named sets of attributes to read, None reads the whole item
+PROJECTIONS = {
+    "full": None,
+    # Everything a redirect response needs
+    "redirect": [
+        "PK",
+        "TargetUrl",
+        "RedirectType",
+        "RedirectStatus",
+        "CachePolicy",
+        "TTL",
+        "CreatedAt",
+        "UpdatedAt",
+        "OgSettings",
+        "OgPage",
+    ],
+    # Direct redirect fields, first stage of a two stage read
+    "direct": [
+        "PK",
+        "TargetUrl",
+        "RedirectType",
+        "RedirectStatus",
+        "CachePolicy",
+        "TTL",
+        "CreatedAt",
+        "UpdatedAt",
+    ],
+    # Og fields, second stage of a two stage read
+    "og": ["OgSettings", "OgPage"],
+}
+
+
+def build_projection(attribute_names):
+    """
+    get_item params to read only the attributes
+
+    Names are always aliased since TTL is a dynamodb reserved word
+    """
+
+    if not attribute_names:
+        return {}
+
+    expression_names = {f"#p{i}": name for i, name in enumerate(attribute_names)}
+
+    return {
+        "ProjectionExpression": ", ".join(expression_names),
+        "ExpressionAttributeNames": expression_names,
+    }
+
+
+# Built once, name => params to add to get_item
+PROJECTION_PARAMS = {
+    name: build_projection(attribute_names)
+    for name, attribute_names in PROJECTIONS.items()
+}
+
+
+def configure(settings):
+    """Keep the stage settings, the botocore config is built for boto3 modes"""
+
+    global CLIENT_CONFIG  # pylint: disable=global-statement
+    global SETTINGS  # pylint: disable=global-statement
+    global ENDPOINTS  # pylint: disable=global-statement
+
+    SETTINGS = settings
+    ENDPOINTS = settings["REPLICA_ENDPOINTS"]
+
+    if settings["LOOKUP_MODE"] == "sigv4":
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from botocore.config import Config
+
+    CLIENT_CONFIG = Config(
+        connect_timeout=settings["CONNECT_TIMEOUT"],
+        read_timeout=settings["READ_TIMEOUT"],
+        retries={
+            "mode": settings["RETRY_MODE"],
+            "total_max_attempts": settings["MAX_ATTEMPTS"],
+        },
+        tcp_keepalive=settings["TCP_KEEPALIVE"],
+        max_pool_connections=settings["MAX_POOL_CONNECTIONS"],
+    )
+
+
+def get_session():
+    """boto3 session, imports boto3 the first time"""
+
+    global SESSION  # pylint: disable=global-statement
+
+    if SESSION is None:
+        import boto3  # pylint: disable=import-outside-toplevel
+
+        SESSION = boto3.session.Session()
+
+    return SESSION
+
+
+def get_table(table_name, region):
+    """Get boto3 Table resource"""
+
+    res_table = TABLES.get((table_name, region))
+
+    if res_table is None:
+        res_table = (
+            get_session()
+            .resource(
+                service_name="dynamodb",
+                region_name=region,
+                endpoint_url=ENDPOINTS.get(region),
+                config=CLIENT_CONFIG,
+            )
+            .Table(table_name)
+        )
+        TABLES[(table_name, region)] = res_table
+
+    return res_table
+
+
+def get_client(region):
+    """Get low level dynamodb client"""
+
+    client = CLIENTS.get(region)
+
+    if client is None:
+        client = get_session().client(
+            service_name="dynamodb",
+            region_name=region,
+            endpoint_url=ENDPOINTS.get(region),
+            config=CLIENT_CONFIG,
+        )
+        CLIENTS[region] = client
+
+    return client
+
+
+def get_sigv4_client(region):
+    """Get the sigv4 dynamodb client"""
+
+    client = SIGV4_CLIENTS.get(region)
+
+    if client is None:
+        client = sigv4.DynamoDBClient(
+            region,
+            endpoint_url=ENDPOINTS.get(region),
+            connect_timeout=SETTINGS.get("CONNECT_TIMEOUT", 0.5),
+            read_timeout=SETTINGS.get("READ_TIMEOUT", 1.0),
+            max_attempts=SETTINGS.get("MAX_ATTEMPTS", 2),
+            max_pool_connections=SETTINGS.get("MAX_POOL_CONNECTIONS", 4),
+        )
+        SIGV4_CLIENTS[region] = client
+
+    return client
+
+
+def get_item_resource(table_name, pk, region, projection):
+    """Get item through the boto3 Table resource"""
+
+    get_response = get_table(table_name, region).get_item(
+        Key={"PK": pk},
+        ConsistentRead=False,
+        **PROJECTION_PARAMS[projection],
+    )
+
+    return get_response.get("Item", False)
+
+
+def get_item_client(table_name, pk, region, projection):
+    """Get item through the low level client"""
+
+    get_response = get_client(region).get_item(
+        TableName=table_name,
+        Key={"PK": {"S": pk}},
+        ConsistentRead=False,
+        **PROJECTION_PARAMS[projection],
+    )
+
+    item = get_response.get("Item")
+
+    return codec.deserialize_item(item) if item else False
+
+
+def get_item_sigv4(table_name, pk, region, projection):
+    """Get item through the sigv4 client"""
+
+    get_response = get_sigv4_client(region).get_item(
+        TableName=table_name,
+        Key={"PK": {"S": pk}},
+        ConsistentRead=False,
+        **PROJECTION_PARAMS[projection],
+    )
+
+    item = get_response.get("Item")
+
+    return codec.deserialize_item(item) if item else False
+
+
+LOOKUPS = {
+    "resource": get_item_resource,
+    "client": get_item_client,
+    "sigv4": get_item_sigv4,
+}
+
+
+def get_item(table_name, pk, *, region, mode="client", projection="full"):
+    """
+    Get redirect record by PK
+
+    Args:
+        table_name: Dynamodb table name
+        pk: PK of the record
+        region: Region of the table
+        mode: resource, client or sigv4
+        projection: Name of the attributes to read, from PROJECTIONS
+
+    Returns the record, False if there is no record
+    """
+
+    return LOOKUPS[mode](table_name, pk, region, projection)
+
+
+def get_item_two_stage(table_name, pk, *, region, mode="client"):
+    """
+    Get redirect record reading the direct fields first, og fields are only
+    read for OG_HTML records
+    """
+
+    record = get_item(table_name, pk, region=region, mode=mode, projection="direct")
+
+    if record and record.get("RedirectType") == "OG_HTML":
+        og_record = get_item(table_name, pk, region=region, mode=mode, projection="og")
+        record["OgSettings"] = (og_record or {}).get("OgSettings")
+        record["OgPage"] = (og_record or {}).get("OgPage")
+
+    return record
+
+
+# Adds to a counter and pushes out its TTL, TTL is a reserved word
+ADD_PARAMS = {
+    "UpdateExpression": "ADD #n :n SET #ttl = :ttl",
+    "ExpressionAttributeNames": {"#n": "Clicks", "#ttl": "TTL"},
+}
+
+
+def add_to_counter(table_name, pk, amount, *, region, mode="client", ttl):
+    """
+    Add to the Clicks attribute of a counter item, creating it if needed
+
+    Args:
+        table_name: Dynamodb table name
+        pk: PK of the counter item
+        amount: Number to add
+        region: Region of the table
+        mode: resource, client or sigv4
+        ttl: Epoch seconds the item expires at
+
+    """
+
+    values = {":n": amount, ":ttl": ttl}
+
+    if mode == "resource":
+        get_table(table_name, region).update_item(
+            Key={"PK": pk}, ExpressionAttributeValues=values, **ADD_PARAMS
+        )
+        return
+
+    client = get_sigv4_client(region) if mode == "sigv4" else get_client(region)
+
+    client.update_item(
+        TableName=table_name,
+        Key={"PK": {"S": pk}},
+        ExpressionAttributeValues=codec.serialize_item(values),
+        **ADD_PARAMS,
+    )
+
+
+def warm_up(table_name, *, region, mode="client"):
+    """
+    Build the handle and open the https connection before the first viewer
+
+    Returns seconds spent building the handle and seconds spent on the first
+    request, which pays for endpoint resolution and the tls handshake
+    """
+
+    start = time.perf_counter()
+
+    if mode == "resource":
+        get_table(table_name, region)
+    elif mode == "sigv4":
+        get_sigv4_client(region)
+    else:
+        get_client(region)
+
+    built = time.perf_counter()
+
+    get_item(table_name, WARM_UP_PK, region=region, mode=mode, projection="direct")
+
+    return built - start, time.perf_counter() - built
@@ -0,0 +1,210 @@
+"""
+Hedge
+
+Run a lookup inside a latency budget. When the first attempt is slower than
+recent lookups usually are, a hedged second attempt goes to another replica or
+endpoint and whichever answers first wins.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class LookupTimeout(Exception):
+    """Exception when no attempt answered inside the budget"""
+
+    def __init__(self):
+        super().__init__()
+        self.message = "Lookup ran out of its latency budget"
+        self.__cause__ = None
+
+
+class LatencyTracker:
+    """
+    LatencyTracker
+
+    Latencies of the most recent attempts, to get the hedge threshold from.
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        """
+        Recent latencies
+
+        Args:
+            window: Number of recent latencies kept
+            min_samples: Samples needed before a percentile is given
+
+        """
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+
+    def record(self, seconds):
+        """Add a latency"""
+        self._latencies.append(seconds)
+
+    def percentile(self, percent):
+        """Latency at the percentile, None until there are enough samples"""
+
+        latencies = sorted(self._latencies)
+
+        if len(latencies) < self.min_samples:
+            return None
+
+        index = min(int(len(latencies) * percent / 100), len(latencies) - 1)
+
+        return latencies[index]
+
+
+class HedgedLookup:
+    """
+    HedgedLookup
+
+    Usage:
+        HEDGER = hedge.HedgedLookup()
+        record, hedged = HEDGER.run(read_primary, read_secondary, budget=1.5)
+    """
+
+    def __init__(self, max_workers=4, window=200, min_samples=20):
+        """
+        Hedged lookups sharing a thread pool and latency history
+
+        Args:
+            max_workers: Threads for attempts, including abandoned slow ones
+            window: Number of recent latencies kept for the hedge threshold
+            min_samples: Samples needed before using the percentile threshold
+
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.tracker = LatencyTracker(window=window, min_samples=min_samples)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def _count(self, counter):
+        """Increment a counter"""
+
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _submit(self, func):
+        """Start an attempt, recording its latency once it answers"""
+
+        started = time.perf_counter()
+        future = self.executor.submit(func)
+
+        def on_done(done_future):
+            if done_future.exception() is None:
+                self.tracker.record(time.perf_counter() - started)
+
+        future.add_done_callback(on_done)
+
+        return future
+
+    def hedge_delay(self, remaining, percent, min_delay, default_delay, fraction):
+        """Seconds to wait on the first attempt before hedging"""
+
+        delay = self.tracker.percentile(percent)
+
+        if delay is None:
+            delay = default_delay
+
+        return min(max(delay, min_delay), remaining * fraction)
+
+    def run(
+        self,
+        primary,
+        secondary=None,
+        *,
+        budget=1.5,
+        fraction=0.5,
+        percent=95,
+        min_delay=0.02,
+        default_delay=0.1,
+    ):
+        """
+        Run the lookup
+
+        Args:
+            primary: Function for the first attempt
+            secondary: Function for the hedged attempt, None to not hedge
+            budget: Seconds the lookup may take
+            fraction: Share of the remaining budget the first attempt gets alone
+            percent: Percentile of recent latencies to hedge after
+            min_delay: Never hedge sooner than this
+            default_delay: Hedge delay until there are enough samples
+
+        Returns the result and whether it came from the hedged attempt
+
+        Raises:
+            LookupTimeout
+            Exception raised by the last attempt to fail
+
+        """
+        self._count("requests")
+
+        deadline = time.perf_counter() + budget
+
+        first = self._submit(primary)
+
+        delay = self.hedge_delay(budget, percent, min_delay, default_delay, fraction)
+
+        done, _ = wait([first], timeout=delay)
+
+        pending = {first}
+        hedge_future = None
+
+        # First attempt failed fast or is slow, send the hedge
+        if secondary is not None and (not done or first.exception() is not None):
+            self._count("hedges")
+            hedge_future = self._submit(secondary)
+            pending.add(hedge_future)
+
+        error = None
+
+        while pending:
+            remaining = deadline - time.perf_counter()
+
+            if remaining <= 0:
+                break
+
+            done, pending = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+
+                if future is hedge_future:
+                    self._count("hedge_wins")
+
+                return future.result(), future is hedge_future
+
+        if error is not None and not pending:
+            self._count("errors")
+            raise error
+
+        self._count("timeouts")
+        raise LookupTimeout()
+
+    def stats(self):
+        """Counters of the hedged lookups"""
+
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "p50": self.tracker.percentile(50),
+            "p95": self.tracker.percentile(95),
+        }
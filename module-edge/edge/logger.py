@@ -1,10 +1,16 @@
 """
 Logger
 
-Used by other modules to get a common logger
+Used by other modules to get a common logger, and the per invocation request
+log of the edge function
 """
 
+import json
 import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
 from os import environ
 
 LOG_LEVEL: str = environ.get("LOG_AT_LEVEL", "INFO")
@@ -17,7 +23,10 @@ LOG_LEVEL: str = environ.get("LOG_AT_LEVEL", "INFO")
 # NOTSET: 0
 
 
-def get_logger(name):
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def get_logger(name, log_format=LOG_FORMAT):
     """Logger with formatting and such"""
 
     # create logger
@@ -32,9 +41,7 @@ def get_logger(name):
         streamhandle = logging.StreamHandler()
 
         # create formatter
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
+        formatter = logging.Formatter(log_format)
 
         # add formatter to streamhandle
         streamhandle.setFormatter(formatter)
@@ -46,3 +53,140 @@ def get_logger(name):
         logger.propagate = False
 
     return logger
+
+
+class InvocationState(threading.local):
+    """What a RequestLog collected for the invocation on the current thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = None
+        self.fields = {}
+        self.phases = {}
+        self.messages = None
+        self.failed = False
+
+
+class RequestLog:
+    """
+    RequestLog
+
+    Collects what happens during an invocation and writes it as one compact json
+    line when the invocation ends. Debug messages are only kept, and formatted,
+    for a sample of invocations. Errors and slow invocations are always written.
+
+    The invocation is per thread, so background work like a stale refresh
+    doesnt write into the line of the request running alongside it. Calls on a
+    thread that didnt start an invocation are ignored.
+
+    Usage:
+        REQUEST_LOG = logger.RequestLog("edge.request")
+        REQUEST_LOG.start(request_id)
+        with REQUEST_LOG.phase("lookup"):
+            REQUEST_LOG.debug("Read from replica: %s", region)
+        REQUEST_LOG.set(status="301")
+        REQUEST_LOG.flush()
+    """
+
+    def __init__(self, name, sample_rate=1.0, debug_sample_rate=0.0, slow_ms=None):
+        """
+        Request log
+
+        Args:
+            name: Name of the logger the lines are written to
+            sample_rate: Share of invocations a line is written for
+            debug_sample_rate: Share of invocations debug messages are kept for
+            slow_ms: Always write invocations slower than this
+
+        """
+        self.logger = get_logger(name, log_format="%(message)s")
+        self.sample_rate = sample_rate
+        self.debug_sample_rate = debug_sample_rate
+        self.slow_ms = slow_ms
+
+        self._state = InvocationState()
+
+    def start(self, request_id=None):
+        """Start the log of an invocation"""
+
+        state = self._state
+        state.started = time.perf_counter()
+        state.fields = {"request_id": request_id}
+        state.phases = {}
+        state.failed = False
+
+        # Sampled invocations keep their debug messages
+        state.messages = [] if random.random() < self.debug_sample_rate else None
+
+    @property
+    def sampled(self):
+        """Whether debug messages are kept for this invocation"""
+        return self._state.messages is not None
+
+    def set(self, **fields):
+        """Add fields to the line"""
+
+        if self._state.started is not None:
+            self._state.fields.update(fields)
+
+    def debug(self, msg, *args):
+        """Keep a debug message, formatted only if the line is written"""
+
+        if self._state.messages is not None:
+            self._state.messages.append((msg, args))
+
+    def error(self, err):
+        """Record an error, the line is always written"""
+
+        state = self._state
+
+        if state.started is not None:
+            state.failed = True
+            state.fields["error"] = f"{type(err).__name__}: {err}"
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the invocation in ms"""
+
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            phases = self._state.phases
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+    def flush(self):
+        """Write the line for the invocation, if it is sampled"""
+
+        state = self._state
+
+        if state.started is None or not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        total_ms = (time.perf_counter() - state.started) * 1000
+        state.started = None
+
+        is_slow = self.slow_ms is not None and total_ms >= self.slow_ms
+
+        if not (
+            state.failed
+            or is_slow
+            or state.messages
+            or random.random() < self.sample_rate
+        ):
+            return
+
+        line = {
+            **state.fields,
+            "ms": round(total_ms, 2),
+            "phases": {name: round(ms, 2) for name, ms in state.phases.items()},
+        }
+
+        if state.messages:
+            line["debug"] = [
+                msg % args if args else msg for msg, args in state.messages
+            ]
+
+        self.logger.info(json.dumps(line, separators=(",", ":"), default=str))
@@ -4,278 +4,105 @@ Lambda@edge
 If not an api route, check url slug and redirect based on record in dynamodb
 """
 
-import boto3
-from edge import logger
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+INIT_STARTED = time.perf_counter()
+
+# pylint: disable=wrong-import-position
+from edge import (
+    bloom,
+    cache,
+    cache_control,
+    clicks,
+    config,
+    dynamodb,
+    hedge,
+    logger,
+    og,
+    routes,
+    routing,
+    stateless,
+)
 
 LOGGER = logger.get_logger(__name__)
 
-# Setup boto3
-SESSION = boto3.session.Session()
-AWS_REGION = "us-east-1"
+# Home region of the table, used when a replica read fails
+AWS_REGION = routing.HOME_REGION
+
+# Region this copy of the function runs in, set by lambda@edge
+EDGE_REGION = os.environ.get("AWS_REGION", AWS_REGION)
+
+# Nearest replica of the table to the edge region, set with the stage config
+REPLICA_REGION = AWS_REGION
 
 # Dyanmodb table name
 KERTEYT_TABLE_NAME = None
 EXPIRED_REDIRECT = None
 
-# Lazy init cli
-RES_CONTACT_TABLE = None
+# Stage settings, set by the stage handler
+CONFIG = {}
+
+# Seconds spent in each cold start phase of this container
+#   init: import and building the dynamodb handle
+#   connect: first dynamodb request, endpoint resolution and tls handshake
+#   first_request: first viewer lookup
+TIMINGS = {"init": None, "connect": None, "first_request": None}
+
+# Redirect records cached across invocations in a warm container, bounded in
+# bytes to stay well inside the 128 MB function memory
+REDIRECT_CACHE = cache.RedirectCache(
+    max_bytes=16 * 1024 * 1024, max_entries=50000, max_age=60
+)
+
+# Where a redirect record came from, sent back in the X-Kurteyt-Cache header
+CACHE_MISS = "miss"
+CACHE_STALE_ON_ERROR = "stale-on-error"
+CACHE_STATELESS = "stateless"  # verified from the path, never read
+CACHE_STATUSES = [
+    cache.FRESH,
+    cache.STALE,
+    CACHE_STALE_ON_ERROR,
+    CACHE_MISS,
+    CACHE_STATELESS,
+]
+
+# Lookups with a latency budget, hedged to a second replica when slow
+HEDGER = hedge.HedgedLookup(max_workers=4)
+
+# Background refresh of stale records
+REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+REFRESHING = set()
+
+# Click counts written behind, off the request path
+CLICK_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+# Slugs with no record, kept short so a newly created link shows up quickly
+MISSING_CACHE = cache.RedirectCache(
+    max_bytes=2 * 1024 * 1024, max_entries=20000, max_age=30
+)
+
+# Optional filter of existing slugs, built by admin/build_slug_bloom.py. Slugs
+# outside a recent filter skip dynamodb, see SLUG_FILTER_SKIP_MAX_AGE, past that
+# the filter only decides whether an empty read is cached as missing. An old
+# filter is ignored.
+SLUG_BLOOM_PATH = os.path.join(os.path.dirname(__file__), "slugs.bloom")
+SLUG_BLOOM_MAX_AGE = 7 * 24 * 60 * 60
+SLUG_FILTER = bloom.load_filter(SLUG_BLOOM_PATH)
+
+if SLUG_FILTER and time.time() - SLUG_FILTER.built_at > SLUG_BLOOM_MAX_AGE:
+    SLUG_FILTER = None
+
+# Keys stateless links are verified with, set with the stage config
+STATELESS_KEYS = {}
 
 # Setup logger
 LOGGER = logger.get_logger("index")
 
-
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-  <head>
-    <meta charset="utf-8" />
-    <meta name="viewport" content="width=device-width" />
-    <!-- OG settings -->
-    <meta property="og:title" content="$OG_TITLE" />
-    <meta property="og:description" content="$OG_DESCRIPTION" />
-    <meta property="og:url" content="$OG_URL" />
-    <meta property="og:image" content="$OG_IMAGE" />
-    <meta property="og:image:alt" content="$OG_IMAGE_ALT" />
-    <meta property="og:type" content="website" />
-    <title>CurrentClient</title>
-    <link
-      rel="stylesheet"
-      href="node_modules/modern-normalize/modern-normalize.css"
-    />
-
-    <link rel="preconnect" href="https://fonts.googleapis.com" />
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin />
-    <link
-      href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap"
-      rel="stylesheet"
-    />
-
-    <link
-      href="https://fonts.googleapis.com/css2?family=Caveat&display=swap"
-      rel="stylesheet"
-    />
-
-    <script>
-      window.onload = function () {
-        // similar behavior as clicking on a link
-        setTimeout(() => {
-          // window.location.href = "$REDIRECT_URL";
-          window.location = "$REDIRECT_URL";
-        }, 3000);
-      };
-    </script>
-    <style>
-      html {
-        font-size: 16px;
-      }
-
-      body {
-        margin: 0px;
-        font-family: "Inter", sans-serif;
-      }
-
-      .gotobutton {
-        text-align: center;
-        display: block;
-        text-decoration: none;
-        background-color: white;
-        color: #6b7280;
-        padding: 0.5rem 1rem;
-        border-radius: 4px;
-        font-size: 0.75rem;
-      }
-      .gotobutton:hover {
-        background-color: #f4f4f5;
-      }
-
-      .gotobutton:active {
-        background-color: #d1d5db;
-      }
-
-      .gotobutton:visited {
-        background-color: #ccc;
-      }
-
-      .signature {
-        text-align: right;
-        font-size: 24px;
-        font-family: "Caveat", cursive;
-      }
-
-      .spinner-2 {
-        width: 50px;
-        height: 50px;
-        border-radius: 50%;
-        background: radial-gradient(farthest-side, #3b82f6 94%, #0000) top/8px
-            8px no-repeat,
-          conic-gradient(#0000 30%, #3b82f6);
-        -webkit-mask: radial-gradient(
-          farthest-side,
-          #0000 calc(100% - 8px),
-          #000 0
-        );
-        animation: s3 1s infinite linear;
-      }
-
-      @keyframes s3 {
-        100% {
-          transform: rotate(1turn);
-        }
-      }
-
-      .aspect-ratio-box {
-        width: 100%;
-        position: relative;
-      }
-
-      .aspect-ratio-box::after {
-        display: block;
-        content: "";
-        padding-bottom: 52.6%;
-      }
-
-      .aspect-ratio-box img {
-        position: absolute;
-        left: 0;
-        object-fit: cover;
-        top: 0;
-        width: 100%;
-        height: 100%;
-      }
-
-      .container {
-        padding-left: 1.5rem;
-        padding-right: 1.5rem;
-      }
-
-      .card {
-        position: relative;
-        overflow: hidden;
-        background: white;
-        border-width: 1px;
-        border-radius: 8px;
-        border-style: solid;
-        border-color: #e5e7eb;
-      }
-
-      .card + .card {
-        margin-top: 2rem;
-      }
-    </style>
-  </head>
-  <body>
-    <div style="min-height: 100vh">
-      <!-- colored header -->
-      <div
-        style="
-          background-color: #eff6ff;
-          height: 36vh;
-          border-bottom-width: 1px;
-          border-style: solid;
-          border-color: #e5e7eb;
-        "
-      ></div>
-
-      <!-- upmargined form -->
-      <div
-        style="
-          display: flex;
-          flex-direction: column;
-          align-items: center;
-          padding-left: 2rem;
-          padding-right: 2rem;
-        "
-      >
-        <div style="width: 100%; max-width: 32rem; margin-top: -32vh">
-          <!-- Text header -->
-          <div
-            style="
-              font-size: 1rem;
-              padding-top: 0.5rem;
-              text-align: left;
-              margin-bottom: 2rem;
-            "
-          >
-            <p style="font-size: 1rem; font-weight: 700; margin: 0">
-              $OG_TITLE
-            </p>
-            <p
-              style="
-                font-size: 0.8rem;
-                font-weight: 400;
-                margin: 0;
-                color: #6b7280;
-                padding-top: 0.5rem;
-              "
-            >
-              $OG_DESCRIPTION
-            </p>
-          </div>
-
-          <!-- Image header -->
-          <div class="card">
-            <div class="aspect-ratio-box">
-              <img src="$OG_IMAGE" alt="$OG_IMAGE_ALT" />
-            </div>
-          </div>
-
-          <!-- Loading -->
-
-          <div class="card">
-            <div
-              class="container"
-              style="padding-top: 1rem; padding-bottom: 2rem"
-            >
-              <p style="font-size: 1rem; text-align: center">
-                Preparing your information...
-              </p>
-              <div style="margin-top: 2rem">
-                <div style="margin: auto" class="spinner-2"></div>
-              </div>
-            </div>
-          </div>
-
-          <!-- Redirect -->
-
-          <div class="card">
-            <div
-              class="container"
-              style="padding-top: 1rem; padding-bottom: 1rem"
-            >
-              <a href="$REDIRECT_URL" class="gotobutton"
-                >Click here if you are not redirected
-                <span>&#10230;</span>
-              </a>
-            </div>
-          </div>
-        </div>
-
-        <div>
-          <p
-            style="
-              font-size: smaller;
-              margin-top: 2rem;
-              margin-bottom: 1rem;
-              color: #6b7280;
-            "
-          >
-            Running on
-            <strong
-              ><a
-                style="text-decoration: none; color: #6b7280 !important"
-                href="https://currentclient.com"
-                >CurrentClient</a
-              ></strong
-            >
-          </p>
-        </div>
-      </div>
-    </div>
-  </body>
-</html>
-
-
-"""
+# One structured line per invocation, sampling is set with the stage config
+REQUEST_LOG = logger.RequestLog("index.request")
 
 
 SUPPORTED_STATUS_CODES = {
@@ -286,115 +113,295 @@ SUPPORTED_STATUS_CODES = {
 }
 
 
-# Check its not an api route
-def check_is_apiroute(path):
-    """Check its an api route or a redirectable slug"""
-    LOGGER.info(f"Checking is api route: {path}")
-    is_apiroute = False
+def get_stateless_record(slug):
+    """
+    Redirect record from a stateless link, empty when the token doesnt verify
 
-    if path.startswith("docs"):
-        is_apiroute = True
-    if path.startswith("api/"):
-        is_apiroute = True
-    if path.startswith("openapi"):
-        is_apiroute = True
+    Expired and forged tokens both go to the expired page
+    """
 
-    return is_apiroute
+    try:
+        target_url, expires_at = stateless.decode(
+            slug[len(stateless.TOKEN_PREFIX) :], STATELESS_KEYS
+        )
+    except stateless.InvalidToken as err:
+        REQUEST_LOG.debug("%s", err.message)
+        return {}
+
+    return {
+        "TargetUrl": target_url,
+        "TTL": expires_at,
+        "RedirectStatus": CONFIG["STATELESS_REDIRECT_STATUS"],
+        "CachePolicy": cache_control.CACHE_POLICY_DEFAULT,
+    }
 
 
-def check_is_getmethod(method):
-    """Check its a redirectable method"""
-    LOGGER.info(f"Checking is get method: {method}")
-    is_method = False
+def get_redirect_record(slug):
+    """
+    Get redirect record from cache or dynamodb
 
-    if method == "GET":
-        is_method = True
+    Returns the record and where it came from, one of CACHE_STATUSES
+    """
 
-    return is_method
+    redirect_record = {}
 
+    cleaned_slug = run_format_short_id(slug)
 
-def get_redirect_record(slug):
-    """Get redirect record from dynamodb"""
+    # Check the warm container cache before going to dynamodb
+    cached_record, cached_state = REDIRECT_CACHE.lookup(cleaned_slug)
 
-    LOGGER.info(f"Getting dynamod record with pk: {slug}")
+    if cached_state == cache.FRESH:
+        return cached_record, cached_state
 
-    redirect_record = {}
+    # Serve stale right away, reading it again off the request path
+    if cached_state == cache.STALE and CONFIG["SERVE_STALE"]:
+        schedule_refresh(cleaned_slug)
+        return cached_record, cached_state
 
-    cleaned_slug = run_format_short_id(slug)
+    # Known missing, skip dynamodb
+    if MISSING_CACHE.get(cleaned_slug):
+        REQUEST_LOG.debug("Redirect record known missing: %s", cleaned_slug)
+        return redirect_record, CACHE_MISS
+
+    # Not in a recent slug filter, skip dynamodb
+    if is_filter_miss(cleaned_slug):
+        REQUEST_LOG.debug("Redirect record not in slug filter: %s", cleaned_slug)
+        MISSING_CACHE.put(cleaned_slug, True)
+        return redirect_record, CACHE_MISS
 
     try:
 
-        global RES_CONTACT_TABLE  # pylint: disable=global-statement
+        redirect_record = fetch_redirect_record(cleaned_slug)
 
-        if not RES_CONTACT_TABLE:
-            RES_CONTACT_TABLE = SESSION.resource(
-                service_name="dynamodb", region_name=AWS_REGION
-            ).Table(KERTEYT_TABLE_NAME)
+    except Exception as err:
+        REQUEST_LOG.error(err)
 
-        get_response = RES_CONTACT_TABLE.get_item(
-            Key={
-                # PK and SK are on the record being passed in for updates
-                "PK": cleaned_slug,
-            },
-            ConsistentRead=False,  # True|False,
-        )
+        # Rather a stale record than sending a good link to the expired page
+        if cached_record:
+            return cached_record, CACHE_STALE_ON_ERROR
+
+    return redirect_record, CACHE_MISS
+
+
+def fetch_redirect_record(cleaned_slug):
+    """Read redirect record from dynamodb and cache the result"""
+
+    lookup_started = time.perf_counter()
+
+    redirect_record = lookup_redirect_record(cleaned_slug)
+
+    if TIMINGS["first_request"] is None:
+        TIMINGS["first_request"] = time.perf_counter() - lookup_started
+        REQUEST_LOG.set(cold_start=dict(TIMINGS))
+
+    if redirect_record:
+        REDIRECT_CACHE.put(cleaned_slug, redirect_record)
+    else:
+        REDIRECT_CACHE.invalidate(cleaned_slug)
+
+        if is_known_missing(cleaned_slug):
+            MISSING_CACHE.put(cleaned_slug, True)
+
+    return redirect_record
+
+
+def is_filter_miss(cleaned_slug):
+    """
+    Whether a slug can be taken as missing without reading dynamodb
+
+    Only while the slug filter is younger than SLUG_FILTER_SKIP_MAX_AGE, links
+    created after the build arent in it, so the filter age bounds how long a new
+    link can be sent to the expired page
+    """
+
+    return (
+        SLUG_FILTER is not None
+        and time.time() - SLUG_FILTER.built_at < CONFIG["SLUG_FILTER_SKIP_MAX_AGE"]
+        and cleaned_slug not in SLUG_FILTER
+    )
+
+
+def is_known_missing(cleaned_slug):
+    """
+    Whether a slug the table has no record for can be remembered as missing
+
+    A slug in the slug filter existed when the filter was built, an empty read
+    for it is more likely a replica behind than a deleted link, so it is read
+    again next time
+    """
+
+    return SLUG_FILTER is None or cleaned_slug not in SLUG_FILTER
 
-        redirect_record = get_response.get("Item", False)
 
+def refresh_redirect_record(cleaned_slug):
+    """Read a stale record again, keeps serving it stale if the read fails"""
+
+    try:
+        fetch_redirect_record(cleaned_slug)
     except Exception as err:
         LOGGER.exception(err)
+    finally:
+        REFRESHING.discard(cleaned_slug)
+
+
+def schedule_refresh(cleaned_slug):
+    """
+    Refresh a stale record in the background, once per slug at a time
+
+    The container is frozen once the response is returned, so a refresh that
+    doesnt finish before then completes during a later request
+    """
+
+    if cleaned_slug in REFRESHING:
+        return
+
+    REFRESHING.add(cleaned_slug)
+    REFRESH_EXECUTOR.submit(refresh_redirect_record, cleaned_slug)
+
+
+def read_redirect_record(cleaned_slug, region):
+    """Read redirect record from the table in the region"""
+
+    if CONFIG["TWO_STAGE_OG"]:
+        return dynamodb.get_item_two_stage(
+            KERTEYT_TABLE_NAME,
+            cleaned_slug,
+            region=region,
+            mode=CONFIG["LOOKUP_MODE"],
+        )
+
+    return dynamodb.get_item(
+        KERTEYT_TABLE_NAME,
+        cleaned_slug,
+        region=region,
+        mode=CONFIG["LOOKUP_MODE"],
+        projection=CONFIG["PROJECTION"],
+    )
+
+
+def lookup_redirect_record(cleaned_slug):
+    """
+    Read from the nearest replica inside the lookup budget
+
+    A slow or failed read is hedged with a read from the hedge region, the home
+    region unless set otherwise, and the first answer wins. Without hedging, a
+    failed replica read is tried again in the home region.
+    """
+
+    if not CONFIG["HEDGE"]:
+        return lookup_with_home_retry(cleaned_slug)
+
+    hedge_region = CONFIG["HEDGE_REGION"] or AWS_REGION
+
+    redirect_record, hedged = HEDGER.run(
+        lambda: read_redirect_record(cleaned_slug, REPLICA_REGION),
+        lambda: read_redirect_record(cleaned_slug, hedge_region),
+        budget=CONFIG["LOOKUP_BUDGET"],
+        fraction=CONFIG["ATTEMPT_FRACTION"],
+        percent=CONFIG["HEDGE_PERCENTILE"],
+        min_delay=CONFIG["HEDGE_MIN_DELAY"],
+        default_delay=CONFIG["HEDGE_DEFAULT_DELAY"],
+    )
+
+    REQUEST_LOG.set(replica=hedge_region if hedged else REPLICA_REGION, hedged=hedged)
+
+    return redirect_record
+
+
+def lookup_with_home_retry(cleaned_slug):
+    """
+    Read from the nearest replica, then the home region if that read fails
+
+    The replica read gets ATTEMPT_FRACTION of the budget when there is a home
+    region to retry in, the retry gets the rest
+    """
+
+    budget = CONFIG["LOOKUP_BUDGET"]
+
+    if REPLICA_REGION == AWS_REGION:
+        redirect_record, _ = HEDGER.run(
+            lambda: read_redirect_record(cleaned_slug, AWS_REGION), budget=budget
+        )
+        REQUEST_LOG.set(replica=AWS_REGION, hedged=False)
+        return redirect_record
+
+    started = time.perf_counter()
+
+    try:
+        redirect_record, _ = HEDGER.run(
+            lambda: read_redirect_record(cleaned_slug, REPLICA_REGION),
+            budget=budget * CONFIG["ATTEMPT_FRACTION"],
+        )
+        REQUEST_LOG.set(replica=REPLICA_REGION, hedged=False)
+        return redirect_record
+    except Exception as err:
+        REQUEST_LOG.debug("Replica read failed, retry in home region: %s", err)
+
+    redirect_record, _ = HEDGER.run(
+        lambda: read_redirect_record(cleaned_slug, AWS_REGION),
+        budget=budget - (time.perf_counter() - started),
+    )
+    REQUEST_LOG.set(replica=AWS_REGION, hedged=False)
 
     return redirect_record
 
 
 # Return redirect
-def build_og_redirect(response, redirect_record):
+def build_og_redirect(response, redirect_record, accept_encoding=None):
     """Build the og redirect response"""
 
-    og_settings = redirect_record.get("OgSettings", {})
-    target_url = redirect_record.get("TargetUrl", {})
-
-    # pull og values
-    og_title = og_settings.get("OgTitle", "")
-    og_description = og_settings.get("OgDescription", "")
-    og_url = og_settings.get("OgUrl", "")
-    og_image = og_settings.get("OgImage", "")
-    og_image_alt = og_settings.get("OgImage_alt", "")
-
-    html_page = (
-        HTML_TEMPLATE.replace("$OG_TITLE", og_title)
-        .replace("$OG_DESCRIPTION", og_description)
-        .replace("$OG_URL", og_url)
-        .replace("$OG_IMAGE", og_image)
-        .replace("$OG_IMAGE_ALT", og_image_alt)
-        .replace("$REDIRECT_URL", target_url)
-    )
+    cache_header = cache_control.get_cache_control(redirect_record, CONFIG)
 
     response = {
         "status": "200",
         "statusDescription": "OK",
         "headers": {
-            "cache-control": [{"key": "Cache-Control", "value": "max-age=100"}],
+            "cache-control": [{"key": "Cache-Control", "value": cache_header}],
             "content-type": [{"key": "Content-Type", "value": "text/html"}],
+            "vary": [{"key": "Vary", "value": "Accept-Encoding"}],
         },
-        "body": html_page,
     }
 
+    content_encoding, body = og.get_og_page_body(redirect_record, accept_encoding)
+
+    # Stored page, already compressed and base64 encoded
+    if body:
+        response["headers"]["content-encoding"] = [
+            {"key": "Content-Encoding", "value": content_encoding}
+        ]
+        response["body"] = body
+        response["bodyEncoding"] = "base64"
+
+        return response
+
+    response["body"] = og.render_og_page(redirect_record)
+
     return response
 
 
+def get_header(request, name):
+    """First value of a request header, None if not sent"""
+
+    values = request["headers"].get(name)
+
+    return values[0]["value"] if values else None
+
+
 # Return redirect
-def build_direct_redirect(response, redirect_record, status_code="301"):
+def build_direct_redirect(response, redirect_record, status_code=None):
     """Build the direct redirect response"""
 
     redirect_to_url = redirect_record.get("TargetUrl")
-    LOGGER.info(f"Direct redirect to: {redirect_to_url}")
+    REQUEST_LOG.debug("Direct redirect to: %s", redirect_to_url)
+
+    status_code = status_code or cache_control.get_redirect_status(redirect_record)
+    cache_header = cache_control.get_cache_control(redirect_record, CONFIG)
 
     response = {
         "status": status_code,
         "statusDescription": SUPPORTED_STATUS_CODES[status_code],
         "headers": {
-            "cache-control": [{"key": "Cache-Control", "value": "max-age=100"}],
+            "cache-control": [{"key": "Cache-Control", "value": cache_header}],
             "content-type": [{"key": "Content-Type", "value": "text/html"}],
             "location": [{"key": "Location", "value": redirect_to_url}],
         },
@@ -403,6 +410,41 @@ def build_direct_redirect(response, redirect_record, status_code="301"):
     return response
 
 
+def write_clicks(cleaned_slug, shard, count):
+    """Add the clicks of a link to its counter item in the nearest replica"""
+
+    dynamodb.add_to_counter(
+        KERTEYT_TABLE_NAME,
+        clicks.get_counter_pk(cleaned_slug, REPLICA_REGION, shard),
+        count,
+        region=REPLICA_REGION,
+        mode=CONFIG["LOOKUP_MODE"],
+        ttl=int(time.time()) + CONFIG["CLICK_TTL"],
+    )
+
+
+# Hits per link since the last write, flushed by flush_clicks
+CLICKS = clicks.ClickBuffer(write_clicks)
+
+
+def log_flush_error(future):
+    """Log a failed click flush, its counts are back in the buffer"""
+
+    err = future.exception()
+
+    if err is not None:
+        LOGGER.error(f"Click flush failed: {err}")
+
+
+def flush_clicks():
+    """Write the clicks in the background when due, after the response is built"""
+
+    future = CLICKS.maybe_flush(CLICK_EXECUTOR)
+
+    if future is not None:
+        future.add_done_callback(log_flush_error)
+
+
 def make_response(cloudfront_event):
     """Check the request and determine response"""
 
@@ -415,22 +457,48 @@ def make_response(cloudfront_event):
 
     requested_method = request["method"]
 
+    route = routes.classify_request(requested_slug, requested_method)
+
+    REQUEST_LOG.set(uri=requested_path, method=requested_method, route=route)
+
     # Return original and let it continue
-    if check_is_apiroute(requested_slug):
-        LOGGER.info("Forward to API")
+    if route == routes.ROUTE_FORWARD:
         return request
 
-    # If its not a GET method, dont redirect
-    if not check_is_getmethod(requested_method):
-        LOGGER.info("Forward to API, not a GET")
-        return request
+    if route == routes.ROUTE_STATIC:
+        return routes.build_static_response(requested_slug, requested_method)
+
+    redirect_record, cache_status = {}, CACHE_MISS
 
     # Read slug from dynamodb to get redirect path
-    redirect_record = get_redirect_record(requested_slug)
+    if route == routes.ROUTE_REDIRECT:
+        with REQUEST_LOG.phase("lookup"):
+            redirect_record, cache_status = get_redirect_record(requested_slug)
+
+    # Target is in the path, nothing to read
+    if route == routes.ROUTE_STATELESS:
+        redirect_record = get_stateless_record(requested_slug)
+        cache_status = CACHE_STATELESS
+
+    REQUEST_LOG.set(cache=cache_status)
+
+    user_agent = get_header(request, "user-agent")
+
+    # Link previews arent clicks, stateless links are one per recipient
+    if (
+        route == routes.ROUTE_REDIRECT
+        and redirect_record
+        and CONFIG["CLICKS"]
+        and not og.is_crawler(user_agent)
+    ):
+        CLICKS.add(run_format_short_id(requested_slug))
 
     if not redirect_record:
-        LOGGER.info("Forward to API, no redirect recorded")
-        redirect_record = {"TargetUrl": EXPIRED_REDIRECT}
+        REQUEST_LOG.debug("No redirect recorded, redirect to expired")
+        redirect_record = {
+            "TargetUrl": EXPIRED_REDIRECT,
+            "CachePolicy": cache_control.CACHE_POLICY_MISSING,
+        }
 
     # Find target URL
     redirect_type = redirect_record.get("RedirectType")
@@ -441,13 +509,26 @@ def make_response(cloudfront_event):
         "statusDescription": "OK",
     }
 
-    # OG html type
-    if redirect_type == "OG_HTML":
-        response = build_og_redirect(response, redirect_record)
+    with REQUEST_LOG.phase("build"):
+        # OG html type, people skip the interstitial when crawler aware
+        if redirect_type == "OG_HTML" and (
+            not CONFIG["CRAWLER_AWARE_OG"] or og.is_crawler(user_agent)
+        ):
+            response = build_og_redirect(
+                response,
+                redirect_record,
+                accept_encoding=get_header(request, "accept-encoding"),
+            )
 
-    # Direct type
-    else:
-        response = build_direct_redirect(response, redirect_record)
+        # Direct type
+        else:
+            response = build_direct_redirect(response, redirect_record)
+
+    REQUEST_LOG.set(status=response["status"])
+
+    response["headers"]["x-kurteyt-cache"] = [
+        {"key": "X-Kurteyt-Cache", "value": cache_status}
+    ]
 
     return response
 
@@ -466,9 +547,9 @@ def run_format_short_id(short_id_in: str):
 
 
 def handler(evt=None, ctx=None):
-    """Handle viewer-request"""
+    """Handle viewer-request or origin-request"""
 
-    LOGGER.info(f"FULL EVENT: {evt}")
+    REQUEST_LOG.start(getattr(ctx, "aws_request_id", None))
 
     try:
         #  Get the incoming request and the initial response from S3
@@ -477,31 +558,110 @@ def handler(evt=None, ctx=None):
 
         res = make_response(cloudfront_event)
 
+        if CONFIG["CLICKS"]:
+            flush_clicks()
+
+        # Stats are only worth building for sampled invocations
+        if REQUEST_LOG.sampled:
+            REQUEST_LOG.debug("Redirect cache: %s", REDIRECT_CACHE.stats())
+            REQUEST_LOG.debug("Missing cache: %s", MISSING_CACHE.stats())
+            REQUEST_LOG.debug("Hedged lookups: %s", HEDGER.stats())
+            REQUEST_LOG.debug("Clicks: %s", CLICKS.stats())
+
         return res
 
     except Exception as err:
-        LOGGER.error("Failed with error: %s", err)
+        REQUEST_LOG.error(err)
         raise err
 
+    finally:
+        REQUEST_LOG.flush()
+
 
 # Different handler for each env to handle
 # to set env variables, since cant pass in
 # env variables to lambda @edge function
 
 
-def handler_dev(evt=None, ctx=None):
-    """dev env"""
+def configure(stage):
+    """Set the settings for the stage, once per container"""
+    global CONFIG
     global KERTEYT_TABLE_NAME
     global EXPIRED_REDIRECT
-    KERTEYT_TABLE_NAME = "cc-east-dev-db-kurteyt"
-    EXPIRED_REDIRECT = "https://client.currentclient.io/expired"
+    global REPLICA_REGION
+    global STATELESS_KEYS
+
+    if CONFIG.get("STAGE") == stage:
+        return
+
+    CONFIG = config.get_stage_config(stage)
+    KERTEYT_TABLE_NAME = CONFIG["KERTEYT_TABLE_NAME"]
+    EXPIRED_REDIRECT = CONFIG["EXPIRED_REDIRECT"]
+    REPLICA_REGION = routing.pick_replica(EDGE_REGION, CONFIG["REPLICA_REGIONS"])
+    STATELESS_KEYS = stateless.load_keys(CONFIG["STATELESS_KEYS"])
+    REDIRECT_CACHE.max_stale = CONFIG["MAX_STALE"]
+    REQUEST_LOG.sample_rate = CONFIG["LOG_SAMPLE_RATE"]
+    REQUEST_LOG.debug_sample_rate = CONFIG["LOG_DEBUG_SAMPLE_RATE"]
+    REQUEST_LOG.slow_ms = CONFIG["LOG_SLOW_MS"]
+    CLICKS.flush_hits = CONFIG["CLICK_FLUSH_HITS"]
+    CLICKS.flush_seconds = CONFIG["CLICK_FLUSH_SECONDS"]
+    CLICKS.max_links = CONFIG["CLICK_MAX_LINKS"]
+    CLICKS.shard = random.randrange(CONFIG["CLICK_SHARDS"])
+
+    dynamodb.configure(CONFIG)
+
+
+def warm_up():
+    """
+    Open the dynamodb connection in the init phase, so the first viewer on a
+    cold container doesnt pay for the tls handshake
+    """
+
+    stage = config.get_stage_from_function_name(
+        os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "")
+    )
+
+    if stage:
+        configure(stage)
+
+    try:
+        if stage and CONFIG["WARM_UP"]:
+            _, TIMINGS["connect"] = dynamodb.warm_up(
+                KERTEYT_TABLE_NAME, region=REPLICA_REGION, mode=CONFIG["LOOKUP_MODE"]
+            )
+    except Exception as err:
+        LOGGER.exception(err)
+
+    TIMINGS["init"] = time.perf_counter() - INIT_STARTED - (TIMINGS["connect"] or 0)
+
+
+def handler_dev(evt=None, ctx=None):
+    """dev env"""
+    configure("dev")
     return handler(evt, ctx)
 
 
 def handler_prd(evt=None, ctx=None):
     """prd env"""
-    global KERTEYT_TABLE_NAME
-    global EXPIRED_REDIRECT
-    KERTEYT_TABLE_NAME = "cc-east-prd-db-kurteyt"
-    EXPIRED_REDIRECT = "https://client.currentclient.com/expired"
+    configure("prd")
     return handler(evt, ctx)
+
+
+# Origin-request trigger, cloudfront caches the responses and the function
+# only runs on a cache miss. Selected per stage by edgeEventType in serverless.
+
+
+def handler_origin_dev(evt=None, ctx=None):
+    """dev env, origin-request"""
+    configure("dev")
+    return handler(evt, ctx)
+
+
+def handler_origin_prd(evt=None, ctx=None):
+    """prd env, origin-request"""
+    configure("prd")
+    return handler(evt, ctx)
+
+
+# Runs during the lambda init phase
+warm_up()
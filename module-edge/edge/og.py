@@ -0,0 +1,421 @@
+"""
+Og
+
+The og interstitial page: the template, rendering it for a record and picking
+the pre-rendered body a viewer accepts. Crawlers get the page, people can be
+redirected right away.
+"""
+
+import re
+from functools import lru_cache
+
+from edge import cache, render
+
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8" />
+    <meta name="viewport" content="width=device-width" />
+    <!-- OG settings -->
+    <meta property="og:title" content="$OG_TITLE" />
+    <meta property="og:description" content="$OG_DESCRIPTION" />
+    <meta property="og:url" content="$OG_URL" />
+    <meta property="og:image" content="$OG_IMAGE" />
+    <meta property="og:image:alt" content="$OG_IMAGE_ALT" />
+    <meta property="og:type" content="website" />
+    <title>CurrentClient</title>
+    <link
+      rel="stylesheet"
+      href="node_modules/modern-normalize/modern-normalize.css"
+    />
+
+    <link rel="preconnect" href="https://fonts.googleapis.com" />
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin />
+    <link
+      href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap"
+      rel="stylesheet"
+    />
+
+    <link
+      href="https://fonts.googleapis.com/css2?family=Caveat&display=swap"
+      rel="stylesheet"
+    />
+
+    <script>
+      window.onload = function () {
+        // similar behavior as clicking on a link
+        setTimeout(() => {
+          // window.location.href = "$REDIRECT_URL";
+          window.location = "$REDIRECT_URL";
+        }, 3000);
+      };
+    </script>
+    <style>
+      html {
+        font-size: 16px;
+      }
+
+      body {
+        margin: 0px;
+        font-family: "Inter", sans-serif;
+      }
+
+      .gotobutton {
+        text-align: center;
+        display: block;
+        text-decoration: none;
+        background-color: white;
+        color: #6b7280;
+        padding: 0.5rem 1rem;
+        border-radius: 4px;
+        font-size: 0.75rem;
+      }
+      .gotobutton:hover {
+        background-color: #f4f4f5;
+      }
+
+      .gotobutton:active {
+        background-color: #d1d5db;
+      }
+
+      .gotobutton:visited {
+        background-color: #ccc;
+      }
+
+      .signature {
+        text-align: right;
+        font-size: 24px;
+        font-family: "Caveat", cursive;
+      }
+
+      .spinner-2 {
+        width: 50px;
+        height: 50px;
+        border-radius: 50%;
+        background: radial-gradient(farthest-side, #3b82f6 94%, #0000) top/8px
+            8px no-repeat,
+          conic-gradient(#0000 30%, #3b82f6);
+        -webkit-mask: radial-gradient(
+          farthest-side,
+          #0000 calc(100% - 8px),
+          #000 0
+        );
+        animation: s3 1s infinite linear;
+      }
+
+      @keyframes s3 {
+        100% {
+          transform: rotate(1turn);
+        }
+      }
+
+      .aspect-ratio-box {
+        width: 100%;
+        position: relative;
+      }
+
+      .aspect-ratio-box::after {
+        display: block;
+        content: "";
+        padding-bottom: 52.6%;
+      }
+
+      .aspect-ratio-box img {
+        position: absolute;
+        left: 0;
+        object-fit: cover;
+        top: 0;
+        width: 100%;
+        height: 100%;
+      }
+
+      .container {
+        padding-left: 1.5rem;
+        padding-right: 1.5rem;
+      }
+
+      .card {
+        position: relative;
+        overflow: hidden;
+        background: white;
+        border-width: 1px;
+        border-radius: 8px;
+        border-style: solid;
+        border-color: #e5e7eb;
+      }
+
+      .card + .card {
+        margin-top: 2rem;
+      }
+    </style>
+  </head>
+  <body>
+    <div style="min-height: 100vh">
+      <!-- colored header -->
+      <div
+        style="
+          background-color: #eff6ff;
+          height: 36vh;
+          border-bottom-width: 1px;
+          border-style: solid;
+          border-color: #e5e7eb;
+        "
+      ></div>
+
+      <!-- upmargined form -->
+      <div
+        style="
+          display: flex;
+          flex-direction: column;
+          align-items: center;
+          padding-left: 2rem;
+          padding-right: 2rem;
+        "
+      >
+        <div style="width: 100%; max-width: 32rem; margin-top: -32vh">
+          <!-- Text header -->
+          <div
+            style="
+              font-size: 1rem;
+              padding-top: 0.5rem;
+              text-align: left;
+              margin-bottom: 2rem;
+            "
+          >
+            <p style="font-size: 1rem; font-weight: 700; margin: 0">
+              $OG_TITLE
+            </p>
+            <p
+              style="
+                font-size: 0.8rem;
+                font-weight: 400;
+                margin: 0;
+                color: #6b7280;
+                padding-top: 0.5rem;
+              "
+            >
+              $OG_DESCRIPTION
+            </p>
+          </div>
+
+          <!-- Image header -->
+          <div class="card">
+            <div class="aspect-ratio-box">
+              <img src="$OG_IMAGE" alt="$OG_IMAGE_ALT" />
+            </div>
+          </div>
+
+          <!-- Loading -->
+
+          <div class="card">
+            <div
+              class="container"
+              style="padding-top: 1rem; padding-bottom: 2rem"
+            >
+              <p style="font-size: 1rem; text-align: center">
+                Preparing your information...
+              </p>
+              <div style="margin-top: 2rem">
+                <div style="margin: auto" class="spinner-2"></div>
+              </div>
+            </div>
+          </div>
+
+          <!-- Redirect -->
+
+          <div class="card">
+            <div
+              class="container"
+              style="padding-top: 1rem; padding-bottom: 1rem"
+            >
+              <a href="$REDIRECT_URL" class="gotobutton"
+                >Click here if you are not redirected
+                <span>&#10230;</span>
+              </a>
+            </div>
+          </div>
+        </div>
+
+        <div>
+          <p
+            style="
+              font-size: smaller;
+              margin-top: 2rem;
+              margin-bottom: 1rem;
+              color: #6b7280;
+            "
+          >
+            Running on
+            <strong
+              ><a
+                style="text-decoration: none; color: #6b7280 !important"
+                href="https://currentclient.com"
+                >CurrentClient</a
+              ></strong
+            >
+          </p>
+        </div>
+      </div>
+    </div>
+  </body>
+</html>
+
+
+"""
+
+
+# Compiled once, placeholders are escaped for their html or js context
+OG_TEMPLATE = render.CompiledTemplate(HTML_TEMPLATE)
+
+# Version of the template, og pages pre-rendered by the api for another version
+# are rendered here instead. Bump with OG_TEMPLATE_VERSION in app/core/render.py
+OG_TEMPLATE_VERSION = "1"
+
+# Link preview crawlers that get the og page, other visitors are redirected
+# right away. Matched anywhere in the lowercased user-agent, which is much
+# cheaper than an IGNORECASE alternation.
+CRAWLER_PATTERN = re.compile(
+    "|".join(
+        [
+            "facebookexternalhit",
+            "facebookcatalog",
+            "facebot",
+            "meta-externalagent",
+            "twitterbot",
+            "slackbot",
+            "slack-imgproxy",
+            "linkedinbot",
+            "discordbot",
+            "telegrambot",
+            "whatsapp",
+            "skypeuripreview",
+            "microsoftpreview",
+            "pinterest",
+            "redditbot",
+            "tumblr",
+            "embedly",
+            "iframely",
+            "mastodon",
+            "bluesky",
+            "snapchat",
+            "vkshare",
+            "kakaotalk-scrap",
+            "applebot",
+            "googlebot",
+            "google-inspectiontool",
+            "bingbot",
+            "bingpreview",
+            "yandex",
+            "duckduckbot",
+            "baiduspider",
+            "bitlybot",
+            "w3c_validator",
+        ]
+    )
+)
+
+# Content-Encoding of each pre-rendered og page body, in order of preference
+OG_PAGE_ENCODINGS = (("br", "Br"), ("gzip", "Gzip"))
+
+# Rendered og pages by (PK, record version)
+RENDER_CACHE = cache.RedirectCache(
+    max_bytes=4 * 1024 * 1024, max_entries=500, max_age=300
+)
+
+
+def get_record_version(redirect_record):
+    """
+    Version of a record, changes whenever the record is written
+
+    Records that were never updated have no UpdatedAt, the CreatedAt of a link
+    made again under the same slug tells it apart. Both are in the projections.
+    """
+
+    return (
+        redirect_record.get("UpdatedAt")
+        or redirect_record.get("CreatedAt")
+        or redirect_record.get("TTL")
+    )
+
+
+def render_og_page(redirect_record):
+    """Render og interstitial page, reusing the page rendered for this version"""
+
+    render_key = None
+
+    if redirect_record.get("PK"):
+        render_key = (redirect_record["PK"], get_record_version(redirect_record))
+
+        cached_page = RENDER_CACHE.get(render_key)
+
+        if cached_page:
+            return cached_page
+
+    og_settings = redirect_record.get("OgSettings") or {}
+
+    html_page = OG_TEMPLATE.render(
+        {
+            "OG_TITLE": og_settings.get("OgTitle"),
+            "OG_DESCRIPTION": og_settings.get("OgDescription"),
+            "OG_URL": og_settings.get("OgUrl"),
+            "OG_IMAGE": og_settings.get("OgImage"),
+            "OG_IMAGE_ALT": og_settings.get("OgImageAlt"),
+            "REDIRECT_URL": redirect_record.get("TargetUrl"),
+        }
+    )
+
+    if render_key:
+        RENDER_CACHE.put(render_key, html_page)
+
+    return html_page
+
+
+@lru_cache(maxsize=1024)
+def is_crawler(user_agent):
+    """Whether the user-agent is a link preview crawler, no user-agent counts"""
+
+    if not user_agent:
+        return True
+
+    return CRAWLER_PATTERN.search(user_agent.lower()) is not None
+
+
+@lru_cache(maxsize=256)
+def get_accepted_encodings(accept_encoding):
+    """Encodings in an accept-encoding header, leaving out q=0"""
+
+    accepted = set()
+
+    for value in accept_encoding.lower().split(","):
+        coding, _, params = value.partition(";")
+        params = params.replace(" ", "")
+
+        if params in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+
+        accepted.add(coding.strip())
+
+    return frozenset(accepted)
+
+
+def get_og_page_body(redirect_record, accept_encoding):
+    """
+    Pre-rendered og page body the viewer accepts
+
+    Returns the content encoding and base64 body, or (None, None) when the
+    page has to be rendered
+    """
+
+    og_page = redirect_record.get("OgPage")
+
+    if not og_page or og_page.get("Version") != OG_TEMPLATE_VERSION:
+        return None, None
+
+    accepted = get_accepted_encodings(accept_encoding or "")
+
+    for content_encoding, attribute in OG_PAGE_ENCODINGS:
+        if og_page.get(attribute) and (content_encoding in accepted or "*" in accepted):
+            return content_encoding, og_page[attribute]
+
+    return None, None
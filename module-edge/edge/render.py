@@ -0,0 +1,96 @@
+"""
+Render
+
+Template renderer for the og interstitial page. The template is split into
+static segments once, each render fills the slots with escaped values and does a
+single join.
+"""
+
+import html
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\$([A-Z][A-Z_]*)")
+SCRIPT_PATTERN = re.compile(r"<script\b.*?</script>", re.IGNORECASE | re.DOTALL)
+
+# Value inside a double quoted js string in a script block
+JS_STRING_ESCAPES = str.maketrans(
+    {
+        "\\": "\\\\",
+        '"': '\\"',
+        "'": "\\'",
+        "\n": "\\n",
+        "\r": "\\r",
+        "<": "\\u003C",
+        ">": "\\u003E",
+        "&": "\\u0026",
+        "\u2028": "\\u2028",
+        "\u2029": "\\u2029",
+    }
+)
+
+
+def escape_html(value):
+    """Escape for html text and quoted attribute values"""
+    return html.escape(str(value), quote=True)
+
+
+def escape_js_string(value):
+    """Escape for a quoted js string"""
+    return str(value).translate(JS_STRING_ESCAPES)
+
+
+class CompiledTemplate:
+    """
+    CompiledTemplate
+
+    Template with $NAME placeholders, compiled once. Placeholders in a script
+    block are js escaped, everywhere else html escaped.
+
+    Usage:
+        OG_TEMPLATE = render.CompiledTemplate(HTML_TEMPLATE)
+        html_page = OG_TEMPLATE.render({"OG_TITLE": "Title"})
+    """
+
+    def __init__(self, template):
+        """
+        Compile the template
+
+        Args:
+            template: Template string with $NAME placeholders
+
+        """
+        script_spans = [match.span() for match in SCRIPT_PATTERN.finditer(template)]
+
+        # Static segments with an empty string where each slot goes
+        self._parts = []
+        # (index in parts, placeholder name, escape function)
+        self._slots = []
+
+        position = 0
+
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            self._parts.append(template[position : match.start()])
+
+            in_script = any(start <= match.start() < end for start, end in script_spans)
+            escape = escape_js_string if in_script else escape_html
+
+            self._slots.append((len(self._parts), match.group(1), escape))
+            self._parts.append("")
+
+            position = match.end()
+
+        self._parts.append(template[position:])
+
+        self.names = frozenset(name for _, name, _ in self._slots)
+
+    def render(self, values):
+        """Render with values keyed by placeholder name, missing values are empty"""
+
+        parts = self._parts[:]
+
+        for index, name, escape in self._slots:
+            value = values.get(name)
+            if value:
+                parts[index] = escape(value)
+
+        return "".join(parts)
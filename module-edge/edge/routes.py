@@ -0,0 +1,95 @@
+"""
+Routes
+
+What the edge does with a request, from its path and method, and the canned
+responses of static paths
+"""
+
+from edge import stateless
+
+# What to do with a request
+ROUTE_FORWARD = "FORWARD"  # let it continue to the api
+ROUTE_REDIRECT = "REDIRECT"  # slug, redirect from its record
+ROUTE_STATIC = "STATIC"  # canned response, no lookup
+ROUTE_EXPIRED = "EXPIRED"  # no slug, redirect to the expired page
+ROUTE_STATELESS = "STATELESS"  # signed token, redirect without a lookup
+
+# Paths starting with these go to the api
+ROUTE_PREFIXES = ("docs", "api/", "openapi")
+
+# Paths matched exactly
+ROUTE_EXACT = {
+    "": ROUTE_EXPIRED,
+    "health": ROUTE_FORWARD,
+    "robots.txt": ROUTE_STATIC,
+    "favicon.ico": ROUTE_STATIC,
+    "apple-touch-icon.png": ROUTE_STATIC,
+    "apple-touch-icon-precomposed.png": ROUTE_STATIC,
+}
+
+# Methods that can be answered at the edge, per route, anything else is forwarded
+ROUTE_METHODS = {
+    ROUTE_REDIRECT: frozenset(["GET"]),
+    ROUTE_EXPIRED: frozenset(["GET"]),
+    ROUTE_STATIC: frozenset(["GET", "HEAD"]),
+    ROUTE_STATELESS: frozenset(["GET"]),
+    ROUTE_FORWARD: frozenset(),
+}
+
+# Canned responses for ROUTE_STATIC paths
+STATIC_CACHE_CONTROL = [{"key": "Cache-Control", "value": "max-age=86400"}]
+NO_CONTENT = {
+    "status": "204",
+    "statusDescription": "No Content",
+    "headers": {"cache-control": STATIC_CACHE_CONTROL},
+}
+STATIC_RESPONSES = {
+    "robots.txt": {
+        "status": "200",
+        "statusDescription": "OK",
+        "headers": {
+            "cache-control": STATIC_CACHE_CONTROL,
+            "content-type": [{"key": "Content-Type", "value": "text/plain"}],
+        },
+        "body": "User-agent: *\nDisallow:\n",
+    },
+    "favicon.ico": NO_CONTENT,
+    "apple-touch-icon.png": NO_CONTENT,
+    "apple-touch-icon-precomposed.png": NO_CONTENT,
+}
+
+
+def classify_request(path, method):
+    """Route for the path and method, one of the ROUTE_ values"""
+
+    route = ROUTE_EXACT.get(path)
+
+    if route is None:
+        if path.startswith(ROUTE_PREFIXES):
+            route = ROUTE_FORWARD
+        elif path.startswith(stateless.TOKEN_PREFIX):
+            route = ROUTE_STATELESS
+        else:
+            route = ROUTE_REDIRECT
+
+    if method not in ROUTE_METHODS[route]:
+        return ROUTE_FORWARD
+
+    return route
+
+
+def build_static_response(path, method):
+    """Build the canned response for a static path, HEAD gets no body"""
+
+    static_response = STATIC_RESPONSES[path]
+
+    response = {
+        "status": static_response["status"],
+        "statusDescription": static_response["statusDescription"],
+        "headers": dict(static_response["headers"]),
+    }
+
+    if method == "GET" and "body" in static_response:
+        response["body"] = static_response["body"]
+
+    return response
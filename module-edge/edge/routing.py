@@ -0,0 +1,83 @@
+"""
+Routing
+
+Pick the nearest replica of the kurteyt global table for the region the edge
+function runs in.
+"""
+
+HOME_REGION = "us-east-1"
+
+# Regions the table can be replicated to
+REPLICA_CANDIDATES = [
+    "us-east-1",
+    "us-west-2",
+    "sa-east-1",
+    "eu-west-1",
+    "eu-central-1",
+    "ap-south-1",
+    "ap-southeast-1",
+    "ap-northeast-1",
+    "ap-southeast-2",
+]
+
+# Approximate round trip ms from the region lambda@edge runs in to each
+# replica candidate, same order as REPLICA_CANDIDATES
+LATENCY_MS = {
+    "us-east-1": [2, 65, 115, 70, 90, 190, 215, 150, 200],
+    "us-east-2": [12, 50, 125, 85, 100, 200, 205, 140, 190],
+    "us-west-1": [62, 22, 175, 135, 145, 230, 170, 105, 140],
+    "us-west-2": [65, 2, 175, 125, 140, 220, 160, 100, 140],
+    "ca-central-1": [15, 60, 125, 75, 95, 200, 220, 150, 200],
+    "sa-east-1": [115, 175, 2, 180, 200, 300, 320, 255, 310],
+    "eu-west-1": [70, 125, 180, 2, 25, 120, 170, 210, 260],
+    "eu-west-2": [75, 130, 185, 12, 15, 115, 165, 215, 265],
+    "eu-west-3": [80, 135, 190, 18, 10, 110, 160, 220, 270],
+    "eu-central-1": [90, 140, 200, 25, 2, 110, 155, 225, 285],
+    "eu-north-1": [105, 160, 215, 40, 25, 130, 175, 240, 300],
+    "ap-south-1": [190, 220, 300, 120, 110, 2, 60, 125, 150],
+    "ap-southeast-1": [215, 160, 320, 170, 155, 60, 2, 70, 95],
+    "ap-southeast-2": [200, 140, 310, 260, 285, 150, 95, 110, 2],
+    "ap-northeast-1": [150, 100, 255, 210, 225, 125, 70, 2, 110],
+    "ap-northeast-2": [175, 125, 285, 235, 245, 140, 75, 35, 135],
+    "ap-northeast-3": [155, 105, 260, 215, 230, 130, 75, 10, 115],
+}
+
+
+def get_latency_ms(edge_region, replica_region):
+    """Approximate round trip ms, None if the pair isnt mapped"""
+
+    latencies = LATENCY_MS.get(edge_region)
+
+    if latencies is None or replica_region not in REPLICA_CANDIDATES:
+        return None
+
+    return latencies[REPLICA_CANDIDATES.index(replica_region)]
+
+
+def pick_replica(edge_region, replica_regions):
+    """
+    Nearest replica to the edge region
+
+    Args:
+        edge_region: Region the edge function runs in
+        replica_regions: Regions the table is replicated to
+
+    Falls back to the home region when no replica can be ranked
+    """
+
+    if edge_region in replica_regions:
+        return edge_region
+
+    nearest_region = HOME_REGION
+    nearest_latency = None
+
+    for region in replica_regions:
+        latency = get_latency_ms(edge_region, region)
+
+        if latency is not None and (
+            nearest_latency is None or latency < nearest_latency
+        ):
+            nearest_region = region
+            nearest_latency = latency
+
+    return nearest_region
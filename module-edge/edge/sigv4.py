@@ -0,0 +1,315 @@
+"""
+SigV4
+
+Minimal dynamodb client for the edge, signs requests with SigV4 itself and
+keeps https connections open over the stdlib, so the lookup path never imports
+boto3. Only what the edge needs, GetItem and UpdateItem for click counters.
+"""
+
+import datetime
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+SERVICE = "dynamodb"
+TARGET_PREFIX = "DynamoDB_20120810."
+CONTENT_TYPE = "application/x-amz-json-1.0"
+
+# Errors worth another attempt, the request never reached dynamodb or it asked
+# to slow down
+RETRYABLE_ERRORS = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "InternalServerError",
+    "ServiceUnavailable",
+}
+
+
+class DynamoDBError(Exception):
+    """Exception for an error response from dynamodb"""
+
+    def __init__(self, status, code, detail):
+        super().__init__()
+        self.status = status
+        self.code = code
+        self.message = f"DynamoDB request failed: {status} {code} {detail}"
+        self.__cause__ = None
+
+    def __str__(self):
+        return self.message
+
+
+def get_credentials():
+    """
+    Credentials of the function role
+
+    Lambda sets them as env variables, lambda@edge included
+    """
+
+    return (
+        os.environ["AWS_ACCESS_KEY_ID"],
+        os.environ["AWS_SECRET_ACCESS_KEY"],
+        os.environ.get("AWS_SESSION_TOKEN"),
+    )
+
+
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+# (secret, date, region) => signing key, the key only changes daily
+SIGNING_KEYS = {}
+
+
+def get_signing_key(secret_key, date_stamp, region):
+    """SigV4 signing key for the day, cached"""
+
+    cache_key = (secret_key, date_stamp, region)
+    signing_key = SIGNING_KEYS.get(cache_key)
+
+    if signing_key is None:
+        key = _hmac(("AWS4" + secret_key).encode("utf-8"), date_stamp)
+        key = _hmac(key, region)
+        key = _hmac(key, SERVICE)
+        signing_key = _hmac(key, "aws4_request")
+
+        SIGNING_KEYS.clear()
+        SIGNING_KEYS[cache_key] = signing_key
+
+    return signing_key
+
+
+def sign(host, region, target, body, credentials, now=None):
+    """
+    Headers for a signed dynamodb POST to /
+
+    Args:
+        host: Host header of the endpoint
+        region: Region of the table
+        target: Operation, like GetItem
+        body: Request body bytes
+        credentials: (access key, secret key, session token)
+        now: Signing time, utc datetime
+
+    """
+    access_key, secret_key, session_token = credentials
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = amz_date[:8]
+
+    headers = {
+        "content-type": CONTENT_TYPE,
+        "host": host,
+        "x-amz-date": amz_date,
+        "x-amz-target": TARGET_PREFIX + target,
+    }
+
+    if session_token:
+        headers["x-amz-security-token"] = session_token
+
+    signed_headers = ";".join(sorted(headers))
+    canonical_headers = "".join(f"{name}:{headers[name]}\n" for name in sorted(headers))
+
+    canonical_request = "\n".join(
+        [
+            "POST",
+            "/",
+            "",
+            canonical_headers,
+            signed_headers,
+            hashlib.sha256(body).hexdigest(),
+        ]
+    )
+
+    scope = f"{date_stamp}/{region}/{SERVICE}/aws4_request"
+
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ]
+    )
+
+    signature = hmac.new(
+        get_signing_key(secret_key, date_stamp, region),
+        string_to_sign.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+    headers["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+
+    return headers
+
+
+class DynamoDBClient:
+    """
+    DynamoDBClient
+
+    Signed requests over a small pool of persistent connections, safe to use
+    from the hedge and refresh threads.
+
+    Usage:
+        client = sigv4.DynamoDBClient("us-east-1")
+        item = client.get_item(TableName="table", Key={"PK": {"S": "abc"}})
+    """
+
+    def __init__(
+        self,
+        region,
+        endpoint_url=None,
+        connect_timeout=0.5,
+        read_timeout=1.0,
+        max_attempts=2,
+        max_pool_connections=4,
+    ):
+        """
+        Client for a region
+
+        Args:
+            region: Region of the table, also the signing region
+            endpoint_url: Endpoint override, like http://127.0.0.1:8000
+            connect_timeout: Seconds to open a connection
+            read_timeout: Seconds to wait on a response
+            max_attempts: Attempts for connection errors and retryable errors
+            max_pool_connections: Idle connections kept open
+
+        """
+        endpoint_url = endpoint_url or f"https://{SERVICE}.{region}.amazonaws.com"
+        parts = urlsplit(endpoint_url)
+
+        self.region = region
+        self.host = parts.netloc
+        self.is_https = parts.scheme == "https"
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+        self.max_pool_connections = max_pool_connections
+
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        """Open a connection, the read timeout is set once it is connected"""
+
+        if self.is_https:
+            connection = http.client.HTTPSConnection(
+                self.host, timeout=self.connect_timeout
+            )
+        else:
+            connection = http.client.HTTPConnection(
+                self.host, timeout=self.connect_timeout
+            )
+
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        return connection
+
+    def _acquire(self):
+        """Idle connection, or a new one. Returns the connection and if it is new"""
+
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), False
+
+        return self._new_connection(), True
+
+    def _release(self, connection):
+        """Keep the connection open for the next request"""
+
+        with self._lock:
+            if len(self._idle) < self.max_pool_connections:
+                self._idle.append(connection)
+                return
+
+        connection.close()
+
+    def _send(self, body, headers):
+        """POST on a pooled connection, returns the response and its body"""
+
+        connection, is_new = self._acquire()
+
+        try:
+            connection.request("POST", "/", body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+
+            if is_new:
+                raise
+
+            # Idle connection the server already closed, once more on a new one
+            connection = self._new_connection()
+            connection.request("POST", "/", body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+
+        return response, payload
+
+    def request(self, target, params):
+        """
+        Send a signed request
+
+        Args:
+            target: Operation, like GetItem
+            params: Request params as dynamodb json
+
+        Raises:
+            DynamoDBError
+            OSError, http.client.HTTPException when connecting fails
+
+        """
+        body = json.dumps(params, separators=(",", ":")).encode("utf-8")
+
+        for attempt in range(1, self.max_attempts + 1):
+            headers = sign(self.host, self.region, target, body, get_credentials())
+
+            try:
+                response, payload = self._send(body, headers)
+            except (OSError, http.client.HTTPException):
+                if attempt == self.max_attempts:
+                    raise
+                continue
+
+            data = json.loads(payload) if payload else {}
+
+            if response.status == 200:
+                return data
+
+            code = data.get("__type", "").rpartition("#")[2]
+            error = DynamoDBError(response.status, code, data.get("message", ""))
+
+            if code not in RETRYABLE_ERRORS or attempt == self.max_attempts:
+                raise error
+
+            time.sleep(0.025 * 2 ** (attempt - 1))
+
+        raise DynamoDBError(0, "MaxAttemptsExceeded", target)
+
+    def get_item(self, **params):
+        """GetItem, returns the response dict like the boto3 client does"""
+        return self.request("GetItem", params)
+
+    def update_item(self, **params):
+        """UpdateItem, returns the response dict like the boto3 client does"""
+        return self.request("UpdateItem", params)